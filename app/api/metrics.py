@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from app.core.config import settings
+from app.core.metrics import metrics_payload
+
+# Included by app/main.py without the /api/v1 prefix: Prometheus scrapes /metrics
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition of request, provider and Qdrant metrics"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
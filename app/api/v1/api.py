@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, embeddings, items, generation, config, chat
+from app.api.v1.endpoints import health, embeddings, items, generation, config, chat, profiling, tokens
 
 api_router = APIRouter()
 
@@ -8,4 +8,6 @@ api_router.include_router(embeddings.router, prefix="/embeddings", tags=["embedd
 api_router.include_router(items.router, prefix="/items", tags=["items"])
 api_router.include_router(generation.router, prefix="/generation", tags=["generation"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(tokens.router, prefix="/tokens", tags=["tokens"])
 api_router.include_router(config.router, prefix="/config", tags=["config"])
+api_router.include_router(profiling.router, prefix="/profiling", tags=["profiling"])
@@ -1,27 +1,39 @@
 from fastapi import APIRouter, HTTPException
 from app.models.dtos import ChatRequest, ChatResponse
+from app.core.config import settings
 from app.services.llm_manager import llm_manager
+from app.core.sse import sse_response
+from app.services.completion_service import completion_service
+from app.services.conversation_service import conversation_service
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.provider_router import ProviderUnavailable
+from app.services.token_counter import ContextWindowExceeded
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/completions", response_model=ChatResponse)
 async def chat_completions(request: ChatRequest):
     """
     Chat completion endpoint supporting dynamic provider selection and usage tracking.
+    With `stream: true` the response is a Server-Sent Events stream of `delta`
+    events followed by a final `done` event carrying the model and usage.
+    With a `conversation_id`, send only the new turn: earlier turns (older
+    ones summarized) come from the server-side history.
+    Requests over the model's context window are rejected with a 400, or
+    trimmed to fit with `overflow: "trim"`.
     """
     try:
-        # Determine service
-        provider = request.provider or llm_manager.get_current_provider()
-        service = llm_manager.gen_services.get(provider)
-        
-        if not service:
+        # Determine service (None lets the manager pick: active provider or routed)
+        provider = request.provider
+        if provider and provider not in llm_manager.available_providers():
              raise HTTPException(status_code=400, detail=f"Provider {provider} not found")
 
         # Config
         config = {}
         if request.max_tokens:
             config["max_output_tokens"] = request.max_tokens
-        if request.temperature:
+        if request.temperature is not None:
             config["temperature"] = request.temperature
             
         # If the user selected a specific model, we might need to set it on the service or pass it
@@ -70,12 +82,57 @@ async def chat_completions(request: ChatRequest):
         if request.model:
             config["model"] = request.model
 
-        # Call service
-        result = await service.chat_with_usage(request.messages, config=config)
-        
-        return ChatResponse(**result)
+        messages = request.messages
+        conversation_id = request.conversation_id
+        if conversation_id:
+            messages = await conversation_service.context(
+                conversation_id, request.messages, provider, model=request.model or llm_manager.default_model(provider) or ""
+            )
+
+        # Counted locally per route: an oversized request fails (or is trimmed) before any upstream call
+        overflow = (request.overflow or settings.TOKEN_OVERFLOW_POLICY) if settings.TOKEN_PREFLIGHT_ENABLED else None
+
+        if request.stream:
+            events = completion_service.stream_chat(
+                messages, provider, config, use_cache=request.cache, refresh=request.cache_refresh, overflow=overflow
+            )
+            if conversation_id:
+                events = conversation_service.recorded(conversation_id, request.messages, events)
+            return sse_response(events)
 
-    except HTTPException as he:
-        raise he
+        # Call service (through the response caches)
+        result = await completion_service.chat(
+            messages, provider, config, use_cache=request.cache, refresh=request.cache_refresh, overflow=overflow
+        )
+        if conversation_id:
+            await conversation_service.record(conversation_id, request.messages, result["content"], result["model"])
+
+        return ChatResponse(**result, conversation_id=conversation_id)
+
+    except (HTTPException, RateLimitExceeded, ProviderUnavailable, ContextWindowExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def response_cache_stats():
+    """
+    Hit/miss counters of the exact-match and semantic response caches.
+    """
+    return completion_service.stats()
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id: str):
+    """
+    Stored messages of a conversation and its rolling summary (if older turns were folded).
+    """
+    conversation = await conversation_service.get(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+    return conversation
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    if not await conversation_service.delete(conversation_id):
+        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+    return {"status": "success", "conversation_id": conversation_id}
@@ -1,20 +1,80 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from app.core.config import settings
 from app.services.llm_manager import llm_manager
+from app.services.rate_limiter import rate_limiter
+from app.services.provider_router import provider_router
+from app.services.hedging import hedger
+from app.core.shared_state import shared_state
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 class ProviderUpdate(BaseModel):
     provider: str
 
+class RoutingUpdate(BaseModel):
+    mode: str # "active" or "latency"
+
 @router.post("/provider")
 async def set_llm_provider(update: ProviderUpdate):
     try:
         llm_manager.set_provider(update.provider)
-        return {"status": "success", "provider": update.provider}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # Other workers pick it up within SHARED_STATE_POLL_INTERVAL
+    await shared_state.set("provider", update.provider)
+    return {"status": "success", "provider": update.provider}
 
 @router.get("/provider")
 async def get_llm_provider():
-    return {"provider": llm_manager.get_current_provider()}
+    return {
+        "provider": llm_manager.get_current_provider(),
+        "available": llm_manager.available_providers(),
+        "loaded": llm_manager.loaded_providers(),
+        "shared": shared_state.enabled
+    }
+
+@router.get("/limits")
+async def get_rate_limits():
+    """
+    Rate limit state per provider:model: configured limits, queue depth,
+    in-flight calls, wait times and 429 retries.
+    """
+    return {
+        "enabled": settings.LLM_RATE_LIMIT_ENABLED,
+        "defaults": rate_limiter.defaults,
+        "limiters": rate_limiter.stats()
+    }
+
+@router.post("/routing")
+async def set_routing_mode(update: RoutingUpdate):
+    try:
+        llm_manager.set_routing_mode(update.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await shared_state.set("routing_mode", update.mode)
+    return {"status": "success", "mode": update.mode}
+
+@router.get("/routing")
+async def get_routing():
+    """
+    Routing mode and, per provider:model, the EWMA latency / error rate and
+    circuit breaker state used to rank providers.
+    """
+    return {
+        "mode": llm_manager.routing_mode,
+        "routes": provider_router.stats()
+    }
+
+@router.get("/hedging")
+async def get_hedging():
+    """
+    Per call site (provider:method:model): calls, how often a hedge fired
+    and how often it won, plus the current hedge delay.
+    """
+    return {
+        "enabled": settings.HEDGE_ENABLED,
+        "alternate_provider": settings.HEDGE_ALTERNATE_PROVIDER or None,
+        **hedger.stats()
+    }
@@ -1,18 +1,97 @@
-from fastapi import APIRouter
-from app.models.dtos import EmbeddingRequest, EmbeddingResponse, BatchEmbeddingRequest, BatchEmbeddingResponse
+from fastapi import APIRouter, HTTPException, Header, Query, Response
+from typing import List, Optional, Union
+from app.models.dtos import (
+    EmbeddingRequest, EmbeddingResponse, BatchEmbeddingRequest, BatchEmbeddingResponse,
+    EncodedEmbeddingResponse, EncodedBatchEmbeddingResponse
+)
+from app.core.config import settings
+from app.core import vector_codec
+from app.services.embedding_batcher import embedding_batcher
+from app.services.embedding_chunker import chunked_embedder
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+def _negotiate(accept: Optional[str], encoding: Optional[str], dtype: Optional[str]):
+    try:
+        return vector_codec.negotiate(accept, encoding, dtype)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _binary_response(vectors: List[Optional[List[float]]], dtype: str, failed_indices: Optional[List[int]] = None) -> Response:
+    headers = {"X-Vector-Dtype": dtype}
+    if failed_indices:
+        # Failed rows are NaN in the body; their indices travel in a header
+        headers["X-Failed-Items"] = ",".join(str(i) for i in failed_indices)
+    return Response(
+        content=vector_codec.encode_vectors(vectors, dtype),
+        media_type=vector_codec.OCTET_STREAM,
+        headers=headers
+    )
+
+@router.post("/generate", response_model=Union[EmbeddingResponse, EncodedEmbeddingResponse])
+async def generate_embedding(
+    request: EmbeddingRequest,
+    encoding: Optional[str] = Query(None, description="json (default), base64 or binary"),
+    dtype: Optional[str] = Query(None, description="float32 (default) or float16, for base64/binary"),
+    accept: Optional[str] = Header(None)
+):
+    """
+    Returns the vector as a JSON float list by default. `encoding=base64` packs it
+    into a string; `encoding=binary` or `Accept: application/octet-stream` returns
+    the raw header-prefixed float32/float16 payload (see app/core/vector_codec.py).
+    """
+    encoding, dtype = _negotiate(accept, encoding, dtype)
 
-@router.post("/generate", response_model=EmbeddingResponse)
-async def generate_embedding(request: EmbeddingRequest):
     from app.services.llm_manager import llm_manager
     service = llm_manager.get_embedding_service()
-    vector = service.generate_embedding(request.text, request.dimension)
+    if settings.EMBEDDING_COALESCE_ENABLED:
+        # Concurrent single-text requests are merged into one upstream batch call
+        vector = await embedding_batcher.embed(service, request.text, request.dimension)
+    else:
+        vector = await service.generate_embedding(request.text, request.dimension)
+
+    if encoding == "binary":
+        return _binary_response([vector], dtype)
+    if encoding == "base64":
+        return EncodedEmbeddingResponse(
+            vector=vector_codec.encode_base64(vector, dtype), dtype=dtype, dimension=len(vector)
+        )
     return EmbeddingResponse(vector=vector)
 
-@router.post("/generate/batch", response_model=BatchEmbeddingResponse)
-async def generate_batch_embeddings(request: BatchEmbeddingRequest):
+@router.post("/generate/batch", response_model=Union[BatchEmbeddingResponse, EncodedBatchEmbeddingResponse])
+async def generate_batch_embeddings(
+    request: BatchEmbeddingRequest,
+    encoding: Optional[str] = Query(None, description="json (default), base64 or binary"),
+    dtype: Optional[str] = Query(None, description="float32 (default) or float16, for base64/binary"),
+    accept: Optional[str] = Header(None)
+):
+    encoding, dtype = _negotiate(accept, encoding, dtype)
+
     from app.services.llm_manager import llm_manager
     service = llm_manager.get_embedding_service()
-    vectors = service.generate_batch_embeddings(request.texts, request.dimension)
-    return BatchEmbeddingResponse(vectors=vectors)
+    vectors, failed = await chunked_embedder.embed(service, request.texts, request.dimension)
+    if failed and len(failed) == len(request.texts):
+        raise HTTPException(status_code=502, detail=f"All embedding chunks failed: {failed[0]['error']}")
+
+    if encoding == "binary":
+        return _binary_response(vectors, dtype, [f["index"] for f in failed])
+    if encoding == "base64":
+        return EncodedBatchEmbeddingResponse(
+            vectors=[vector_codec.encode_base64(v, dtype) if v is not None else None for v in vectors],
+            dtype=dtype,
+            dimension=next((len(v) for v in vectors if v is not None), 0),
+            failed=failed
+        )
+    return BatchEmbeddingResponse(vectors=vectors, failed=failed)
+
+@router.get("/cache/stats")
+async def embedding_cache_stats():
+    from app.services.llm_manager import llm_manager
+    if llm_manager.embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_manager.embedding_cache.stats()}
+
+@router.get("/coalescer/stats")
+async def embedding_coalescer_stats():
+    return {"enabled": settings.EMBEDDING_COALESCE_ENABLED, **embedding_batcher.stats()}
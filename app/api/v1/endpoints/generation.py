@@ -1,25 +1,40 @@
 from fastapi import APIRouter, HTTPException
 from app.models.dtos import GenerationRequest, GenerationResponse
-# Better: remove lines
+from app.core.config import settings
+from app.core.sse import sse_response
+from app.services.completion_service import completion_service
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.provider_router import ProviderUnavailable
+from app.services.token_counter import ContextWindowExceeded
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/generate", response_model=GenerationResponse)
 async def generate_content(request: GenerationRequest):
     """
     Generate content using Gemini generative models (e.g., Gemini 2.0 Flash).
+    With `stream: true` the response is a Server-Sent Events stream (see /chat/completions).
     """
     try:
-        # Use active provider from manager
-        from app.services.llm_manager import llm_manager
-        service = llm_manager.get_service()
-        
+        # Active provider from the manager, through the response caches
         config = {
             "max_output_tokens": request.max_tokens,
             "temperature": request.temperature
         }
-        
-        text = await service.generate_content(request.prompt, config=config)
-        return GenerationResponse(text=text, model=service.model_name)
+
+        overflow = (request.overflow or settings.TOKEN_OVERFLOW_POLICY) if settings.TOKEN_PREFLIGHT_ENABLED else None
+
+        if request.stream:
+            return sse_response(completion_service.stream_generate(
+                request.prompt, config=config, use_cache=request.cache, refresh=request.cache_refresh, overflow=overflow
+            ))
+
+        result = await completion_service.generate(
+            request.prompt, config=config, use_cache=request.cache, refresh=request.cache_refresh, overflow=overflow
+        )
+        return GenerationResponse(**result)
+    except (RateLimitExceeded, ProviderUnavailable, ContextWindowExceeded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
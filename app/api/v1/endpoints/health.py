@@ -1,9 +1,18 @@
 from fastapi import APIRouter, HTTPException
 from app.models.dtos import HealthResponse
-from app.repositories.qdrant_repo import qdrant_repo
+from app.services.health_prober import health_prober, ProbeResult
 from app.core.config import settings
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+def _probe_response(result: ProbeResult, **details) -> HealthResponse:
+    """
+    Serves a cached probe result; 503 when the last check failed.
+    """
+    if result.status != "ok":
+        raise HTTPException(status_code=503, detail={"service": result.name, **details, **result.to_dict()})
+    return HealthResponse(status="ok", details={**details, **result.to_dict()})
 
 @router.get("/server", response_model=HealthResponse)
 async def server_health():
@@ -13,21 +22,28 @@ async def server_health():
 async def gemini_health():
     from app.services.llm_manager import llm_manager
     # Check generation service of active provider
-    service = llm_manager.get_service()
-    if service.health_check():
-        return HealthResponse(status="ok", details={"provider": llm_manager.get_current_provider()})
-    raise HTTPException(status_code=503, detail=f"{llm_manager.get_current_provider()} service unavailable")
+    provider = llm_manager.get_current_provider()
+    return _probe_response(await health_prober.get_provider(provider), provider=provider)
 
 @router.get("/qdrant", response_model=HealthResponse)
 async def qdrant_health():
-    if qdrant_repo.health_check():
-        return HealthResponse(status="ok", details={"environment": settings.ENVIRONMENT})
-    raise HTTPException(status_code=503, detail="Qdrant service unavailable")
+    return _probe_response(await health_prober.get("qdrant"), environment=settings.ENVIRONMENT)
 
 @router.get("/gemini-gen", response_model=HealthResponse)
 async def gemini_gen_health():
     from app.services.llm_manager import llm_manager
-    service = llm_manager.get_service()
-    if service.health_check():
-         return HealthResponse(status="ok", details={"provider": llm_manager.get_current_provider()})
-    raise HTTPException(status_code=503, detail="Service unavailable")
+    provider = llm_manager.get_current_provider()
+    return _probe_response(await health_prober.get_provider(provider), provider=provider)
+
+@router.get("/all", response_model=HealthResponse)
+async def all_health():
+    """
+    Runs fresh checks of every provider and Qdrant concurrently.
+    Status is "ok" when all of them pass and "degraded" otherwise.
+    """
+    results = await health_prober.check_all()
+    healthy = all(result.status == "ok" for result in results.values())
+    return HealthResponse(
+        status="ok" if healthy else "degraded",
+        details={name: result.to_dict() for name, result in results.items()}
+    )
@@ -1,33 +1,164 @@
-from fastapi import APIRouter, Query
+import json
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import List, Optional, Any
-from app.repositories.qdrant_repo import qdrant_repo
+from app.models.dtos import (
+    IngestionStatus, SearchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse
+)
+from app.repositories.qdrant_repo import build_filter
+from app.repositories.async_qdrant_repo import async_qdrant_repo
+from app.core.config import settings
+from app.core.concurrency import run_sync
+from app.core import vector_codec
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.ingestion_service import ingestion_service
+from app.services.search_service import search_service
+from app.services.rate_limiter import RateLimitExceeded
+from app.core.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/")
 async def fetch_items(
     collection_name: str = Query(..., description="Name of the Qdrant collection"),
-    limit: int = Query(10, description="Number of items to fetch"),
+    limit: int = Query(10, ge=1, description="Number of items to fetch (capped at ITEMS_MAX_PAGE_SIZE)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    filter_: Optional[str] = Query(None, alias="filter", description='JSON payload filter, e.g. {"color": "red", "price": {"lt": 20}}'),
+    fields: Optional[str] = Query(None, description="Comma-separated payload fields to return"),
     with_payload: bool = True,
-    with_vectors: bool = False
+    with_vectors: bool = False,
+    encoding: Optional[str] = Query(None, description="Vector encoding: json (default) or base64"),
+    dtype: Optional[str] = Query(None, description="float32 (default) or float16, for base64")
 ):
-    points, next_page_offset = qdrant_repo.fetch_all(
+    """
+    Cursor-paginated scroll over a collection. Follow `next_cursor` until it is
+    null to walk the whole collection; `filter` and `fields` are applied in Qdrant.
+    """
+    try:
+        encoding, dtype = vector_codec.negotiate(None, encoding, dtype)
+        offset = decode_cursor(cursor)
+        scroll_filter = build_filter(json.loads(filter_)) if filter_ else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if encoding == "binary":
+        # Items carry payloads, so vectors can only be packed inside the JSON body
+        raise HTTPException(status_code=400, detail="Items support encoding=json or encoding=base64")
+
+    payload_selector = with_payload
+    if with_payload and fields:
+        payload_selector = [f.strip() for f in fields.split(",") if f.strip()]
+
+    page_size = min(limit, settings.ITEMS_MAX_PAGE_SIZE)
+    points, next_page_offset = await async_qdrant_repo.fetch_all(
         collection_name=collection_name,
-        limit=limit,
-        with_payload=with_payload,
-        with_vectors=with_vectors
+        limit=page_size,
+        with_payload=payload_selector,
+        with_vectors=with_vectors,
+        offset=offset,
+        scroll_filter=scroll_filter
     )
     
-    # Transform points to a more JSON-serializable format if needed
-    results = []
-    for point in points:
-        results.append({
-            "id": point.id,
-            "payload": point.payload,
-            "vector": point.vector if with_vectors else None
-        })
+    # Transform points to a more JSON-serializable format
+    if not with_vectors:
+        results = [{"id": point.id, "payload": point.payload, "vector": None} for point in points]
+    elif encoding == "base64":
+        # Named vectors come back as a dict and are left as-is
+        results = [
+            {
+                "id": point.id,
+                "payload": point.payload,
+                "vector": vector_codec.encode_base64(point.vector, dtype) if isinstance(point.vector, list) else point.vector
+            }
+            for point in points
+        ]
+    else:
+        results = [{"id": point.id, "payload": point.payload, "vector": point.vector} for point in points]
         
-    return {
+    response = {
         "items": results,
+        "limit": page_size,
+        "next_cursor": encode_cursor(next_page_offset),
         "next_page_offset": next_page_offset
     }
+    if encoding == "base64":
+        response["vector_dtype"] = dtype
+    return response
+
+
+@router.post("/ingest", response_model=IngestionStatus, status_code=202)
+async def ingest_items(
+    request: Request,
+    collection_name: str = Query(..., description="Target Qdrant collection (created if missing)"),
+    text_field: str = Query(..., description="Record field to embed; dotted paths allowed"),
+    id_field: Optional[str] = Query(None, description="Record field used as point id"),
+    dimension: int = Query(768, description="Embedding dimension"),
+    checkpoint: Optional[str] = Query(None, description="Checkpoint name; re-uploading with the same name resumes")
+):
+    """
+    Ingests a JSONL request body (e.g. `curl --data-binary @data.jsonl`).
+    The body is spooled to disk as it arrives and processed in the background;
+    poll GET /items/ingest/{job_id} for progress.
+    """
+    from app.services.llm_manager import llm_manager
+
+    fd, path = tempfile.mkstemp(suffix=".jsonl", dir=settings.INGEST_UPLOAD_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                await run_sync(f.write, chunk)
+    except Exception:
+        os.remove(path)
+        raise
+
+    progress = await ingestion_service.start_file_job(
+        path,
+        embedding_service=llm_manager.get_embedding_service(),
+        repo=async_qdrant_repo,
+        collection_name=collection_name,
+        text_field=text_field,
+        id_field=id_field,
+        dimension=dimension,
+        checkpoint_name=checkpoint,
+        delete_source=True
+    )
+    return IngestionStatus(**progress.to_dict())
+
+@router.get("/ingest/{job_id}", response_model=IngestionStatus)
+async def ingestion_status(job_id: str):
+    progress = await ingestion_service.get_job(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return IngestionStatus(**progress.to_dict())
+
+@router.post("/search", response_model=SearchResponse)
+async def search_items(request: SearchRequest):
+    """
+    Semantic search: embeds `query` with the active embedding provider and
+    returns the nearest points, optionally filtered by payload.
+    """
+    try:
+        hits = await search_service.search(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return SearchResponse(hits=hits)
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_items_batch(request: BatchSearchRequest):
+    """
+    Batch semantic search: all queries are embedded together and sent to
+    Qdrant in a single batch request. Results are returned in query order.
+    """
+    try:
+        results = await search_service.search_batch(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return BatchSearchResponse(results=results)
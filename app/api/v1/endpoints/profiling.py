@@ -0,0 +1,61 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.profiling import request_profiler
+from app.core.shared_state import shared_state
+from app.core.timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+class ProfilingUpdate(BaseModel):
+    enabled: bool
+    sample_rate: float = 0.1 # share of requests profiled while enabled
+
+def require_profiling_token(x_profiling_token: Optional[str] = Header(None)):
+    """Profiling is off (404) without PROFILING_TOKEN and needs the X-Profiling-Token header"""
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not x_profiling_token or not secrets.compare_digest(x_profiling_token, settings.PROFILING_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid profiling token")
+
+@router.get("", dependencies=[Depends(require_profiling_token)])
+async def get_profiling():
+    """
+    Profiler state and the profiles captured by this worker, newest first.
+    """
+    return {
+        "available": request_profiler.available,
+        "enabled": request_profiler.enabled,
+        "sample_rate": request_profiler.sample_rate,
+        "profiles": request_profiler.list()
+    }
+
+@router.post("", dependencies=[Depends(require_profiling_token)])
+async def set_profiling(update: ProfilingUpdate):
+    """
+    Starts or stops sampling requests through the statistical profiler, in every worker.
+    """
+    try:
+        request_profiler.configure(update.enabled, update.sample_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    await shared_state.set("profiling", {"enabled": update.enabled, "sample_rate": update.sample_rate})
+    return {"status": "success", "enabled": request_profiler.enabled, "sample_rate": request_profiler.sample_rate}
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_token)])
+async def download_profile(profile_id: str, format: str = Query("html", description="html (flamegraph) or speedscope")):
+    """
+    Downloads a captured profile: an HTML flamegraph, or a speedscope JSON file
+    (open at https://www.speedscope.app).
+    """
+    if format not in request_profiler.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(request_profiler.FORMATS)}")
+    rendered = request_profiler.render(profile_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    body, media_type, filename = rendered
+    return Response(content=body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException
+from app.models.dtos import TokenCountRequest, TokenCountResponse
+from app.services.llm_manager import llm_manager
+from app.services.token_counter import token_counter
+from app.core.timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.post("/count", response_model=TokenCountResponse)
+async def count_tokens(request: TokenCountRequest):
+    """
+    Counts the tokens of chat messages or a prompt locally (no upstream call)
+    for `model`, by default the provider's, and reports whether they fit the
+    model's context window together with `max_tokens`.
+    """
+    if (request.messages is None) == (request.prompt is None):
+        raise HTTPException(status_code=400, detail="Send either messages or prompt")
+    if request.provider and request.provider not in llm_manager.available_providers():
+        raise HTTPException(status_code=400, detail=f"Provider {request.provider} not found")
+
+    model = request.model or llm_manager.default_model(request.provider) or ""
+    result = token_counter.preflight(
+        model, messages=request.messages, prompt=request.prompt, max_tokens=request.max_tokens, policy=None
+    )
+    return TokenCountResponse(
+        model=model,
+        tokenizer=result["tokenizer"],
+        prompt_tokens=result["prompt_tokens"],
+        message_tokens=token_counter.message_counts(request.messages, model) if request.messages is not None else None,
+        max_tokens=result["max_tokens"],
+        context_window=result["context_window"],
+        max_output_tokens=result["max_output_tokens"],
+        fits=result["fits"]
+    )
+
+@router.get("/stats")
+async def token_counter_stats():
+    """
+    Count cache hits/misses and the per-model calibration factors learned from provider usage.
+    """
+    return token_counter.stats()
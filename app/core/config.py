@@ -14,12 +14,31 @@ class Settings(BaseSettings):
 
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_GEN_MODEL: str = os.getenv("GEMINI_GEN_MODEL", "gemini-2.0-flash")
+    # Override the Gemini API endpoint (e.g. the benchmark stub); empty = Google's default
+    GEMINI_API_BASE: str = os.getenv("GEMINI_API_BASE", "")
+    # Explicit context caching of long system prompts (+ repeated few-shot prefixes):
+    # minimum estimated tokens to cache, handle TTL and how long before expiry it is extended
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", 4096))
+    GEMINI_CONTEXT_CACHE_TTL: float = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL", 3600))
+    GEMINI_CONTEXT_CACHE_REFRESH_MARGIN: float = float(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_MARGIN", 300))
+    GEMINI_CONTEXT_CACHE_MIN_USES: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_USES", 2))
     LITELLM_API_KEY: str = os.getenv("LITELLM_API_KEY", "")
+    LITELLM_API_BASE: str = os.getenv("LITELLM_API_BASE", "https://imllm.intermesh.net/v1")
     
     # LiteLLM default models (without litellm_proxy/ prefix - will be added in service layer)
     LITELLM_DEFAULT_MODEL: str = os.getenv("LITELLM_DEFAULT_MODEL", "google/gemini-2.5-flash")
     LITELLM_DEFAULT_EMBEDDING_MODEL: str = os.getenv("LITELLM_DEFAULT_EMBEDDING_MODEL", "google/text-embedding-004")
     
+    # Offline "local" provider: hash-seeded embeddings and synthetic completions
+    # (seconds of latency per call; streams paced at LOCAL_TOKENS_PER_SECOND, 0 = unpaced)
+    LOCAL_GEN_MODEL: str = os.getenv("LOCAL_GEN_MODEL", "local-synthetic")
+    LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "local-hash")
+    LOCAL_LATENCY: float = float(os.getenv("LOCAL_LATENCY", 0))
+    LOCAL_EMBEDDING_LATENCY: float = float(os.getenv("LOCAL_EMBEDDING_LATENCY", 0))
+    LOCAL_COMPLETION_TOKENS: int = int(os.getenv("LOCAL_COMPLETION_TOKENS", 64))
+    LOCAL_TOKENS_PER_SECOND: float = float(os.getenv("LOCAL_TOKENS_PER_SECOND", 0))
+    
     # Local Qdrant
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT: int = int(os.getenv("QDRANT_PORT", 6333))
@@ -28,6 +47,156 @@ class Settings(BaseSettings):
     QDRANT_URL: Optional[str] = os.getenv("QDRANT_URL")
     QDRANT_API_KEY: Optional[str] = os.getenv("QDRANT_API_KEY")
 
+    # Qdrant client tuning
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+    QDRANT_GRPC_PORT: int = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+    QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", 10))
+    QDRANT_POOL_SIZE: int = int(os.getenv("QDRANT_POOL_SIZE", 32))
+    # ":memory:" or a directory runs Qdrant in-process (tests, benchmarks); overrides host/url
+    QDRANT_LOCATION: Optional[str] = os.getenv("QDRANT_LOCATION")
+
+    # Providers built at startup instead of on first request, comma-separated
+    # (e.g. "gemini,litellm,qdrant"); empty keeps everything lazy
+    WARMUP_PROVIDERS: str = os.getenv("WARMUP_PROVIDERS", "")
+
+    # Background health probing; endpoints serve the cached results. Providers
+    # not listed here are added the first time their health is requested.
+    HEALTH_PROBE_ENABLED: bool = os.getenv("HEALTH_PROBE_ENABLED", "true").lower() == "true"
+    HEALTH_PROBE_INTERVAL: float = float(os.getenv("HEALTH_PROBE_INTERVAL", 30))
+    HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", 5))
+    HEALTH_PROBE_PROVIDERS: str = os.getenv("HEALTH_PROBE_PROVIDERS", "gemini")
+
+    # Outbound LLM rate limiting per (provider, model); 0 disables a limit.
+    # LLM_RATE_LIMITS overrides them per "provider" or "provider:model" as JSON,
+    # e.g. {"litellm": {"rpm": 600}, "gemini:gemini-2.0-flash": {"tpm": 1000000}}
+    LLM_RATE_LIMIT_ENABLED: bool = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    LLM_RATE_LIMIT_RPM: int = int(os.getenv("LLM_RATE_LIMIT_RPM", 0))
+    LLM_RATE_LIMIT_TPM: int = int(os.getenv("LLM_RATE_LIMIT_TPM", 0))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))
+    LLM_RATE_LIMITS: str = os.getenv("LLM_RATE_LIMITS", "")
+    # Retries of upstream 429s (Retry-After is honoured, capped at LLM_RETRY_MAX_DELAY)
+    LLM_RETRY_MAX_ATTEMPTS: int = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", 3))
+    LLM_RETRY_BACKOFF: float = float(os.getenv("LLM_RETRY_BACKOFF", 1.0))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", 30))
+
+    # Local token counting: /chat/completions and /generation/generate check the
+    # prompt + max_tokens against each candidate route's model limits before calling out.
+    # TOKEN_OVERFLOW_POLICY: "reject" (400) or "trim" (drop the oldest turns, lower max_tokens).
+    # MODEL_CONTEXT_WINDOWS overrides the built-in limits per model name prefix as JSON,
+    # e.g. {"gemini-2.0-flash": {"context": 1048576, "output": 8192}}
+    TOKEN_PREFLIGHT_ENABLED: bool = os.getenv("TOKEN_PREFLIGHT_ENABLED", "true").lower() == "true"
+    TOKEN_OVERFLOW_POLICY: str = os.getenv("TOKEN_OVERFLOW_POLICY", "reject")
+    TOKEN_COUNT_CACHE_SIZE: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 8192))
+    TOKEN_DEFAULT_CONTEXT_WINDOW: int = int(os.getenv("TOKEN_DEFAULT_CONTEXT_WINDOW", 128000))
+    TOKEN_DEFAULT_MAX_OUTPUT: int = int(os.getenv("TOKEN_DEFAULT_MAX_OUTPUT", 8192))
+    MODEL_CONTEXT_WINDOWS: str = os.getenv("MODEL_CONTEXT_WINDOWS", "")
+
+    # Provider routing: "active" sends every unpinned request to the selected
+    # provider; "latency" picks the healthiest of LLM_ROUTING_PROVIDERS (empty =
+    # all but "local") by EWMA latency/error rate and fails over when a circuit is open
+    LLM_ROUTING_MODE: str = os.getenv("LLM_ROUTING_MODE", "active")
+    LLM_ROUTING_PROVIDERS: str = os.getenv("LLM_ROUTING_PROVIDERS", "")
+    LLM_ROUTING_EWMA_ALPHA: float = float(os.getenv("LLM_ROUTING_EWMA_ALPHA", 0.3))
+    LLM_ROUTING_EXPLORE: float = float(os.getenv("LLM_ROUTING_EXPLORE", 0.05))
+    # Circuit breaker: opens after this many consecutive failures, retried after the timeout (s)
+    LLM_CIRCUIT_FAILURES: int = int(os.getenv("LLM_CIRCUIT_FAILURES", 5))
+    LLM_CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", 30))
+
+    # Request hedging: a duplicate is sent when chat_with_usage or
+    # generate_batch_embeddings runs past the HEDGE_PERCENTILE latency (clamped
+    # to [MIN, MAX] seconds); HEDGE_BUDGET caps the extra calls (0.05 = 5%).
+    # Chat hedges go to HEDGE_ALTERNATE_PROVIDER when set, else the same provider.
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", 95))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", 0.5))
+    HEDGE_MAX_DELAY: float = float(os.getenv("HEDGE_MAX_DELAY", 10))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", 20))
+    HEDGE_BUDGET: float = float(os.getenv("HEDGE_BUDGET", 0.05))
+    HEDGE_ALTERNATE_PROVIDER: str = os.getenv("HEDGE_ALTERNATE_PROVIDER", "")
+
+    # Prometheus metrics at /metrics. For several uvicorn workers also set
+    # PROMETHEUS_MULTIPROC_DIR (read by prometheus_client) to an empty directory.
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Per-request phase timings (parse, handler, format, upstream, qdrant,
+    # serialize): Server-Timing header and one JSON log line per request
+    # (only requests slower than REQUEST_LOG_MIN_MS are logged)
+    REQUEST_TIMING_ENABLED: bool = os.getenv("REQUEST_TIMING_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    REQUEST_LOG_ENABLED: bool = os.getenv("REQUEST_LOG_ENABLED", "true").lower() == "true"
+    REQUEST_LOG_MIN_MS: float = float(os.getenv("REQUEST_LOG_MIN_MS", 0))
+
+    # On-demand profiling (needs pyinstrument); empty token disables /profiling
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", ".cache/profiles")
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", 20))
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", 0.001))
+
+    # Runtime settings changed via /config (active provider, routing mode) shared
+    # by all workers through this SQLite file, polled every interval (seconds);
+    # empty (the default) keeps them per process. main_prod.py sets a path for
+    # multi-worker runs and clears the file first, so .env stays in charge
+    SHARED_STATE_DB_PATH: str = os.getenv("SHARED_STATE_DB_PATH", "")
+    SHARED_STATE_POLL_INTERVAL: float = float(os.getenv("SHARED_STATE_POLL_INTERVAL", 1.0))
+
+    # Worker processes serving the app (main_prod.py sets it from --workers). The
+    # LLM rate limits above are for the whole deployment: each worker enforces 1/N
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", 1))
+
+    # Thread pool used for blocking calls that have no async client
+    SYNC_POOL_MAX_WORKERS: int = int(os.getenv("SYNC_POOL_MAX_WORKERS", 16))
+
+    # Embedding cache (in-process LRU + optional SQLite tier; empty path disables the disk tier)
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_BYTES: int = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    EMBEDDING_CACHE_DB_PATH: str = os.getenv("EMBEDDING_CACHE_DB_PATH", ".cache/embeddings.sqlite3")
+
+    # Coalescing of concurrent single-text embedding requests into batch calls
+    EMBEDDING_COALESCE_ENABLED: bool = os.getenv("EMBEDDING_COALESCE_ENABLED", "true").lower() == "true"
+    EMBEDDING_COALESCE_WINDOW_MS: float = float(os.getenv("EMBEDDING_COALESCE_WINDOW_MS", 5))
+    EMBEDDING_COALESCE_MAX_BATCH: int = int(os.getenv("EMBEDDING_COALESCE_MAX_BATCH", 100))
+
+    # Chunked fan-out for /embeddings/generate/batch
+    EMBEDDING_BATCH_MAX_ITEMS: int = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", 100))
+    EMBEDDING_BATCH_MAX_TOKENS: int = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 20000))
+    EMBEDDING_BATCH_CONCURRENCY: int = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", 4))
+    EMBEDDING_BATCH_MAX_RETRIES: int = int(os.getenv("EMBEDDING_BATCH_MAX_RETRIES", 2))
+    EMBEDDING_BATCH_RETRY_BACKOFF: float = float(os.getenv("EMBEDDING_BATCH_RETRY_BACKOFF", 0.5))
+
+    # Exact-match cache for temperature 0 chat/generation (in-process LRU + optional SQLite tier)
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    RESPONSE_CACHE_DB_PATH: str = os.getenv("RESPONSE_CACHE_DB_PATH", ".cache/responses.sqlite3")
+
+    # Semantic response cache for chat/generation (Qdrant collection; cosine similarity threshold)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_COLLECTION: str = os.getenv("SEMANTIC_CACHE_COLLECTION", "semantic_cache")
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL", 24 * 60 * 60))
+    SEMANTIC_CACHE_DIMENSION: int = int(os.getenv("SEMANTIC_CACHE_DIMENSION", 768))
+    SEMANTIC_CACHE_EMBEDDING_PROVIDER: str = os.getenv("SEMANTIC_CACHE_EMBEDDING_PROVIDER", "")  # empty = active provider
+
+    # Server-side chat sessions (ChatRequest.conversation_id): append-only SQLite
+    # history (empty path = in memory). Past CONVERSATION_MAX_TOKENS of verbatim
+    # history the oldest turns are folded into a rolling summary until
+    # CONVERSATION_KEEP_TOKENS remain; the summary is written by
+    # CONVERSATION_SUMMARY_PROVIDER (empty = the provider of the request)
+    CONVERSATION_DB_PATH: str = os.getenv("CONVERSATION_DB_PATH", ".cache/conversations.sqlite3")
+    CONVERSATION_MAX_TOKENS: int = int(os.getenv("CONVERSATION_MAX_TOKENS", 3000))
+    CONVERSATION_KEEP_TOKENS: int = int(os.getenv("CONVERSATION_KEEP_TOKENS", 1500))
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", 512))
+    CONVERSATION_SUMMARY_PROVIDER: str = os.getenv("CONVERSATION_SUMMARY_PROVIDER", "")
+
+    # Upper bound on /items page size
+    ITEMS_MAX_PAGE_SIZE: int = int(os.getenv("ITEMS_MAX_PAGE_SIZE", 1000))
+
+    # Bulk ingestion (JSONL -> embed -> Qdrant)
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", 256))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", 4))
+    INGEST_CHECKPOINT_DIR: str = os.getenv("INGEST_CHECKPOINT_DIR", ".cache/ingest")
+    INGEST_UPLOAD_DIR: Optional[str] = os.getenv("INGEST_UPLOAD_DIR")  # defaults to the system temp dir
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,164 @@
+import os
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from app.core.config import settings
+from app.core.timing import phase, route_template
+
+T = TypeVar("T")
+
+# With PROMETHEUS_MULTIPROC_DIR set (one directory shared by all uvicorn
+# workers, emptied before start-up) prometheus_client writes samples to
+# mmap'd files and /metrics aggregates every worker.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last body chunk is sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served",
+    multiprocess_mode="livesum",
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Upstream LLM call latency (whole stream for streaming calls)",
+    ["provider", "model", "operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_TIME_TO_FIRST_EVENT = Histogram(
+    "llm_time_to_first_event_seconds",
+    "Latency until the first streamed event of an upstream LLM call",
+    ["provider", "model", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),
+)
+LLM_REQUESTS_IN_FLIGHT = Gauge(
+    "llm_requests_in_flight",
+    "Upstream LLM calls in progress",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported in the usage of upstream LLM calls",
+    ["provider", "model", "type"],
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Texts per upstream embedding call",
+    ["provider"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 100, 128, 250, 500),
+)
+
+QDRANT_OPERATION_DURATION = Histogram(
+    "qdrant_operation_duration_seconds",
+    "Qdrant client call latency",
+    ["operation", "outcome"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10),
+)
+
+
+def record_usage(provider: str, model: str, usage: Any) -> None:
+    """Counts prompt/completion/cached tokens of a `usage` dict (missing or None is ignored)"""
+    if not usage:
+        return
+    # "cached" is the part of "prompt" served from a context cache
+    for kind in ("prompt", "completion", "cached"):
+        count = usage.get(f"{kind}_tokens")
+        if count:
+            LLM_TOKENS.labels(provider, model, kind).inc(count)
+
+
+def observe_qdrant(operation: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator timing an async Qdrant repository method (histogram + request phase "qdrant")"""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        if not settings.METRICS_ENABLED and not settings.REQUEST_TIMING_ENABLED:
+            return func
+
+        ok = QDRANT_OPERATION_DURATION.labels(operation, "ok")
+        error = QDRANT_OPERATION_DURATION.labels(operation, "error")
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            start = time.perf_counter()
+            try:
+                with phase("qdrant"):
+                    result = await func(*args, **kwargs)
+            except Exception:
+                error.observe(time.perf_counter() - start)
+                raise
+            ok.observe(time.perf_counter() - start)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency per route template (e.g.
+    /api/v1/items/ingest/{job_id}) so label cardinality stays bounded.
+    Plain ASGI rather than BaseHTTPMiddleware, to keep streaming responses
+    unbuffered and the per-request overhead small.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                route_template(scope),
+                str(status["code"]),
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """(body, content type) of the exposition, aggregated over workers in multiprocess mode"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def shutdown_metrics() -> None:
+    """Drops this worker's live gauges from the shared multiprocess files"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,31 @@
+import base64
+import json
+from typing import Optional, Union
+
+Offset = Union[int, str]
+
+
+def encode_cursor(offset: Optional[Offset]) -> Optional[str]:
+    """
+    Wraps a Qdrant scroll offset (point id) in an opaque, URL-safe token.
+    """
+    if offset is None:
+        return None
+    raw = json.dumps({"o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Offset]:
+    """
+    Inverse of encode_cursor. Raises ValueError for tokens it did not produce.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded))["o"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if isinstance(offset, bool) or not isinstance(offset, (int, str)):
+        raise ValueError("Invalid cursor")
+    return offset
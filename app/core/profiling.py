@@ -0,0 +1,133 @@
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.shared_state import shared_state
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional: pip install pyinstrument
+    Profiler = None
+
+
+class RequestProfiler:
+    """
+    Samples a share of requests through pyinstrument (a statistical
+    profiler) while enabled. Each profile is saved as a pyinstrument session
+    under `directory` and rendered on download as an HTML flamegraph or a
+    speedscope file. Only the newest `max_profiles` are kept.
+
+    The toggle reaches every worker through the shared state; each worker
+    samples and lists its own requests.
+    """
+
+    FORMATS = ("html", "speedscope")
+
+    def __init__(self, directory: str, max_profiles: int, interval: float):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.interval = interval
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.profiles: Deque[Dict[str, Any]] = deque()
+
+    @property
+    def available(self) -> bool:
+        return Profiler is not None
+
+    def configure(self, enabled: bool, sample_rate: float) -> None:
+        if enabled and not self.available:
+            raise RuntimeError("pyinstrument is not installed")
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+
+    def should_sample(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def start(self) -> Any:
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    def save(self, profiler: Any, method: str, path: str, status: int, duration_ms: float) -> None:
+        session = profiler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        session.save(self._file(profile_id))
+        self.profiles.append({
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "created_at": time.time(),
+        })
+        while len(self.profiles) > self.max_profiles:
+            old = self.profiles.popleft()
+            try:
+                os.remove(self._file(old["id"]))
+            except OSError:
+                pass
+
+    def _file(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.pyisession")
+
+    def list(self) -> List[Dict[str, Any]]:
+        return list(reversed(self.profiles))
+
+    def render(self, profile_id: str, fmt: str) -> Optional[Tuple[str, str, str]]:
+        """(body, media type, file name) of a stored profile, None if unknown"""
+        if not any(p["id"] == profile_id for p in self.profiles):
+            return None
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+        from pyinstrument.session import Session
+
+        session = Session.load(self._file(profile_id))
+        if fmt == "speedscope":
+            return SpeedscopeRenderer().render(session), "application/json", f"{profile_id}.speedscope.json"
+        return HTMLRenderer().render(session), "text/html", f"{profile_id}.html"
+
+
+class ProfilingMiddleware:
+    """Runs sampled requests under the profiler; others pass straight through"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not request_profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        profiler = request_profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            try:
+                request_profiler.save(profiler, scope["method"], scope["path"], status["code"], (time.perf_counter() - start) * 1000)
+            except Exception as e:
+                print(f"⚠️ Saving profile failed: {e}")
+
+
+request_profiler = RequestProfiler(
+    directory=settings.PROFILING_DIR,
+    max_profiles=settings.PROFILING_MAX_PROFILES,
+    interval=settings.PROFILING_INTERVAL
+)
+
+# Turning profiling on or off through /profiling reaches every worker
+shared_state.register("profiling", lambda value: request_profiler.configure(value["enabled"], value["sample_rate"]))
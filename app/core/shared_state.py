@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.concurrency import run_sync
+
+
+class SQLiteStateStore:
+    """
+    Versioned key/value rows in a SQLite file that every worker process
+    opens. Each write takes the next global version, so readers only fetch
+    what changed since the last version they saw. Calls are blocking and
+    are expected to run on the shared thread pool.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit, so BEGIN IMMEDIATE below serializes writers across processes
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def put(self, key: str, value: Any) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM state").fetchone()[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value, version, updated_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), version, time.time())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return version
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def changes(self, since: int) -> List[Tuple[str, Any, int]]:
+        """(key, value, version) rows written after `since`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, version FROM state WHERE version > ? ORDER BY version", (since,)
+            ).fetchall()
+        return [(key, json.loads(value), version) for key, value, version in rows]
+
+    def clear(self) -> None:
+        """Only safe before the workers start: they track the highest version seen"""
+        with self._lock:
+            self._conn.execute("DELETE FROM state")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedState:
+    """
+    Runtime settings changed through the API (active provider, routing mode)
+    that must hold in every uvicorn worker, not only the one that served the
+    request.
+
+    A change is applied locally right away and written to the store; each
+    worker polls the store every `poll_interval` seconds and applies what
+    other workers wrote, so all workers agree within one interval. A worker
+    that (re)starts loads the current values first. Without a store path
+    the state stays process-local, as with a single worker.
+
+    Keys nobody registered (e.g. ingestion job progress) are not applied;
+    they are read on demand with `get`.
+    """
+
+    def __init__(self, path: Optional[str], poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._store: Optional[SQLiteStateStore] = None
+        self._appliers: Dict[str, Callable[[Any], None]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def store(self) -> SQLiteStateStore:
+        # Opened on first use, in the worker process (not in the launcher)
+        if self._store is None:
+            self._store = SQLiteStateStore(self.path)
+        return self._store
+
+    def register(self, key: str, apply: Callable[[Any], None]) -> None:
+        """`apply(value)` is called in every worker when `key` changes"""
+        self._appliers[key] = apply
+
+    async def set(self, key: str, value: Any) -> None:
+        """Publishes a value the caller has already applied in this worker"""
+        if self.enabled:
+            # The version is not advanced here: rows other workers wrote just
+            # before this one must still be picked up by the next sync
+            await run_sync(self.store.put, key, value)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """The value last written by any worker; None when absent or without a store"""
+        if not self.enabled:
+            return None
+        return await run_sync(self.store.get, key)
+
+    async def delete(self, key: str) -> None:
+        if self.enabled:
+            await run_sync(self.store.delete, key)
+
+    def _apply(self, changes: List[Tuple[str, Any, int]]) -> None:
+        for key, value, version in changes:
+            self.version = max(self.version, version)
+            apply = self._appliers.get(key)
+            if apply is None:
+                continue
+            try:
+                apply(value)
+            except Exception as e:
+                print(f"⚠️ Could not apply shared setting {key}={value!r}: {e}")
+
+    async def sync(self) -> None:
+        """Applies every change written since the last sync"""
+        if self.enabled:
+            self._apply(await run_sync(self.store.changes, self.version))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"⚠️ Shared state sync failed: {e}")
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await self.sync()
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+shared_state = SharedState(
+    path=settings.SHARED_STATE_DB_PATH or None,
+    poll_interval=settings.SHARED_STATE_POLL_INTERVAL
+)
@@ -0,0 +1,35 @@
+import json
+from typing import Any, AsyncIterator, Dict
+from fastapi.responses import StreamingResponse
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Formats a single Server-Sent Event frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sse_frames(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    try:
+        async for event in events:
+            payload = dict(event)
+            yield format_sse(payload.pop("type"), payload)
+    except Exception as e:
+        # Headers are already sent, so errors have to travel in-band
+        yield format_sse("error", {"detail": str(e)})
+
+
+def sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Wraps a service event stream ({"type": ..., **data}) in an SSE response.
+    """
+    return StreamingResponse(
+        _sse_frames(events),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering (nginx) so tokens reach the client immediately
+            "X-Accel-Buffering": "no",
+        },
+    )
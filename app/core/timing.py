@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.timing")
+if not logger.handlers:
+    # One JSON object per line on stderr, independent of uvicorn's log config
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class RequestTimings:
+    """Exclusive time per phase of one request (seconds), plus call counts"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.marks: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: every phase so far and the total until now"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: {"ms": round(seconds * 1000, 2), "count": self.counts[name]} for name, seconds in self.phases.items()}
+
+
+class _Frame:
+    def __init__(self):
+        self.children = 0.0
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_open_phases: ContextVar[Tuple[_Frame, ...]] = ContextVar("open_phases", default=())
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Adds a measured duration to the current request, if any"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Times a block as `name` in the current request. Phases nest: a phase's
+    time excludes the phases opened inside it, so the breakdown adds up.
+    Only for blocks that open and close in the same task (not across the
+    yields of an async generator); use `record` there.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    frame = _Frame()
+    parents = _open_phases.get()
+    token = _open_phases.set(parents + (frame,))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _open_phases.reset(token)
+        # Concurrent children (e.g. hedged calls) can exceed the parent's wall time
+        timings.add(name, max(0.0, elapsed - frame.children))
+        if parents:
+            parents[-1].children += elapsed
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Path template of the matched route, "unmatched" for 404s. Newer FastAPI
+    keeps included routers unflattened, so scope["route"].path lacks the
+    router prefix there and the effective route context has the full path.
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        timings = _timings.get()
+        if timings is None:
+            return await endpoint(*args, **kwargs)
+        timings.mark("endpoint_start")
+        try:
+            with phase("handler"):
+                return await endpoint(*args, **kwargs)
+        finally:
+            timings.mark("endpoint_end")
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits a request into `parse` (body read + validation),
+    `handler` (the endpoint, minus the phases recorded inside it) and
+    `serialize` (response model validation + rendering).
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Any) -> Any:
+            timings = _timings.get()
+            if timings is None:
+                return await handler(request)
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                end = time.perf_counter()
+                endpoint_start = timings.marks.pop("endpoint_start", None)
+                endpoint_end = timings.marks.pop("endpoint_end", None)
+                if endpoint_start is not None:
+                    timings.add("parse", endpoint_start - start)
+                if endpoint_end is not None:
+                    timings.add("serialize", end - endpoint_end)
+
+        return timed_handler
+
+
+class TimingMiddleware:
+    """
+    Creates the per-request timings, returns them as a Server-Timing header
+    and logs them as one JSON line when the request completes. For streamed
+    responses the header is sent before the upstream call runs, so only the
+    log has the full breakdown.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            total_ms = timings.elapsed() * 1000
+            if settings.REQUEST_LOG_ENABLED and total_ms >= settings.REQUEST_LOG_MIN_MS:
+                logger.info(json.dumps({
+                    "event": "request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_template(scope),
+                    "status": status["code"],
+                    "total_ms": round(total_ms, 2),
+                    "phases": timings.to_dict(),
+                }))
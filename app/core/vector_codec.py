@@ -0,0 +1,91 @@
+"""
+Compact vector encodings for API responses.
+
+Binary layout (all little-endian):
+
+    offset  size  field
+    0       4     magic  b"VECS"
+    4       1     version (1)
+    5       1     dtype code (1 = float32, 2 = float16)
+    6       2     reserved
+    8       4     rows (uint32)
+    12      4     dimension (uint32)
+    16      ...   rows * dimension values, row-major
+
+Base64 encoding packs a single vector's raw little-endian values (no header)
+into a string inside a normal JSON body.
+"""
+import base64
+import struct
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"VECS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHII")
+
+DTYPES = {
+    "float32": (1, np.dtype("<f4")),
+    "float16": (2, np.dtype("<f2")),
+}
+_DTYPE_BY_CODE = {code: dtype for code, dtype in DTYPES.values()}
+
+OCTET_STREAM = "application/octet-stream"
+ENCODINGS = ("json", "base64", "binary")
+
+
+def encode_vectors(vectors: Sequence[Optional[Sequence[float]]], dtype: str = "float32") -> bytes:
+    """
+    Packs a list of equally sized vectors into the binary format.
+    Missing (None) rows are filled with NaN so row indices stay aligned.
+    """
+    code, np_dtype = DTYPES[dtype]
+    dimension = next((len(v) for v in vectors if v is not None), 0)
+    if all(v is not None for v in vectors):
+        matrix = np.asarray(vectors, dtype=np_dtype).reshape(len(vectors), dimension)
+    else:
+        matrix = np.full((len(vectors), dimension), np.nan, dtype=np_dtype)
+        for row, vector in enumerate(vectors):
+            if vector is not None:
+                matrix[row] = vector
+    return HEADER.pack(MAGIC, VERSION, code, 0, len(vectors), dimension) + matrix.tobytes()
+
+
+def decode_vectors(data: bytes) -> np.ndarray:
+    """
+    Unpacks the binary format into a (rows, dimension) float32 array.
+    """
+    magic, version, code, _, rows, dimension = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a vector payload (bad magic or version)")
+    matrix = np.frombuffer(data, dtype=_DTYPE_BY_CODE[code], count=rows * dimension, offset=HEADER.size)
+    return matrix.reshape(rows, dimension).astype(np.float32)
+
+
+def encode_base64(vector: Sequence[float], dtype: str = "float32") -> str:
+    return base64.b64encode(np.asarray(vector, dtype=DTYPES[dtype][1]).tobytes()).decode("ascii")
+
+
+def decode_base64(data: str, dtype: str = "float32") -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=DTYPES[dtype][1]).astype(np.float32)
+
+
+def negotiate(accept: Optional[str], encoding: Optional[str], dtype: Optional[str]) -> Tuple[str, str]:
+    """
+    Resolves the response encoding from the `encoding` query parameter, falling
+    back to the Accept header (application/octet-stream means binary).
+    Returns (encoding, dtype); raises ValueError for unsupported values.
+    """
+    dtype = dtype or "float32"
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Use one of: {', '.join(DTYPES)}")
+
+    if encoding:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding '{encoding}'. Use one of: {', '.join(ENCODINGS)}")
+        return encoding, dtype
+
+    if accept and OCTET_STREAM in accept:
+        return "binary", dtype
+    return "json", dtype
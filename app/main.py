@@ -1,12 +1,56 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.api.v1.api import api_router
+from app.api.metrics import router as metrics_router
 from app.core.config import settings
+from app.core.concurrency import shutdown_executor
+from app.core.metrics import MetricsMiddleware, shutdown_metrics
+from app.core.timing import TimingMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.shared_state import shared_state
+from app.repositories.async_qdrant_repo import async_qdrant_repo
+from app.services.llm_manager import llm_manager
+from app.services.health_prober import health_prober
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.token_counter import ContextWindowExceeded
+from app.services.provider_router import ProviderUnavailable
+
+def warm_up(providers):
+    """
+    Builds the WARMUP_PROVIDERS ahead of the first request ("qdrant" creates
+    the Qdrant client). Failures are reported but do not stop startup.
+    """
+    if "qdrant" in providers:
+        async_qdrant_repo.client
+    results = llm_manager.warm_up(p for p in providers if p != "qdrant")
+    for name, error in results.items():
+        if error:
+            print(f"⚠️ Warm-up of provider '{name}' failed: {error}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    providers = [p.strip() for p in settings.WARMUP_PROVIDERS.split(",") if p.strip()]
+    # Adopt the provider/routing settings other workers already changed
+    await shared_state.start()
+    if providers:
+        warm_up(providers)
+    if settings.HEALTH_PROBE_ENABLED:
+        health_prober.start()
+    yield
+    await health_prober.stop()
+    await shared_state.stop()
+    await async_qdrant_repo.close()
+    shutdown_executor()
+    shutdown_metrics()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set all CORS enabled origins
@@ -18,7 +62,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    # Our own limiter queue timed out: tell the client when to come back
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(ProviderUnavailable)
+async def provider_unavailable_handler(request: Request, exc: ProviderUnavailable):
+    # Every routed provider has an open circuit breaker
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(ContextWindowExceeded)
+async def context_window_exceeded_handler(request: Request, exc: ContextWindowExceeded):
+    # Rejected before any upstream call
+    return JSONResponse(
+        status_code=400,
+        content={
+            "detail": str(exc),
+            "prompt_tokens": exc.prompt_tokens,
+            "max_tokens": exc.max_tokens,
+            "context_window": exc.context_window,
+            "max_output_tokens": exc.max_output_tokens
+        }
+    )
+
+# Added last = outermost: profiling sees the whole request, timing wraps metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.REQUEST_TIMING_ENABLED:
+    app.add_middleware(TimingMiddleware)
+if settings.PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.include_router(metrics_router)
 
 @app.get("/")
 async def root():
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Dict, Literal
 
 class EmbeddingRequest(BaseModel):
     text: str
@@ -12,8 +12,26 @@ class BatchEmbeddingRequest(BaseModel):
     texts: List[str]
     dimension: int = 768
 
+class FailedEmbedding(BaseModel):
+    index: int
+    error: str
+
 class BatchEmbeddingResponse(BaseModel):
-    vectors: List[List[float]]
+    # Input order is preserved; items that failed are None and listed in `failed`
+    vectors: List[Optional[List[float]]]
+    failed: List[FailedEmbedding] = []
+
+class EncodedEmbeddingResponse(BaseModel):
+    # Base64 of the raw little-endian values (encoding=base64)
+    vector: str
+    dtype: str
+    dimension: int
+
+class EncodedBatchEmbeddingResponse(BaseModel):
+    vectors: List[Optional[str]]
+    dtype: str
+    dimension: int
+    failed: List[FailedEmbedding] = []
 
 class HealthResponse(BaseModel):
     status: str
@@ -23,15 +41,67 @@ class ItemFetchRequest(BaseModel):
     collection_name: str
     limit: int = 100
 
+class IngestionStatus(BaseModel):
+    job_id: str
+    collection_name: str
+    status: str  # pending, running, completed, failed, cancelled
+    lines_read: int
+    lines_skipped: int
+    records_embedded: int
+    records_upserted: int
+    records_failed: int
+    batches_upserted: int
+    elapsed_seconds: Optional[float] = None
+    records_per_second: Optional[float] = None
+    error: Optional[str] = None
+
+class SearchRequest(BaseModel):
+    collection_name: str
+    query: str
+    limit: int = 10
+    dimension: int = 768
+    # Native Qdrant filter or shorthand {"field": value | [values] | {"gte": ..}}
+    filter: Optional[Dict[str, Any]] = None
+    score_threshold: Optional[float] = None
+    # True/False, or a list of payload fields to return
+    with_payload: bool | List[str] = True
+
+class BatchSearchRequest(BaseModel):
+    collection_name: str
+    queries: List[str]
+    limit: int = 10
+    dimension: int = 768
+    filter: Optional[Dict[str, Any]] = None
+    score_threshold: Optional[float] = None
+    with_payload: bool | List[str] = True
+
+class SearchHit(BaseModel):
+    id: int | str
+    score: float
+    payload: Optional[Dict[str, Any]] = None
+
+class SearchResponse(BaseModel):
+    hits: List[SearchHit]
+
+class BatchSearchResponse(BaseModel):
+    # One ranked hit list per query, in query order
+    results: List[List[SearchHit]]
+
 class GenerationRequest(BaseModel):
     prompt: str
     model: Optional[str] = None
     max_tokens: Optional[int] = 512
     temperature: Optional[float] = 0.7
+    stream: bool = False
+    cache: bool = True # set False to bypass the response caches
+    cache_refresh: bool = False # skip the cache lookup but store the fresh answer
+    # Prompt + max_tokens over the model's limits: "reject" (400) or "trim"; None = TOKEN_OVERFLOW_POLICY
+    overflow: Optional[Literal["reject", "trim"]] = None
 
 class GenerationResponse(BaseModel):
     text: str
     model: str
+    cached: bool = False
 
 class ChatMessage(BaseModel):
     role: str
@@ -40,16 +110,46 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     model: Optional[str] = None
-    provider: Optional[str] = None # "gemini" or "litellm"
+    provider: Optional[str] = None # "gemini", "litellm" or "local"; None = active provider, or routed in "latency" mode
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = None
+    stream: bool = False
+    cache: bool = True # set False to bypass the response caches
+    cache_refresh: bool = False # skip the cache lookup but store the fresh answer
+    # Server-side history: send only the new turn; the server adds the earlier ones
+    conversation_id: Optional[str] = Field(None, min_length=1, max_length=128)
+    # "trim" drops the oldest turns (and lowers max_tokens) to fit; None = TOKEN_OVERFLOW_POLICY
+    overflow: Optional[Literal["reject", "trim"]] = None
 
 class TokenUsage(BaseModel):
     prompt_tokens: int
     completion_tokens: int
     total_tokens: int
+    # Prompt tokens served from a provider-side context cache
+    cached_tokens: int = 0
 
 class ChatResponse(BaseModel):
     content: str
     model: str
+    provider: Optional[str] = None # the provider that answered (relevant when routed)
     usage: Optional[TokenUsage] = None
+    cached: bool = False
+    conversation_id: Optional[str] = None
+
+class TokenCountRequest(BaseModel):
+    # Either chat messages or a single generation prompt
+    messages: Optional[List[ChatMessage]] = None
+    prompt: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+
+class TokenCountResponse(BaseModel):
+    model: str
+    tokenizer: str # "tiktoken:<encoding>" or "estimate" (calibrated from provider usage)
+    prompt_tokens: int
+    message_tokens: Optional[List[int]] = None
+    max_tokens: Optional[int] = None
+    context_window: int
+    max_output_tokens: int
+    fits: bool
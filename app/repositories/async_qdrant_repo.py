@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Union
+from app.core.metrics import observe_qdrant
+from app.repositories.qdrant_repo import PayloadSelector, qdrant_client_options, query_requests, vector_params
+
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient
+    from qdrant_client.http import models
+
+class AsyncQdrantRepository:
+    """
+    Async counterpart of QdrantRepository built on AsyncQdrantClient, so Qdrant
+    calls from `async def` endpoints never block the event loop. Uses REST or
+    gRPC (QDRANT_PREFER_GRPC) with a pooled connection set (QDRANT_POOL_SIZE).
+    Like the sync repository, the client is created on first use.
+    """
+
+    def __init__(self, client: Optional[AsyncQdrantClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        if self._client is None:
+            from qdrant_client import AsyncQdrantClient
+            self._client = AsyncQdrantClient(**qdrant_client_options())
+        return self._client
+
+    @observe_qdrant("upsert")
+    async def upsert_data(self, collection_name: str, points: List[models.PointStruct]):
+        return await self.client.upsert(
+            collection_name=collection_name,
+            points=points
+        )
+
+    @observe_qdrant("scroll")
+    async def fetch_all(
+        self,
+        collection_name: str,
+        limit: int = 100,
+        with_payload: PayloadSelector = True,
+        with_vectors: bool = False,
+        offset: Optional[Union[int, str]] = None,
+        scroll_filter: Optional[models.Filter] = None
+    ):
+        """
+        One page of a scroll. Pass the returned next_page_offset back as
+        `offset` to continue; it is None on the last page.
+        """
+        return await self.client.scroll(
+            collection_name=collection_name,
+            limit=limit,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            offset=offset,
+            scroll_filter=scroll_filter
+        )
+
+    @observe_qdrant("query")
+    async def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        limit: int = 10,
+        query_filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: PayloadSelector = True
+    ) -> List[models.ScoredPoint]:
+        response = await self.client.query_points(
+            collection_name=collection_name,
+            query=query_vector,
+            query_filter=query_filter,
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=with_payload
+        )
+        return response.points
+
+    @observe_qdrant("query_batch")
+    async def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        limit: int = 10,
+        query_filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: PayloadSelector = True
+    ) -> List[List[models.ScoredPoint]]:
+        """
+        Runs all queries in a single round trip via Qdrant's batch query API.
+        """
+        requests = query_requests(query_vectors, limit, query_filter, score_threshold, with_payload)
+        responses = await self.client.query_batch_points(collection_name=collection_name, requests=requests)
+        return [response.points for response in responses]
+
+    @observe_qdrant("delete")
+    async def delete_points(self, collection_name: str, points_filter: models.Filter):
+        """
+        Deletes every point matching the filter.
+        """
+        from qdrant_client.http import models
+
+        return await self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=points_filter)
+        )
+
+    @observe_qdrant("create_collection")
+    async def create_collection(self, collection_name: str, vector_size: int, distance: str = "Cosine"):
+        if await self.client.collection_exists(collection_name):
+            await self.client.delete_collection(collection_name)
+        return await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vector_params(vector_size, distance),
+        )
+
+    @observe_qdrant("collection_exists")
+    async def collection_exists(self, collection_name: str) -> bool:
+        return await self.client.collection_exists(collection_name)
+
+    @observe_qdrant("ensure_collection")
+    async def ensure_collection(self, collection_name: str, vector_size: int, distance: str = "Cosine") -> bool:
+        """
+        Creates the collection if it does not exist (never drops data).
+        Returns True if it was created.
+        """
+        if await self.client.collection_exists(collection_name):
+            return False
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vector_params(vector_size, distance),
+        )
+        return True
+
+    @observe_qdrant("health_check")
+    async def health_check(self) -> bool:
+        try:
+            # Try to get collections as a simple health check
+            await self.client.get_collections()
+            return True
+        except Exception:
+            return False
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+
+async_qdrant_repo = AsyncQdrantRepository()
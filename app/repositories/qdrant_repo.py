@@ -1,20 +1,120 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from typing import List, Optional, Dict, Any, Tuple
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Tuple, Union
 from app.core.config import settings
 
-class QdrantRepository:
-    def __init__(self):
-        if settings.ENVIRONMENT.lower() == "prod":
-            self.client = QdrantClient(
-                url=settings.QDRANT_URL,
-                api_key=settings.QDRANT_API_KEY,
-            )
+if TYPE_CHECKING:
+    # qdrant_client takes about a second to import; it is loaded on first use
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
+PayloadSelector = Union[bool, List[str]]
+
+_RANGE_KEYS = {"gt", "gte", "lt", "lte"}
+
+def build_filter(spec: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+    """
+    Builds a Qdrant filter from either a native filter body
+    ({"must": [...], "should": [...], "must_not": [...]}) or a shorthand map
+    where every entry must match:
+        {"color": "red"}                    -> exact match
+        {"color": ["red", "blue"]}          -> match any
+        {"price": {"gte": 10, "lt": 20}}    -> range
+    Raises ValueError for malformed specs.
+    """
+    if spec is None:
+        return None
+    if not isinstance(spec, dict):
+        raise ValueError("Filter must be a JSON object")
+    if not spec:
+        return None
+    from qdrant_client.http import models
+
+    if set(spec) & {"must", "should", "must_not", "min_should"}:
+        return models.Filter(**spec)
+
+    conditions = []
+    for key, value in spec.items():
+        if isinstance(value, dict):
+            if not value or not set(value) <= _RANGE_KEYS:
+                raise ValueError(f"Range for '{key}' must only use {sorted(_RANGE_KEYS)}")
+            conditions.append(models.FieldCondition(key=key, range=models.Range(**value)))
+        elif isinstance(value, list):
+            conditions.append(models.FieldCondition(key=key, match=models.MatchAny(any=value)))
         else:
-            self.client = QdrantClient(
-                host=settings.QDRANT_HOST,
-                port=settings.QDRANT_PORT
-            )
+            conditions.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    return models.Filter(must=conditions)
+
+def qdrant_client_options() -> Dict[str, Any]:
+    """
+    Connection options shared by the sync and async clients.
+    QDRANT_LOCATION (":memory:" or a directory) selects Qdrant's local in-process mode.
+    """
+    if settings.QDRANT_LOCATION:
+        if settings.QDRANT_LOCATION == ":memory:":
+            return {"location": ":memory:"}
+        return {"path": settings.QDRANT_LOCATION}
+
+    if settings.ENVIRONMENT.lower() == "prod":
+        options: Dict[str, Any] = {"url": settings.QDRANT_URL, "api_key": settings.QDRANT_API_KEY}
+    else:
+        options = {"host": settings.QDRANT_HOST, "port": settings.QDRANT_PORT}
+
+    options.update(
+        # The version check is a blocking request made while constructing the client
+        check_compatibility=False,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        timeout=settings.QDRANT_TIMEOUT,
+        pool_size=settings.QDRANT_POOL_SIZE
+    )
+    return options
+
+def vector_params(vector_size: int, distance: str) -> models.VectorParams:
+    from qdrant_client.http import models
+
+    dist_map = {
+        "Cosine": models.Distance.COSINE,
+        "Dot": models.Distance.DOT,
+        "Euclid": models.Distance.EUCLID
+    }
+    return models.VectorParams(size=vector_size, distance=dist_map.get(distance, models.Distance.COSINE))
+
+def query_requests(
+    query_vectors: List[List[float]],
+    limit: int,
+    query_filter: Optional[models.Filter],
+    score_threshold: Optional[float],
+    with_payload: PayloadSelector
+) -> List[models.QueryRequest]:
+    from qdrant_client.http import models
+
+    return [
+        models.QueryRequest(
+            query=vector,
+            filter=query_filter,
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=with_payload
+        )
+        for vector in query_vectors
+    ]
+
+class QdrantRepository:
+    """
+    The client (and the qdrant_client package) is created on first use, so
+    importing this module stays cheap.
+    """
+
+    def __init__(self, client: Optional[QdrantClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> QdrantClient:
+        if self._client is None:
+            from qdrant_client import QdrantClient
+            self._client = QdrantClient(**qdrant_client_options())
+        return self._client
 
     def upsert_data(self, collection_name: str, points: List[models.PointStruct]):
         return self.client.upsert(
@@ -22,32 +122,94 @@ class QdrantRepository:
             points=points
         )
 
-    def fetch_all(self, collection_name: str, limit: int = 100, with_payload: bool = True, with_vectors: bool = False):
+    def fetch_all(
+        self,
+        collection_name: str,
+        limit: int = 100,
+        with_payload: PayloadSelector = True,
+        with_vectors: bool = False,
+        offset: Optional[Union[int, str]] = None,
+        scroll_filter: Optional[models.Filter] = None
+    ):
+        """
+        One page of a scroll. Pass the returned next_page_offset back as
+        `offset` to continue; it is None on the last page.
+        """
         return self.client.scroll(
             collection_name=collection_name,
             limit=limit,
             with_payload=with_payload,
-            with_vectors=with_vectors
+            with_vectors=with_vectors,
+            offset=offset,
+            scroll_filter=scroll_filter
         )
 
-    def search(self, collection_name: str, query_vector: List[float], limit: int = 10):
-        return self.client.search(
+    def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        limit: int = 10,
+        query_filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: PayloadSelector = True
+    ) -> List[models.ScoredPoint]:
+        return self.client.query_points(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit
+            query=query_vector,
+            query_filter=query_filter,
+            limit=limit,
+            score_threshold=score_threshold,
+            with_payload=with_payload
+        ).points
+
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: List[List[float]],
+        limit: int = 10,
+        query_filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: PayloadSelector = True
+    ) -> List[List[models.ScoredPoint]]:
+        """
+        Runs all queries in a single round trip via Qdrant's batch query API.
+        """
+        requests = query_requests(query_vectors, limit, query_filter, score_threshold, with_payload)
+        responses = self.client.query_batch_points(collection_name=collection_name, requests=requests)
+        return [response.points for response in responses]
+
+    def delete_points(self, collection_name: str, points_filter: models.Filter):
+        """
+        Deletes every point matching the filter.
+        """
+        from qdrant_client.http import models
+
+        return self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=points_filter)
         )
 
     def create_collection(self, collection_name: str, vector_size: int, distance: str = "Cosine"):
-        dist_map = {
-            "Cosine": models.Distance.COSINE,
-            "Dot": models.Distance.DOT,
-            "Euclid": models.Distance.EUCLID
-        }
-        
         return self.client.recreate_collection(
             collection_name=collection_name,
-            vectors_config=models.VectorParams(size=vector_size, distance=dist_map.get(distance, models.Distance.COSINE)),
+            vectors_config=vector_params(vector_size, distance),
+        )
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return self.client.collection_exists(collection_name)
+
+    def ensure_collection(self, collection_name: str, vector_size: int, distance: str = "Cosine") -> bool:
+        """
+        Creates the collection if it does not exist (never drops data).
+        Returns True if it was created.
+        """
+        if self.client.collection_exists(collection_name):
+            return False
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vector_params(vector_size, distance),
         )
+        return True
 
     def health_check(self) -> bool:
         try:
@@ -0,0 +1,333 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.provider_router import CALLER_ERRORS, ProviderUnavailable, Route, is_caller_error, provider_router
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.response_cache import ResponseCache, canonical_messages, make_response_key
+from app.services.semantic_cache import SemanticCache, SemanticCacheKey
+from app.services.token_counter import ContextWindowExceeded, token_counter
+
+
+class CacheKeys:
+    """Keys of one request in each response cache (None = not cacheable there)"""
+
+    def __init__(self, exact: Optional[str] = None, semantic: Optional[SemanticCacheKey] = None):
+        self.exact = exact
+        self.semantic = semantic
+
+
+class CompletionService:
+    """
+    Chat and generation entry point used by the endpoints: resolves the
+    provider, consults the response caches and calls the model.
+
+    Unpinned requests in "latency" routing mode try the providers ranked by
+    provider_router, failing over to the next one when a call fails (streams
+    only before their first event). Results carry the `provider` that answered.
+
+    Two caches are consulted in order: the exact-match cache (temperature 0
+    requests only) and the semantic cache. Results are dicts shaped like the
+    services' own (`content`/`text`, `model`, `usage`) plus `cached`, which is
+    True when the answer came from a cache; hits keep the original usage.
+
+    `use_cache=False` bypasses both caches; `refresh=True` skips the lookup
+    but stores the fresh answer.
+
+    `overflow` ("reject" or "trim", see token_counter.preflight) checks the
+    request against each route's own model before it is sent; a routed
+    request that does not fit one model moves on to the next route.
+    """
+
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None, response_cache: Optional[ResponseCache] = None):
+        self.semantic_cache = semantic_cache
+        self.response_cache = response_cache
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _service(provider: Optional[str]) -> Any:
+        from app.services.llm_manager import llm_manager
+        return llm_manager.get_service(provider)
+
+    @staticmethod
+    def _routes(provider: Optional[str], config: Dict[str, Any]) -> tuple:
+        """(routes, routed): the (provider, model) pairs to try, and whether they were ranked"""
+        from app.services.llm_manager import llm_manager
+        model = config.get("model")
+        return llm_manager.routes(provider, model), llm_manager.is_routed(provider, model)
+
+    @staticmethod
+    def _record_failure(provider: str, model: str, start: float, error: Exception) -> None:
+        if is_caller_error(error):
+            # A malformed request must not open the circuit for everyone else
+            provider_router.release(provider, model)
+            return
+        provider_router.record(provider, model, time.monotonic() - start, error)
+
+    @staticmethod
+    def _budget(service: Any, config: Dict[str, Any], overflow: Optional[str], messages: Optional[List[Any]] = None, prompt: Optional[str] = None) -> tuple:
+        """(messages, config) fitted to the route's model; unchanged when overflow is None"""
+        if overflow is None:
+            return messages, config
+        budget = token_counter.preflight(
+            config.get("model") or service.model_name,
+            messages=messages,
+            prompt=prompt,
+            max_tokens=config.get("max_output_tokens"),
+            policy=overflow
+        )
+        if budget["max_tokens"] != config.get("max_output_tokens"):
+            config = {**config, "max_output_tokens": budget["max_tokens"]}
+        return budget["messages"], config
+
+    async def _timed(self, provider: str, model: str, call: Awaitable[Any]) -> Any:
+        """Awaits an upstream call, feeding its latency and outcome to the router"""
+        start = time.monotonic()
+        try:
+            result = await call
+        except RateLimitExceeded:
+            # Our own queue, not the provider's health
+            raise
+        except Exception as e:
+            self._record_failure(provider, model, start, e)
+            raise
+        provider_router.record(provider, model, time.monotonic() - start)
+        return result
+
+    async def _timed_stream(self, provider: str, model: str, events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Like _timed for streams; latency is the time to the first event"""
+        start = time.monotonic()
+        first = True
+        try:
+            async for event in events:
+                if first:
+                    provider_router.record(provider, model, time.monotonic() - start)
+                    first = False
+                yield event
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            self._record_failure(provider, model, start, e)
+            raise
+
+    async def _attempt(self, routes: List[Route], routed: bool, attempt: Callable[[str, Any], Awaitable[Any]]) -> Any:
+        """
+        Runs `attempt(provider, service)` on each route in turn until one
+        succeeds. Caller errors (bad input) raised by the call are raised
+        without failover; so is a request too large for a pinned route's
+        model. A provider that cannot be built counts as a failed route.
+        """
+        error: Optional[Exception] = None
+        for provider, model in routes:
+            if routed and not provider_router.acquire((provider, model)):
+                continue
+            start = time.monotonic()
+            try:
+                service = self._service(provider)
+            except Exception as e:
+                # e.g. a missing API key (a ValueError): the provider's fault, not the request's
+                provider_router.record(provider, model, time.monotonic() - start, e)
+                error = e
+                if routed:
+                    print(f"⚠️ Provider {provider} could not be loaded, trying the next one: {e}")
+                continue
+            try:
+                return await attempt(provider, service)
+            except CALLER_ERRORS:
+                raise
+            except ContextWindowExceeded as e:
+                # Says nothing about the provider's health; a larger model may still fit it
+                if not routed:
+                    raise
+                provider_router.release(provider, model)
+                error = e
+            except Exception as e:
+                error = e
+                if routed:
+                    print(f"⚠️ Provider {provider} failed, trying the next one: {e}")
+        if error is None:
+            raise ProviderUnavailable([p for p, _ in routes], provider_router.reset_timeout)
+        raise error
+
+    async def _attempt_stream(self, routes: List[Route], routed: bool, attempt: Callable[[str, Any], Awaitable[AsyncIterator[Dict[str, Any]]]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming _attempt: a route is abandoned only before its first event,
+        since a partial answer cannot be taken back.
+        """
+        async def first_event(provider: str, service: Any) -> tuple:
+            events = (await attempt(provider, service)).__aiter__()
+            try:
+                return events, await events.__anext__()
+            except StopAsyncIteration:
+                return events, None
+
+        events, first = await self._attempt(routes, routed, first_event)
+        if first is None:
+            return
+        yield first
+        async for event in events:
+            yield event
+
+    def _keys(self, provider: str, service: Any, config: Dict[str, Any], messages: Optional[List[Any]] = None, prompt: Optional[str] = None) -> CacheKeys:
+        model = config.get("model") or service.model_name
+        keys = CacheKeys()
+
+        # Only deterministic requests are safe to replay verbatim
+        if self.response_cache is not None and config.get("temperature") == 0:
+            if messages is not None:
+                keys.exact = make_response_key("chat", provider, model, canonical_messages(messages), config)
+            else:
+                keys.exact = make_response_key("generate", provider, model, prompt, config)
+
+        if self.semantic_cache is not None:
+            try:
+                if messages is not None:
+                    keys.semantic = self.semantic_cache.key_for_chat(provider, model, messages, config)
+                else:
+                    keys.semantic = self.semantic_cache.key_for_prompt(provider, model, prompt, config)
+            except Exception as e:
+                print(f"⚠️ Semantic cache unavailable: {e}")
+        return keys
+
+    async def _lookup(self, keys: CacheKeys) -> Optional[Dict[str, Any]]:
+        if keys.exact:
+            hit = await self.response_cache.get(keys.exact)
+            if hit:
+                return hit
+        if keys.semantic:
+            return await self.semantic_cache.lookup(keys.semantic)
+        return None
+
+    def _spawn(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _store(self, keys: CacheKeys, response: Dict[str, Any]) -> None:
+        """Stores in the background so the caller is answered first"""
+        if keys.exact:
+            self._spawn(self.response_cache.put(keys.exact, response))
+        if keys.semantic:
+            self.semantic_cache.store_later(keys.semantic, response)
+
+    async def _prepare(self, provider: str, service: Any, config: Dict[str, Any], use_cache: bool, refresh: bool, **payload) -> tuple:
+        """Returns (keys, hit) for a request"""
+        keys = self._keys(provider, service, config, **payload) if use_cache else CacheKeys()
+        hit = None if refresh else await self._lookup(keys)
+        return keys, hit
+
+    @staticmethod
+    async def _replay(hit: Dict[str, Any], provider: str) -> AsyncIterator[Dict[str, Any]]:
+        """A cached answer as a one-delta stream"""
+        yield {"type": "delta", "content": hit["content"]}
+        yield {"type": "done", "usage": hit.get("usage"), "model": hit["model"], "provider": provider, "cached": True}
+
+    async def _recorded(self, keys: CacheKeys, provider: str, events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Passes a live stream through, storing the full answer once it is done"""
+        parts: List[str] = []
+        async for event in events:
+            if event["type"] == "delta":
+                parts.append(event["content"])
+            elif event["type"] == "done":
+                event = {**event, "provider": provider, "cached": False}
+                self._store(keys, {"content": "".join(parts), "model": event["model"], "usage": event.get("usage")})
+            yield event
+
+    async def chat(self, messages: List[Any], provider: Optional[str] = None, config: Optional[Dict[str, Any]] = None, use_cache: bool = True, refresh: bool = False, overflow: Optional[str] = None) -> Dict[str, Any]:
+        config = config or {}
+        routes, routed = self._routes(provider, config)
+
+        async def attempt(name: str, service: Any) -> Dict[str, Any]:
+            route_messages, route_config = self._budget(service, config, overflow, messages=messages)
+            keys, hit = await self._prepare(name, service, route_config, use_cache, refresh, messages=route_messages)
+            if hit:
+                return {"content": hit["content"], "model": hit["model"], "usage": hit.get("usage"), "provider": name, "cached": True}
+
+            model = route_config.get("model") or service.model_name
+            result = await self._timed(name, model, service.chat_with_usage(route_messages, config=route_config))
+            self._store(keys, {"content": result["content"], "model": result["model"], "usage": result.get("usage")})
+            # A hedge answered by the alternate provider reports it
+            return {"provider": name, **result, "cached": False}
+
+        return await self._attempt(routes, routed, attempt)
+
+    async def stream_chat(self, messages: List[Any], provider: Optional[str] = None, config: Optional[Dict[str, Any]] = None, use_cache: bool = True, refresh: bool = False, overflow: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        config = config or {}
+        routes, routed = self._routes(provider, config)
+
+        async def attempt(name: str, service: Any) -> AsyncIterator[Dict[str, Any]]:
+            route_messages, route_config = self._budget(service, config, overflow, messages=messages)
+            keys, hit = await self._prepare(name, service, route_config, use_cache, refresh, messages=route_messages)
+            if hit:
+                return self._replay(hit, name)
+            model = route_config.get("model") or service.model_name
+            events = self._timed_stream(name, model, service.stream_chat_with_usage(route_messages, config=route_config))
+            return self._recorded(keys, name, events)
+
+        async for event in self._attempt_stream(routes, routed, attempt):
+            yield event
+
+    async def generate(self, prompt: str, config: Optional[Dict[str, Any]] = None, use_cache: bool = True, refresh: bool = False, overflow: Optional[str] = None) -> Dict[str, Any]:
+        config = config or {}
+        routes, routed = self._routes(None, config)
+
+        async def attempt(name: str, service: Any) -> Dict[str, Any]:
+            # A prompt cannot be trimmed: "trim" only lowers max_tokens
+            _, route_config = self._budget(service, config, overflow, prompt=prompt)
+            keys, hit = await self._prepare(name, service, route_config, use_cache, refresh, prompt=prompt)
+            if hit:
+                return {"text": hit["content"], "model": hit["model"], "cached": True}
+
+            text = await self._timed(name, service.model_name, service.generate_content(prompt, config=route_config))
+            self._store(keys, {"content": text, "model": service.model_name, "usage": None})
+            return {"text": text, "model": service.model_name, "cached": False}
+
+        return await self._attempt(routes, routed, attempt)
+
+    async def stream_generate(self, prompt: str, config: Optional[Dict[str, Any]] = None, use_cache: bool = True, refresh: bool = False, overflow: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        config = config or {}
+        routes, routed = self._routes(None, config)
+
+        async def attempt(name: str, service: Any) -> AsyncIterator[Dict[str, Any]]:
+            _, route_config = self._budget(service, config, overflow, prompt=prompt)
+            keys, hit = await self._prepare(name, service, route_config, use_cache, refresh, prompt=prompt)
+            if hit:
+                return self._replay(hit, name)
+            events = self._timed_stream(name, service.model_name, service.stream_generate_content(prompt, config=route_config))
+            return self._recorded(keys, name, events)
+
+        async for event in self._attempt_stream(routes, routed, attempt):
+            yield event
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exact": {"enabled": False} if self.response_cache is None else {"enabled": True, **self.response_cache.stats()},
+            "semantic": {"enabled": False} if self.semantic_cache is None else {"enabled": True, **self.semantic_cache.stats()},
+        }
+
+
+def _semantic_cache() -> Optional[SemanticCache]:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    from app.repositories.async_qdrant_repo import async_qdrant_repo
+    return SemanticCache(
+        repo=async_qdrant_repo,
+        collection_name=settings.SEMANTIC_CACHE_COLLECTION,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL,
+        dimension=settings.SEMANTIC_CACHE_DIMENSION,
+        embedding_provider=settings.SEMANTIC_CACHE_EMBEDDING_PROVIDER or None
+    )
+
+
+def _response_cache() -> Optional[ResponseCache]:
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    return ResponseCache(
+        max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+        db_path=settings.RESPONSE_CACHE_DB_PATH or None
+    )
+
+
+completion_service = CompletionService(semantic_cache=_semantic_cache(), response_cache=_response_cache())
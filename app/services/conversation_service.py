@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.concurrency import run_sync
+from app.services.token_counter import token_counter
+
+SUMMARY_INSTRUCTION = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new messages into the existing summary. Keep facts, names, numbers, decisions "
+    "and open questions; drop pleasantries. Reply with the updated summary only."
+)
+
+
+def _as_dict(message: Any) -> Dict[str, Any]:
+    m = message.model_dump() if hasattr(message, "model_dump") else dict(message)
+    role = m.get("role") or "user"
+    # The Chat page (and Gemini) call assistant turns "model"
+    return {"role": "assistant" if role == "model" else role, "content": m.get("content") or m.get("parts") or ""}
+
+
+def _tokens(content: Any, model: str) -> int:
+    return token_counter.count_text(content if isinstance(content, str) else json.dumps(content), model)
+
+
+class SQLiteConversationStore:
+    """
+    Append-only message log per conversation, plus one rolling summary row
+    per conversation covering its messages up to `upto_seq`. Calls are
+    blocking and are expected to run on the shared thread pool.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "tokens INTEGER NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (conversation_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "conversation_id TEXT PRIMARY KEY, upto_seq INTEGER NOT NULL, content TEXT NOT NULL, "
+            "tokens INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def append(self, conversation_id: str, messages: List[Dict[str, Any]], model: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            # Serializes concurrent appends (other workers included) on seq
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()[0]
+                self._conn.executemany(
+                    "INSERT INTO messages (conversation_id, seq, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (conversation_id, seq + i + 1, m["role"], json.dumps(m["content"]), _tokens(m["content"], model), now)
+                        for i, m in enumerate(messages)
+                    ]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, role, content, tokens, created_at FROM messages WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,)
+            ).fetchall()
+        return [
+            {"seq": seq, "role": role, "content": json.loads(content), "tokens": tokens, "created_at": created_at}
+            for seq, role, content, tokens, created_at in rows
+        ]
+
+    def summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT upto_seq, content, tokens, updated_at FROM summaries WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"upto_seq": row[0], "content": row[1], "tokens": row[2], "updated_at": row[3]}
+
+    def put_summary(self, conversation_id: str, upto_seq: int, content: str, model: str = "") -> None:
+        with self._lock:
+            # Never move a summary backwards (a concurrent turn may have folded further)
+            self._conn.execute(
+                "INSERT INTO summaries (conversation_id, upto_seq, content, tokens, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(conversation_id) DO UPDATE SET upto_seq = excluded.upto_seq, content = excluded.content, "
+                "tokens = excluded.tokens, updated_at = excluded.updated_at WHERE excluded.upto_seq > summaries.upto_seq",
+                (conversation_id, upto_seq, content, _tokens(content, model), time.time())
+            )
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)).rowcount
+            self._conn.execute("DELETE FROM summaries WHERE conversation_id = ?", (conversation_id,))
+        return deleted > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ConversationService:
+    """
+    Server-side chat history, so clients send only the new turn.
+
+    The model sees the conversation's latest system prompt, a rolling
+    summary of the older turns and the recent turns verbatim. Once the
+    verbatim turns pass `max_tokens`, the oldest are folded into the summary
+    (one extra model call) until `keep_tokens` remain. Summarizing down to
+    well below the limit means it happens every few turns, not on each one.
+    The summary is cached with the last message it covers. If summarizing
+    fails, the old turns are left out and folding is retried on the next turn.
+
+    Turns are appended only once the model has answered, so a failed call
+    leaves no half turn behind.
+    """
+
+    def __init__(self, store: SQLiteConversationStore, max_tokens: int, keep_tokens: int,
+                 summary_max_tokens: int, summary_provider: Optional[str] = None):
+        self.store = store
+        self.max_tokens = max_tokens
+        self.keep_tokens = min(keep_tokens, max_tokens)
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_provider = summary_provider
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock(self, conversation_id: str) -> asyncio.Lock:
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[conversation_id] = lock
+        return lock
+
+    async def _summarize(self, previous: Optional[str], folded: List[Dict[str, Any]], provider: Optional[str]) -> str:
+        from app.services.completion_service import completion_service
+
+        transcript = "\n".join(
+            f"{m['role']}: {m['content'] if isinstance(m['content'], str) else json.dumps(m['content'])}" for m in folded
+        )
+        result = await completion_service.chat(
+            [
+                {"role": "system", "content": SUMMARY_INSTRUCTION},
+                {"role": "user", "content": f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"}
+            ],
+            provider=self.summary_provider or provider,
+            config={"temperature": 0, "max_output_tokens": self.summary_max_tokens},
+            use_cache=False
+        )
+        return result["content"].strip()
+
+    async def context(self, conversation_id: str, new_messages: List[Any], provider: Optional[str] = None,
+                      model: str = "") -> List[Dict[str, Any]]:
+        """
+        The messages to send to the model for this turn: system + summary,
+        recent turns, new turn. Turns are counted for `model`, the one that
+        will answer.
+        """
+        new = [_as_dict(m) for m in new_messages]
+        async with self._lock(conversation_id):
+            history = await run_sync(self.store.messages, conversation_id)
+            summary = await run_sync(self.store.summary, conversation_id)
+            upto = summary["upto_seq"] if summary else 0
+
+            system = next((m["content"] for m in reversed(new) if m["role"] == "system"), None)
+            if system is None:
+                system = next((m["content"] for m in reversed(history) if m["role"] == "system"), None)
+
+            recent = [m for m in history if m["role"] != "system" and m["seq"] > upto]
+            new_turn = [m for m in new if m["role"] != "system"]
+            new_tokens = sum(_tokens(m["content"], model) for m in new_turn)
+            # Recounted rather than read from the store: stored counts are for the model that answered then
+            counts = [_tokens(m["content"], model) for m in recent]
+
+            if recent and sum(counts) + new_tokens > self.max_tokens:
+                cut = 0
+                while cut < len(recent) and sum(counts[cut:]) + new_tokens > self.keep_tokens:
+                    cut += 1
+                # Keep whole exchanges: the verbatim part starts at a user turn
+                while cut < len(recent) and recent[cut]["role"] != "user":
+                    cut += 1
+                folded, recent = recent[:cut], recent[cut:]
+                if folded:
+                    try:
+                        content = await self._summarize(summary["content"] if summary else None, folded, provider)
+                        await run_sync(self.store.put_summary, conversation_id, folded[-1]["seq"], content, model)
+                        summary = {"content": content}
+                    except Exception as e:
+                        print(f"⚠️ Summarizing conversation {conversation_id} failed, dropping older turns: {e}")
+
+        messages: List[Dict[str, Any]] = []
+        if summary:
+            summary_text = f"Summary of the earlier conversation:\n{summary['content']}"
+            # Providers take a single system instruction, so the summary joins it
+            system = f"{system}\n\n{summary_text}" if system else summary_text
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages += [{"role": m["role"], "content": m["content"]} for m in recent]
+        return messages + new_turn
+
+    async def record(self, conversation_id: str, new_messages: List[Any], answer: str, model: str = "") -> None:
+        """Appends the new turn and `model`'s answer (a changed system prompt too)"""
+        new = [_as_dict(m) for m in new_messages]
+        history = await run_sync(self.store.messages, conversation_id)
+        current_system = next((m["content"] for m in reversed(history) if m["role"] == "system"), None)
+
+        to_store = []
+        for m in new:
+            if m["role"] == "system":
+                # Clients resend their system prompt every turn; store it only when it changes
+                if m["content"] == current_system:
+                    continue
+                current_system = m["content"]
+            to_store.append(m)
+        to_store.append({"role": "assistant", "content": answer})
+        await run_sync(self.store.append, conversation_id, to_store, model)
+
+    async def recorded(self, conversation_id: str, new_messages: List[Any], events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Passes a chat stream through, recording the turn once it is done"""
+        parts: List[str] = []
+        async for event in events:
+            if event["type"] == "delta":
+                parts.append(event["content"])
+            elif event["type"] == "done":
+                await self.record(conversation_id, new_messages, "".join(parts), event.get("model") or "")
+                event = {**event, "conversation_id": conversation_id}
+            yield event
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        messages = await run_sync(self.store.messages, conversation_id)
+        if not messages:
+            return None
+        return {
+            "conversation_id": conversation_id,
+            "messages": messages,
+            "summary": await run_sync(self.store.summary, conversation_id)
+        }
+
+    async def delete(self, conversation_id: str) -> bool:
+        return await run_sync(self.store.delete, conversation_id)
+
+
+conversation_service = ConversationService(
+    store=SQLiteConversationStore(settings.CONVERSATION_DB_PATH or ":memory:"),
+    max_tokens=settings.CONVERSATION_MAX_TOKENS,
+    keep_tokens=settings.CONVERSATION_KEEP_TOKENS,
+    summary_max_tokens=settings.CONVERSATION_SUMMARY_MAX_TOKENS,
+    summary_provider=settings.CONVERSATION_SUMMARY_PROVIDER or None
+)
@@ -0,0 +1,135 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.services.provider_router import is_caller_error
+
+
+class _PendingBatch:
+    def __init__(self, service: Any, dimension: int):
+        self.service = service
+        self.dimension = dimension
+        self.texts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batch calls.
+
+    Requests for the same (service, model, dimension) that arrive within
+    `window_ms` of the first one are sent upstream as a single
+    `generate_batch_embeddings` call; a batch is flushed early once it reaches
+    `max_batch` texts. Each caller gets back only its own vector. When the
+    batch is rejected for its input (a bad text), it is split in halves so
+    only the callers whose text was rejected get the error; other failures
+    reach every caller in the batch. Services with an embedding cache are
+    looked up first, so only misses wait for a batch, and the batch goes
+    straight upstream (`embed_misses`) instead of being looked up again.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[int, str, int], _PendingBatch] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"requests": 0, "batches": 0, "largest_batch": 0, "split_batches": 0, "cache_hits": 0}
+
+    @staticmethod
+    def _group_key(service: Any, dimension: int) -> Tuple[int, str, int]:
+        model = getattr(service, "embedding_model", None) or service.model_name
+        return id(service), model, dimension
+
+    async def embed(self, service: Any, text: str, dimension: int = 768) -> List[float]:
+        # Cache hits are answered right away instead of waiting out the window
+        lookup = getattr(service, "lookup", None)
+        if lookup is not None:
+            vector = await lookup(text, dimension)
+            if vector is not None:
+                self._counters["cache_hits"] += 1
+                return vector
+
+        loop = asyncio.get_running_loop()
+        key = self._group_key(service, dimension)
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(service, dimension)
+            batch.timer = loop.call_later(self.window, self._flush, key)
+            self._pending[key] = batch
+
+        future = loop.create_future()
+        batch.texts.append(text)
+        batch.futures.append(future)
+        self._counters["requests"] += 1
+
+        if len(batch.texts) >= self.max_batch:
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key: Tuple[int, str, int]) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        self._counters["batches"] += 1
+        self._counters["largest_batch"] = max(self._counters["largest_batch"], len(batch.texts))
+
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _PendingBatch) -> None:
+        try:
+            await self._embed(batch, list(range(len(batch.texts))))
+        finally:
+            # Cancelled (shutdown) or failed unexpectedly: nobody may be left waiting
+            for future in batch.futures:
+                if not future.done():
+                    future.cancel()
+
+    async def _embed(self, batch: _PendingBatch, indices: List[int]) -> None:
+        texts = [batch.texts[i] for i in indices]
+        embed = getattr(batch.service, "embed_misses", None) or batch.service.generate_batch_embeddings
+        try:
+            vectors = await embed(texts, batch.dimension)
+        except Exception as e:
+            if len(indices) > 1 and is_caller_error(e):
+                # One rejected text must not fail the other callers: bisect until it is isolated
+                self._counters["split_batches"] += 1
+                middle = len(indices) // 2
+                await asyncio.gather(self._embed(batch, indices[:middle]), self._embed(batch, indices[middle:]))
+                return
+            self._fail(batch, indices, e)
+            return
+
+        if len(vectors) != len(texts):
+            self._fail(batch, indices, RuntimeError(f"Provider returned {len(vectors)} embeddings for {len(texts)} texts"))
+            return
+        for i, vector in zip(indices, vectors):
+            # A caller may have gone away (client disconnect) while we waited
+            if not batch.futures[i].done():
+                batch.futures[i].set_result(vector)
+
+    @staticmethod
+    def _fail(batch: _PendingBatch, indices: List[int], error: Exception) -> None:
+        for i in indices:
+            if not batch.futures[i].done():
+                batch.futures[i].set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._counters["batches"]
+        return {
+            **self._counters,
+            "average_batch": self._counters["requests"] / batches if batches else 0.0,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+        }
+
+
+embedding_batcher = EmbeddingBatcher(
+    window_ms=settings.EMBEDDING_COALESCE_WINDOW_MS,
+    max_batch=settings.EMBEDDING_COALESCE_MAX_BATCH
+)
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.concurrency import run_sync
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalization applied before hashing, so trivially different spellings of
+    the same text (unicode form, surrounding/repeated whitespace) share an entry.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def make_cache_key(provider: str, model: str, dimension: int, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{dimension}:{digest}"
+
+
+class SQLiteVectorStore:
+    """
+    Persistent tier: float32 vectors stored as blobs in a single SQLite table.
+    Calls are blocking and are expected to run on the shared thread pool.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """
+    Two-tier content-addressed embedding cache.
+
+    Tier 1 is an in-process LRU bounded by a byte budget; tier 2 is an optional
+    SQLite store that survives restarts. Disk hits are promoted into the LRU.
+    """
+
+    def __init__(self, max_bytes: int, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._disk = SQLiteVectorStore(db_path) if db_path else None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        size = self._entry_size(key, vector)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = vector
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(old_key, old_vector)
+            self._counters["evictions"] += 1
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Returns the cached vectors for the keys that are present (memory first, then disk).
+        """
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                found[key] = vector
+                self._counters["memory_hits"] += 1
+            else:
+                missing.append(key)
+
+        if missing and self._disk is not None:
+            from_disk = await run_sync(self._disk.get_many, missing)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+                found[key] = vector
+            self._counters["disk_hits"] += len(from_disk)
+            self._counters["misses"] += len(missing) - len(from_disk)
+        else:
+            self._counters["misses"] += len(missing)
+
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    async def put_many(self, items: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        """
+        Stores the vectors and returns them as they will be served from now on
+        (float32 precision), so hits and misses return identical values.
+        """
+        arrays = {key: np.asarray(vector, dtype=np.float32) for key, vector in items.items()}
+        for key, vector in arrays.items():
+            self._remember(key, vector)
+        if self._disk is not None and arrays:
+            await run_sync(self._disk.put_many, arrays)
+        return {key: vector.tolist() for key, vector in arrays.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+        hits = lookups - self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            "memory_max_bytes": self.max_bytes,
+            "disk_enabled": self._disk is not None,
+        }
+
+
+class CachedEmbeddingService:
+    """
+    Wraps an embedding service so only cache misses reach the provider.
+    Everything that is not an embedding call is delegated to the wrapped service.
+    """
+
+    def __init__(self, service: Any, provider: str, cache: EmbeddingCache):
+        self._service = service
+        self.provider = provider
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    @property
+    def embedding_model(self) -> str:
+        return getattr(self._service, "embedding_model", None) or self._service.model_name
+
+    def _key(self, text: str, dimension: int) -> str:
+        return make_cache_key(self.provider, self.embedding_model, dimension, text)
+
+    async def lookup(self, text: str, dimension: int = 768) -> Optional[List[float]]:
+        """The cached vector, or None; used by the coalescer so hits skip its window"""
+        key = self._key(text, dimension)
+        return (await self.cache.get_many([key])).get(key)
+
+    async def _embed_missing(self, missing: Dict[str, str], dimension: int) -> Dict[str, List[float]]:
+        """Embeds key -> text upstream and caches the vectors"""
+        fresh = await self._service.generate_batch_embeddings(list(missing.values()), dimension)
+        if len(fresh) != len(missing):
+            raise RuntimeError(f"Provider returned {len(fresh)} embeddings for {len(missing)} texts")
+        return await self.cache.put_many(dict(zip(missing.keys(), fresh)))
+
+    async def embed_misses(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        """
+        Like generate_batch_embeddings for texts `lookup` already missed:
+        they are not looked up (nor counted as misses) a second time.
+        """
+        keys = [self._key(text, dimension) for text in texts]
+        vectors = await self._embed_missing(dict(zip(keys, texts)), dimension)
+        return [vectors[key] for key in keys]
+
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+        key = self._key(text, dimension)
+        cached = await self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+
+        vector = await self._service.generate_embedding(text, dimension)
+        stored = await self.cache.put_many({key: vector})
+        return stored[key]
+
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        keys = [self._key(text, dimension) for text in texts]
+        vectors = await self.cache.get_many(keys)
+
+        # Send each distinct missing text upstream once, in first-seen order
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors.update(await self._embed_missing(missing, dimension))
+
+        return [vectors[key] for key in keys]
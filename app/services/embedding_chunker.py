@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.provider_router import is_caller_error
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.token_counter import token_counter
+
+
+def plan_chunks(texts: List[str], max_items: int, max_tokens: int, model: str = "") -> List[List[int]]:
+    """
+    Splits texts (by index, preserving order) into chunks that respect both the
+    item limit and the token limit (counted for `model`). A single text larger
+    than max_tokens gets a chunk of its own.
+    """
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = token_counter.count_text(text, model)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ChunkedEmbedder:
+    """
+    Embeds arbitrarily large batches by fanning provider-sized chunks out
+    concurrently. Failed chunks are retried on their own; chunks that still
+    fail are reported per item instead of failing the whole batch.
+    """
+
+    def __init__(self, max_items: int, max_tokens: int, concurrency: int, max_retries: int, retry_backoff: float):
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    async def _embed_chunk(self, service: Any, texts: List[str], dimension: int, semaphore: asyncio.Semaphore) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    vectors = await service.generate_batch_embeddings(texts, dimension)
+                if len(vectors) != len(texts):
+                    raise RuntimeError(f"Provider returned {len(vectors)} vectors for {len(texts)} texts")
+                return vectors
+            except Exception as e:
+                # Bad input fails the same way again; RateLimitedService already retried 429s
+                if attempt >= self.max_retries or is_caller_error(e) or isinstance(e, RateLimitExceeded):
+                    raise
+                # Back off outside the semaphore so other chunks keep flowing
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+                attempt += 1
+
+    async def embed(self, service: Any, texts: List[str], dimension: int = 768) -> Tuple[List[Optional[List[float]]], List[Dict[str, Any]]]:
+        """
+        Returns (vectors, failed). `vectors` is in input order with None for
+        failed items; `failed` lists {"index", "error"} for each of them.
+        """
+        model = getattr(service, "embedding_model", None) or service.model_name
+        chunks = plan_chunks(texts, self.max_items, self.max_tokens, model)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        results = await asyncio.gather(
+            *(self._embed_chunk(service, [texts[i] for i in chunk], dimension, semaphore) for chunk in chunks),
+            return_exceptions=True
+        )
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        failed: List[Dict[str, Any]] = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                failed.extend({"index": i, "error": str(result) or type(result).__name__} for i in chunk)
+                continue
+            for i, vector in zip(chunk, result):
+                vectors[i] = vector
+
+        return vectors, failed
+
+
+chunked_embedder = ChunkedEmbedder(
+    max_items=settings.EMBEDDING_BATCH_MAX_ITEMS,
+    max_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+    concurrency=settings.EMBEDDING_BATCH_CONCURRENCY,
+    max_retries=settings.EMBEDDING_BATCH_MAX_RETRIES,
+    retry_backoff=settings.EMBEDDING_BATCH_RETRY_BACKOFF
+)
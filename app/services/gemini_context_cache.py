@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.genai import errors, types
+
+from app.services.token_counter import token_counter
+
+
+class ContextHandle:
+    """A Gemini cached-content resource holding a system instruction (+ prefix)"""
+
+    def __init__(self, key: str, name: str, model: str, prefix_length: int, tokens: int, expires_at: float):
+        self.key = key
+        self.name = name
+        self.model = model
+        self.prefix_length = prefix_length
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.refreshing = False
+
+
+def is_missing_cache(error: Exception) -> bool:
+    """
+    True when a request failed because its cached content expired or was
+    deleted: Gemini answers 404 NOT_FOUND. Other errors (permissions, quota,
+    bad input) are not retried uncached.
+    """
+    if not isinstance(error, errors.APIError):
+        return False
+    return error.code == 404 or error.status == "NOT_FOUND"
+
+
+class GeminiContextCache:
+    """
+    Explicit Gemini context caching for long, reused prompt prefixes.
+
+    Two prefixes of a chat request can be cached:
+
+    - the system instruction plus every message before the last user turn
+      (few-shot examples), once the same prefix has been seen `min_uses` times
+    - the system instruction alone, from its first use
+
+    The longest one above `min_tokens` (estimated) is used. Handles are
+    keyed by model + content hash. A handle's TTL is extended in the
+    background once it is within `refresh_margin` seconds of expiry.
+    When Gemini refuses to cache a prefix (model without caching, prefix
+    below the model's minimum, quota), that prefix is sent uncached for
+    `retry_after` seconds before another attempt.
+
+    Expired handles and back-offs are dropped when new ones are added, and
+    at most TRACKED_PREFIXES of each are kept (least recently used first
+    out; an evicted handle simply expires on Gemini's side).
+
+    Handles are per process; with several workers each creates its own.
+    """
+
+    TRACKED_PREFIXES = 1024
+
+    def __init__(self, client: Any, min_tokens: int, ttl: float, refresh_margin: float,
+                 min_uses: int = 2, retry_after: float = 600):
+        self.client = client
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.min_uses = min_uses
+        self.retry_after = retry_after
+        self.handles: "OrderedDict[str, ContextHandle]" = OrderedDict()
+        self._uses: "OrderedDict[str, int]" = OrderedDict()
+        self._failed: "OrderedDict[str, float]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"hits": 0, "created": 0, "refreshed": 0, "create_failures": 0, "invalidated": 0}
+
+    @staticmethod
+    def _key(model: str, system_instruction: Any, prefix: List[types.Content]) -> str:
+        payload = {
+            "model": model,
+            "system": system_instruction if isinstance(system_instruction, str) else str(system_instruction),
+            "contents": [c.model_dump(mode="json", exclude_none=True) for c in prefix],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _tokens(model: str, system_instruction: Any, prefix: List[types.Content]) -> int:
+        text = system_instruction if isinstance(system_instruction, str) else str(system_instruction)
+        for content in prefix:
+            text += "".join(part.text or "" for part in content.parts or [])
+        return token_counter.count_text(text, model)
+
+    def _seen(self, key: str) -> int:
+        self._uses[key] = self._uses.get(key, 0) + 1
+        self._uses.move_to_end(key)
+        while len(self._uses) > self.TRACKED_PREFIXES:
+            self._uses.popitem(last=False)
+        return self._uses[key]
+
+    def _candidates(self, model: str, contents: List[types.Content], system_instruction: Any) -> List[Tuple[str, int, int]]:
+        """(key, prefix length, tokens) of the cacheable prefixes, longest first"""
+        candidates = []
+        last_user = max((i for i, c in enumerate(contents) if c.role == "user"), default=0)
+        if last_user > 0:
+            prefix = contents[:last_user]
+            key = self._key(model, system_instruction, prefix)
+            tokens = self._tokens(model, system_instruction, prefix)
+            if tokens >= self.min_tokens and (key in self.handles or self._seen(key) >= self.min_uses):
+                candidates.append((key, last_user, tokens))
+        tokens = self._tokens(model, system_instruction, [])
+        if tokens >= self.min_tokens:
+            candidates.append((self._key(model, system_instruction, []), 0, tokens))
+        return candidates
+
+    def _prune(self) -> None:
+        now = time.time()
+        for key in [k for k, h in self.handles.items() if h.expires_at <= now and not h.refreshing]:
+            del self.handles[key]
+        for key in [k for k, until in self._failed.items() if until <= now]:
+            del self._failed[key]
+        while len(self.handles) > self.TRACKED_PREFIXES:
+            self.handles.popitem(last=False)
+        while len(self._failed) > self.TRACKED_PREFIXES:
+            self._failed.popitem(last=False)
+
+    async def _create(self, key: str, model: str, system_instruction: Any, prefix: List[types.Content], tokens: int) -> ContextHandle:
+        cached = await self.client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                contents=prefix or None,
+                ttl=f"{int(self.ttl)}s",
+                display_name=f"ctx-{key[:16]}",
+            )
+        )
+        self._counters["created"] += 1
+        return ContextHandle(key, cached.name, model, len(prefix), tokens, time.time() + self.ttl)
+
+    async def _handle(self, key: str, model: str, system_instruction: Any, prefix: List[types.Content], tokens: int) -> Optional[ContextHandle]:
+        handle = self.handles.get(key)
+        if handle is not None and handle.expires_at > time.time() + 5:
+            self.handles.move_to_end(key)
+            return handle
+        if self._failed.get(key, 0) > time.time():
+            return None
+
+        pending = self._pending.get(key)
+        if pending is None:
+            # Concurrent requests for the same prefix share one create call
+            pending = asyncio.ensure_future(self._create(key, model, system_instruction, prefix, tokens))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        try:
+            handle = await asyncio.shield(pending)
+        except Exception as e:
+            if self._failed.get(key, 0) <= time.time():
+                self._counters["create_failures"] += 1
+                print(f"⚠️ Gemini context caching unavailable for {model}, sending the prompt uncached: {e}")
+            self._failed[key] = time.time() + self.retry_after
+            self._prune()
+            return None
+        self.handles[key] = handle
+        self._prune()
+        return handle
+
+    async def _refresh(self, handle: ContextHandle) -> None:
+        try:
+            await self.client.aio.caches.update(
+                name=handle.name, config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl)}s")
+            )
+            handle.expires_at = time.time() + self.ttl
+            self._counters["refreshed"] += 1
+        except Exception as e:
+            # Left to expire; the next request after that creates a new one
+            print(f"⚠️ Refreshing Gemini context cache {handle.name} failed: {e}")
+
+    def _refresh_later(self, handle: ContextHandle) -> None:
+        if handle.expires_at - time.time() > self.refresh_margin or handle.refreshing:
+            return
+        handle.refreshing = True
+
+        def done(task: asyncio.Task) -> None:
+            self._tasks.discard(task)
+            handle.refreshing = False
+
+        task = asyncio.ensure_future(self._refresh(handle))
+        task.add_done_callback(done)
+        self._tasks.add(task)
+
+    async def apply(self, model: str, contents: List[types.Content], config: Optional[types.GenerateContentConfig]) -> Tuple[List[types.Content], Optional[types.GenerateContentConfig], Optional[ContextHandle]]:
+        """
+        (contents, config, handle) to send: the cached prefix and system
+        instruction replaced by a `cached_content` reference, or the request
+        unchanged (handle None) when nothing qualifies or caching failed.
+        """
+        system_instruction = getattr(config, "system_instruction", None)
+        if not system_instruction or getattr(config, "cached_content", None) or getattr(config, "tools", None):
+            return contents, config, None
+
+        for key, prefix_length, tokens in self._candidates(model, contents, system_instruction):
+            handle = await self._handle(key, model, system_instruction, contents[:prefix_length], tokens)
+            if handle is None:
+                continue
+            self._counters["hits"] += 1
+            self._refresh_later(handle)
+            cached_config = config.model_copy(update={"system_instruction": None, "cached_content": handle.name})
+            return contents[handle.prefix_length:], cached_config, handle
+        return contents, config, None
+
+    def invalidate(self, handle: ContextHandle) -> None:
+        """Forgets a handle Gemini no longer knows (expired or deleted)"""
+        if self.handles.get(handle.key) is handle:
+            del self.handles[handle.key]
+            self._counters["invalidated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            **self._counters,
+            "handles": [
+                {"name": h.name, "model": h.model, "tokens": h.tokens, "prefix_messages": h.prefix_length,
+                 "expires_in": round(h.expires_at - now)}
+                for h in self.handles.values()
+            ],
+        }
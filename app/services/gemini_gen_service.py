@@ -1,21 +1,31 @@
 from google import genai
 from google.genai import types
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from app.core.config import settings
+from app.core.timing import phase
+from app.services.gemini_context_cache import GeminiContextCache, is_missing_cache
 
 class GeminiGenService:
     def __init__(self, model_name: Optional[str] = None):
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
         
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        http_options = types.HttpOptions(base_url=settings.GEMINI_API_BASE) if settings.GEMINI_API_BASE else None
+        self.client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
         self.model_name = model_name or settings.GEMINI_GEN_MODEL
+        self.context_cache = GeminiContextCache(
+            self.client,
+            min_tokens=settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+            ttl=settings.GEMINI_CONTEXT_CACHE_TTL,
+            refresh_margin=settings.GEMINI_CONTEXT_CACHE_REFRESH_MARGIN,
+            min_uses=settings.GEMINI_CONTEXT_CACHE_MIN_USES
+        ) if settings.GEMINI_CONTEXT_CACHE_ENABLED else None
 
     async def generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
         """
         Generates content based on a text prompt.
         """
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=self.model_name,
             contents=prompt,
             config=config
@@ -30,16 +40,17 @@ class GeminiGenService:
         # Note: google.genai has specific message types. 
         # For simplicity, we'll convert simple dicts to Content objects if needed or use the client direct.
         # Here we use the simplified contents list approach.
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=self.model_name,
             contents=messages,
             config=config
         )
         return response.text
 
-    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _prepare_chat(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Tuple[str, List[types.Content], Optional[types.GenerateContentConfig]]:
         """
-        Chat interface returning content and usage.
+        Converts API messages and config into (model_name, contents, generate config).
+        Shared by the blocking and streaming chat paths.
         """
         formatted_messages = []
         system_instruction = None
@@ -86,30 +97,119 @@ class GeminiGenService:
                 **cfg
             )
 
-        response = self.client.models.generate_content(
-            model=model_name,
-            contents=formatted_messages,
-            config=gen_config
-        )
-        
-        usage = None
-        if response.usage_metadata:
-            usage = {
-                "prompt_tokens": response.usage_metadata.prompt_token_count,
-                "completion_tokens": response.usage_metadata.candidates_token_count,
-                "total_tokens": response.usage_metadata.total_token_count
-            }
-            
+        return model_name, formatted_messages, gen_config
+
+    @staticmethod
+    def _usage_from_metadata(usage_metadata: Any) -> Optional[Dict[str, int]]:
+        if not usage_metadata:
+            return None
+        return {
+            "prompt_tokens": usage_metadata.prompt_token_count,
+            "completion_tokens": usage_metadata.candidates_token_count,
+            "total_tokens": usage_metadata.total_token_count,
+            # Part of prompt_tokens served from a context cache (billed at a discount)
+            "cached_tokens": getattr(usage_metadata, "cached_content_token_count", None) or 0
+        }
+
+    async def _with_context_cache(self, call, model_name: str, contents: List[types.Content], gen_config: Optional[types.GenerateContentConfig]) -> Any:
+        """
+        Runs `call(contents, config)` with the long system prompt / prefix
+        served from a context cache when one applies. A handle Gemini no
+        longer knows is dropped and the request resent uncached.
+        """
+        if self.context_cache is None:
+            return await call(contents, gen_config)
+        with phase("context_cache"):
+            cached_contents, cached_config, handle = await self.context_cache.apply(model_name, contents, gen_config)
+        if handle is None:
+            return await call(contents, gen_config)
+        try:
+            return await call(cached_contents, cached_config)
+        except Exception as e:
+            if not is_missing_cache(e):
+                raise
+            self.context_cache.invalidate(handle)
+            return await call(contents, gen_config)
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Chat interface returning content and usage.
+        """
+        with phase("format"):
+            model_name, formatted_messages, gen_config = self._prepare_chat(messages, config)
+
+        async def call(contents, cfg):
+            return await self.client.aio.models.generate_content(model=model_name, contents=contents, config=cfg)
+
+        response = await self._with_context_cache(call, model_name, formatted_messages, gen_config)
+
         return {
             "content": response.text,
-            "usage": usage,
+            "usage": self._usage_from_metadata(response.usage_metadata),
             "model": model_name
         }
 
-    def health_check(self) -> bool:
+    async def stream_chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat_with_usage.
+        Yields {"type": "delta", "content": ...} events followed by a single
+        {"type": "done", "usage": ..., "model": ...} event.
+        """
+        with phase("format"):
+            model_name, formatted_messages, gen_config = self._prepare_chat(messages, config)
+
+        async def call(contents, cfg):
+            stream = await self.client.aio.models.generate_content_stream(model=model_name, contents=contents, config=cfg)
+            # The request is sent on first iteration: pull the first chunk here so a
+            # missing context cache fails inside the retry, before anything is yielded
+            return await self._started(stream)
+
+        stream = await self._with_context_cache(call, model_name, formatted_messages, gen_config)
+        async for event in self._stream_events(stream, model_name):
+            yield event
+
+    async def stream_generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of generate_content. Yields the same events as stream_chat_with_usage.
+        """
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt,
+            config=config
+        )
+        async for event in self._stream_events(stream, self.model_name):
+            yield event
+
+    @staticmethod
+    async def _started(stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+
+        async def chained() -> AsyncIterator[Any]:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+
+        return chained()
+
+    async def _stream_events(self, stream: AsyncIterator[Any], model_name: str) -> AsyncIterator[Dict[str, Any]]:
+        usage = None
+        async for chunk in stream:
+            # Usage metadata is cumulative; the last chunk carries the final counts
+            if chunk.usage_metadata:
+                usage = self._usage_from_metadata(chunk.usage_metadata)
+            if chunk.text:
+                yield {"type": "delta", "content": chunk.text}
+        yield {"type": "done", "usage": usage, "model": model_name}
+
+    async def health_check(self) -> bool:
         try:
             # Quick ping
-            self.client.models.generate_content(
+            await self.client.aio.models.generate_content(
                 model=self.model_name,
                 contents="ping",
                 config=types.GenerateContentConfig(max_output_tokens=1)
@@ -117,5 +217,3 @@ class GeminiGenService:
             return True
         except Exception:
             return False
-
-gemini_gen_service = GeminiGenService()
@@ -8,31 +8,30 @@ class GeminiService:
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
         
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        http_options = types.HttpOptions(base_url=settings.GEMINI_API_BASE) if settings.GEMINI_API_BASE else None
+        self.client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
         self.model_name = model_name
 
-    def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
-        result = self.client.models.embed_content(
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+        result = await self.client.aio.models.embed_content(
             model=self.model_name,
             contents=text,
             config=types.EmbedContentConfig(output_dimensionality=dimension)
         )
         return result.embeddings[0].values
 
-    def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
-        result = self.client.models.embed_content(
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        result = await self.client.aio.models.embed_content(
             model=self.model_name,
             contents=texts,
             config=types.EmbedContentConfig(output_dimensionality=dimension)
         )
         return [emb.values for emb in result.embeddings]
 
-    def health_check(self) -> bool:
+    async def health_check(self) -> bool:
         try:
             # Simple embedding to check connectivity
-            self.generate_embedding("health check", dimension=1)
+            await self.generate_embedding("health check", dimension=1)
             return True
         except Exception:
             return False
-
-gemini_service = GeminiService()
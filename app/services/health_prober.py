@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.concurrency import run_sync
+from app.core.config import settings
+
+Check = Callable[[], Awaitable[bool]]
+
+
+class ProbeResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "unknown"  # unknown | ok | down
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.last_ok_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+            "last_ok_at": self.last_ok_at,
+            "last_error": self.last_error,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+def provider_check(provider: str) -> Check:
+    async def check() -> bool:
+        from app.services.llm_manager import llm_manager
+        # Building a provider imports its SDK; keep that off the event loop
+        service = await run_sync(llm_manager.get_service, provider)
+        return await service.health_check()
+    return check
+
+
+async def qdrant_check() -> bool:
+    from app.repositories.async_qdrant_repo import async_qdrant_repo
+    # First use imports qdrant_client; same as above
+    await run_sync(getattr, async_qdrant_repo, "client")
+    return await async_qdrant_repo.health_check()
+
+
+class HealthProber:
+    """
+    Checks every target on a schedule and keeps the latest status, latency
+    and error, so health endpoints answer from memory instead of calling the
+    LLM or Qdrant on every probe.
+
+    A result older than `max_age` (e.g. when the background loop is not
+    running) is refreshed on demand; concurrent refreshes of the same target
+    share one check.
+    """
+
+    def __init__(self, targets: Dict[str, Check], interval: float, timeout: float):
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = interval * 2
+        self.results: Dict[str, ProbeResult] = {name: ProbeResult(name) for name in targets}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_check(self, name: str) -> ProbeResult:
+        result = self.results[name]
+        start = time.perf_counter()
+        try:
+            healthy = await asyncio.wait_for(self.targets[name](), timeout=self.timeout)
+            error = None if healthy else "health check failed"
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        result.latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        result.checked_at = time.time()
+        if error is None:
+            result.status = "ok"
+            result.last_ok_at = result.checked_at
+            result.consecutive_failures = 0
+        else:
+            result.status = "down"
+            result.last_error = error
+            result.consecutive_failures += 1
+        return result
+
+    async def check(self, name: str) -> ProbeResult:
+        """Runs a fresh check of `name`, joining one already in flight"""
+        if name not in self.targets:
+            raise KeyError(name)
+        inflight = self._inflight.get(name)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._run_check(name))
+            self._inflight[name] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(name, None))
+        return await asyncio.shield(inflight)
+
+    async def check_all(self) -> Dict[str, ProbeResult]:
+        """Fresh checks of every target, run concurrently"""
+        names = list(self.targets)
+        results = await asyncio.gather(*(self.check(name) for name in names))
+        return dict(zip(names, results))
+
+    async def get(self, name: str) -> ProbeResult:
+        """Cached result of `name`, refreshed first if missing or stale"""
+        result = self.results.get(name)
+        if result is None:
+            raise KeyError(name)
+        if result.checked_at is None or time.time() - result.checked_at > self.max_age:
+            return await self.check(name)
+        return result
+
+    async def get_provider(self, provider: str) -> ProbeResult:
+        """Like get(), registering the provider as a target on first use"""
+        if provider not in self.targets:
+            self.targets[provider] = provider_check(provider)
+            self.results[provider] = ProbeResult(provider)
+        return await self.get(provider)
+
+    def names(self) -> List[str]:
+        return list(self.targets)
+
+    async def _loop(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _default_targets() -> Dict[str, Check]:
+    targets: Dict[str, Check] = {
+        name.strip(): provider_check(name.strip())
+        for name in settings.HEALTH_PROBE_PROVIDERS.split(",") if name.strip()
+    }
+    targets["qdrant"] = qdrant_check
+    return targets
+
+
+health_prober = HealthProber(
+    targets=_default_targets(),
+    interval=settings.HEALTH_PROBE_INTERVAL,
+    timeout=settings.HEALTH_PROBE_TIMEOUT
+)
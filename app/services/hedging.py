@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class HedgeStats:
+    """Recent latencies and hedge counters of one call site (provider, method, model)"""
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+        self.last_delay: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.counters["calls"]
+        return {
+            **self.counters,
+            "hedge_rate": self.counters["hedged"] / calls if calls else 0.0,
+            "samples": len(self.latencies),
+            "p50_ms": round(float(np.percentile(self.latencies, 50)) * 1000, 1) if self.latencies else None,
+            "delay_ms": None if self.last_delay is None else round(self.last_delay * 1000, 1),
+        }
+
+
+class Hedger:
+    """
+    Sends a duplicate of a slow call and takes whichever answer comes first.
+
+    The hedge fires once the primary has run longer than the `percentile`
+    of recently observed latencies (clamped to [min_delay, max_delay]; until
+    `min_samples` are seen the delay is max_delay). The loser is cancelled.
+
+    Hedges are paid from a budget that grows by `budget` per call and is
+    capped at `burst`, so at most about `budget` extra load is added.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.5,
+        max_delay: float = 10.0,
+        budget: float = 0.05,
+        burst: float = 10.0,
+        min_samples: int = 20,
+        window: int = 500
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.window = window
+        self.tokens = 0.0
+        self._stats: Dict[str, HedgeStats] = {}
+
+    def _site(self, key: str) -> HedgeStats:
+        if key not in self._stats:
+            self._stats[key] = HedgeStats(self.window)
+        return self._stats[key]
+
+    def delay(self, key: str) -> float:
+        latencies = self._site(key).latencies
+        if not latencies or len(latencies) < self.min_samples:
+            return self.max_delay
+        observed = float(np.percentile(latencies, self.percentile))
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def _spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def run(self, key: str, primary: Callable[[], Awaitable[Any]], hedge: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """
+        Awaits `primary()`, firing `hedge()` (default: another `primary()`)
+        if it is still running after the hedge delay.
+        """
+        site = self._site(key)
+        site.counters["calls"] += 1
+        self.tokens = min(self.burst, self.tokens + self.budget)
+        site.last_delay = self.delay(key)
+
+        start = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=site.last_delay)
+            if not done:
+                if self._spend():
+                    site.counters["hedged"] += 1
+                    tasks.append(asyncio.ensure_future((hedge or primary)()))
+                else:
+                    site.counters["budget_denied"] += 1
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            site.counters["hedge_wins"] += 1
+                        site.latencies.append(time.monotonic() - start)
+                        return task.result()
+            # Every attempt failed: report the primary's error
+            return first.result()
+        finally:
+            # The loser, or everything if the caller went away
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": round(self.tokens, 2),
+            "sites": {key: site.to_dict() for key, site in self._stats.items()},
+        }
+
+
+class HedgedService:
+    """
+    Wraps a provider service so `chat_with_usage` and
+    `generate_batch_embeddings` are hedged. Chat hedges may go to
+    `alternate` (a callable returning (provider, service)) unless the
+    request pins a model; embeddings always hedge to the same provider, as
+    vectors from another model are not comparable.
+    """
+
+    def __init__(self, service: Any, provider: str, hedger: Hedger, alternate: Optional[Callable[[], Optional[tuple]]] = None):
+        self._service = service
+        self.provider = provider
+        self.hedger = hedger
+        self.alternate = alternate
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    def _hedge_target(self, config: Dict[str, Any]) -> Optional[tuple]:
+        if self.alternate is None or config.get("model"):
+            return None
+        try:
+            return self.alternate()
+        except Exception as e:
+            print(f"⚠️ Hedge provider unavailable: {e}")
+            return None
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        config = config or {}
+        key = f"{self.provider}:chat:{config.get('model') or self._service.model_name}"
+
+        async def primary() -> Dict[str, Any]:
+            return await self._service.chat_with_usage(messages, config=config)
+
+        hedge = None
+        target = self._hedge_target(config)
+        if target is not None and target[0] != self.provider:
+            name, service = target
+
+            async def hedge() -> Dict[str, Any]:
+                return {**await service.chat_with_usage(messages, config=config), "provider": name}
+
+        return await self.hedger.run(key, primary, hedge)
+
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        model = getattr(self._service, "embedding_model", None) or self._service.model_name
+        return await self.hedger.run(
+            f"{self.provider}:embed:{model}",
+            lambda: self._service.generate_batch_embeddings(texts, dimension)
+        )
+
+
+hedger = Hedger(
+    percentile=settings.HEDGE_PERCENTILE,
+    min_delay=settings.HEDGE_MIN_DELAY,
+    max_delay=settings.HEDGE_MAX_DELAY,
+    budget=settings.HEDGE_BUDGET,
+    min_samples=settings.HEDGE_MIN_SAMPLES
+)
@@ -0,0 +1,390 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+
+from app.core.config import settings
+from app.core.concurrency import run_sync
+from app.core.shared_state import shared_state
+from app.services.embedding_chunker import chunked_embedder
+
+PointId = Union[int, str]
+
+
+def extract_field(record: Dict[str, Any], path: str) -> Any:
+    """
+    Reads a (possibly dotted) field such as "title" or "product.description".
+    """
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def make_point_id(record: Dict[str, Any], id_field: Optional[str]) -> PointId:
+    """
+    Qdrant only accepts unsigned integers or UUIDs. Other ids (and records
+    without one) are mapped to a stable UUIDv5, so re-ingesting the same data
+    overwrites points instead of duplicating them.
+    """
+    if id_field:
+        value = extract_field(record, id_field)
+        if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+            return value
+        if value is not None:
+            try:
+                return str(uuid.UUID(str(value)))
+            except ValueError:
+                return str(uuid.uuid5(uuid.NAMESPACE_URL, str(value)))
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, canonical))
+
+
+def _read_lines(handle, count: int) -> List[bytes]:
+    lines = []
+    for _ in range(count):
+        line = handle.readline()
+        if not line:
+            break
+        lines.append(line)
+    return lines
+
+
+async def iter_file_lines(path: str, lines_per_read: int = 1000) -> AsyncIterator[bytes]:
+    """
+    Streams a file line by line, reading blocks of lines on the shared pool so
+    large files never sit in memory and never block the event loop.
+    """
+    with open(path, "rb") as handle:
+        while True:
+            lines = await run_sync(_read_lines, handle, lines_per_read)
+            if not lines:
+                return
+            for line in lines:
+                yield line
+
+
+class IngestionProgress:
+    def __init__(self, job_id: str, collection_name: str):
+        self.job_id = job_id
+        self.collection_name = collection_name
+        self.status = "pending"
+        self.lines_read = 0
+        self.lines_skipped = 0
+        self.records_embedded = 0
+        self.records_upserted = 0
+        self.records_failed = 0
+        self.batches_upserted = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.job_id,
+            "collection_name": self.collection_name,
+            "status": self.status,
+            "lines_read": self.lines_read,
+            "lines_skipped": self.lines_skipped,
+            "records_embedded": self.records_embedded,
+            "records_upserted": self.records_upserted,
+            "records_failed": self.records_failed,
+            "batches_upserted": self.batches_upserted,
+            "elapsed_seconds": elapsed,
+            "records_per_second": self.records_upserted / elapsed if elapsed else None,
+            "error": self.error,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IngestionProgress":
+        progress = cls(state["job_id"], state["collection_name"])
+        vars(progress).update(state)
+        return progress
+
+
+class IngestionPipeline:
+    """
+    JSONL -> embed -> Qdrant upsert, as three pipelined stages.
+
+    The reader, embedder and upserter run concurrently and are connected by
+    bounded queues, so a slow stage applies backpressure instead of letting
+    rows pile up in memory. Batches stay in input order, which lets the
+    upserter record a checkpoint (number of input lines fully stored) after
+    every batch; a restarted run skips those lines. Once a record fails to
+    embed, the checkpoint stays before its line for the rest of the run,
+    so a resumed run retries it (records after it are upserted again, which
+    overwrites the same points).
+    """
+
+    def __init__(
+        self,
+        embedding_service: Any,
+        repo: Any,
+        collection_name: str,
+        text_field: str,
+        id_field: Optional[str] = None,
+        dimension: int = 768,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        progress: Optional[IngestionProgress] = None
+    ):
+        self.embedding_service = embedding_service
+        self.repo = repo
+        self.collection_name = collection_name
+        self.text_field = text_field
+        self.id_field = id_field
+        self.dimension = dimension
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.checkpoint_path = checkpoint_path
+        self.progress = progress or IngestionProgress(uuid.uuid4().hex, collection_name)
+        self._collection_ready = False
+        # Highest line the checkpoint may reach: just before the first record that failed to embed
+        self._checkpoint_limit: Optional[int] = None
+
+    def _load_checkpoint(self) -> int:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, "r") as f:
+            data = json.load(f)
+        if data.get("collection_name") != self.collection_name or data.get("text_field") != self.text_field:
+            return 0
+        return int(data.get("lines_done", 0))
+
+    def _save_checkpoint(self, lines_done: int) -> None:
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "collection_name": self.collection_name,
+                "text_field": self.text_field,
+                "lines_done": lines_done,
+                "updated_at": time.time()
+            }, f)
+        # Atomic replace, so a crash never leaves a half-written checkpoint
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def _read(self, lines: AsyncIterator[bytes], out: asyncio.Queue, lines_done: int) -> None:
+        records: List[Dict[str, Any]] = []
+        record_lines: List[int] = []
+        line_no = 0
+        async for line in lines:
+            line_no += 1
+            self.progress.lines_read += 1
+            if line_no <= lines_done:
+                self.progress.lines_skipped += 1
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.progress.records_failed += 1
+                continue
+            if not isinstance(record, dict) or not isinstance(extract_field(record, self.text_field), str):
+                self.progress.records_failed += 1
+                continue
+
+            records.append(record)
+            record_lines.append(line_no)
+            if len(records) >= self.batch_size:
+                await out.put((records, record_lines, line_no))
+                records, record_lines = [], []
+
+        if line_no > lines_done:
+            # Flush the tail (possibly empty, so the checkpoint still advances past bad lines)
+            await out.put((records, record_lines, line_no))
+        await out.put(None)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        from qdrant_client.http import models
+
+        while True:
+            item = await inp.get()
+            if item is None:
+                await out.put(None)
+                return
+            records, record_lines, last_line = item
+
+            points: List[models.PointStruct] = []
+            if records:
+                texts = [extract_field(record, self.text_field) for record in records]
+                vectors, failed = await chunked_embedder.embed(self.embedding_service, texts, self.dimension)
+                self.progress.records_failed += len(failed)
+                if failed:
+                    first_failed = min(record_lines[f["index"]] for f in failed)
+                    if self._checkpoint_limit is None or first_failed - 1 < self._checkpoint_limit:
+                        self._checkpoint_limit = first_failed - 1
+                for record, vector in zip(records, vectors):
+                    if vector is None:
+                        continue
+                    points.append(models.PointStruct(
+                        id=make_point_id(record, self.id_field),
+                        vector=vector,
+                        payload=record
+                    ))
+                self.progress.records_embedded += len(points)
+
+            if points and not self._collection_ready:
+                await self.repo.ensure_collection(self.collection_name, len(points[0].vector))
+                self._collection_ready = True
+
+            if self._checkpoint_limit is not None:
+                last_line = min(last_line, self._checkpoint_limit)
+            await out.put((points, last_line))
+
+    async def _upsert(self, inp: asyncio.Queue) -> None:
+        while True:
+            item = await inp.get()
+            if item is None:
+                return
+            points, last_line = item
+            if points:
+                await self.repo.upsert_data(self.collection_name, points)
+                self.progress.records_upserted += len(points)
+                self.progress.batches_upserted += 1
+            if self.checkpoint_path:
+                await run_sync(self._save_checkpoint, last_line)
+
+    async def run(self, lines: AsyncIterator[bytes]) -> IngestionProgress:
+        self.progress.status = "running"
+        self.progress.started_at = time.time()
+
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        lines_done = await run_sync(self._load_checkpoint)
+
+        stages = [
+            asyncio.ensure_future(self._read(lines, embed_queue, lines_done)),
+            asyncio.ensure_future(self._embed(embed_queue, upsert_queue)),
+            asyncio.ensure_future(self._upsert(upsert_queue)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+            self.progress.status = "completed"
+        except BaseException as e:
+            # One failed stage would leave the others blocked on their queues
+            for stage in stages:
+                stage.cancel()
+            self.progress.status = "cancelled" if isinstance(e, asyncio.CancelledError) else "failed"
+            self.progress.error = str(e) or type(e).__name__
+            raise
+        finally:
+            self.progress.finished_at = time.time()
+
+        return self.progress
+
+
+class IngestionService:
+    """
+    Runs ingestion pipelines as background jobs and keeps their progress.
+
+    A job runs in the worker that received the upload. Its progress is also
+    published to the shared state store every poll interval (and when it
+    ends), so a status request that lands on another worker is answered too.
+    """
+
+    MAX_FINISHED_JOBS = 100
+    JOB_KEY = "ingest_job:{}"
+
+    def __init__(self):
+        self.jobs: Dict[str, IngestionProgress] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def checkpoint_path(self, name: str) -> str:
+        safe_name = "".join(c for c in name if c.isalnum() or c in "-_.")
+        return os.path.join(settings.INGEST_CHECKPOINT_DIR, f"{safe_name}.json")
+
+    async def _publish(self, progress: IngestionProgress) -> None:
+        try:
+            await shared_state.set(self.JOB_KEY.format(progress.job_id), progress.snapshot())
+        except Exception as e:
+            print(f"⚠️ Could not publish progress of ingestion job {progress.job_id}: {e}")
+
+    async def _report(self, progress: IngestionProgress) -> None:
+        while True:
+            await asyncio.sleep(shared_state.poll_interval)
+            await self._publish(progress)
+
+    async def start_file_job(
+        self,
+        path: str,
+        embedding_service: Any,
+        repo: Any,
+        collection_name: str,
+        text_field: str,
+        id_field: Optional[str] = None,
+        dimension: int = 768,
+        checkpoint_name: Optional[str] = None,
+        delete_source: bool = False
+    ) -> IngestionProgress:
+        progress = IngestionProgress(uuid.uuid4().hex, collection_name)
+        pipeline = IngestionPipeline(
+            embedding_service=embedding_service,
+            repo=repo,
+            collection_name=collection_name,
+            text_field=text_field,
+            id_field=id_field,
+            dimension=dimension,
+            checkpoint_path=self.checkpoint_path(checkpoint_name) if checkpoint_name else None,
+            progress=progress
+        )
+
+        async def run_job():
+            reporter = asyncio.ensure_future(self._report(progress)) if shared_state.enabled else None
+            try:
+                await pipeline.run(iter_file_lines(path))
+            except Exception:
+                # Already recorded on the progress object
+                pass
+            finally:
+                if reporter is not None:
+                    reporter.cancel()
+                    await self._publish(progress)
+                if delete_source:
+                    os.remove(path)
+
+        for job_id in self._prune():
+            try:
+                await shared_state.delete(self.JOB_KEY.format(job_id))
+            except Exception as e:
+                print(f"⚠️ Could not remove ingestion job {job_id} from the shared state: {e}")
+        self.jobs[progress.job_id] = progress
+        # Published before the job id is returned, so any worker can be polled right away
+        await self._publish(progress)
+        task = asyncio.ensure_future(run_job())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return progress
+
+    async def get_job(self, job_id: str) -> Optional[IngestionProgress]:
+        """A job of this worker, else the progress its worker last published"""
+        progress = self.jobs.get(job_id)
+        if progress is None:
+            state = await shared_state.get(self.JOB_KEY.format(job_id))
+            progress = IngestionProgress.from_snapshot(state) if state else None
+        return progress
+
+    def _prune(self) -> List[str]:
+        """Forgets the oldest finished jobs beyond MAX_FINISHED_JOBS; returns their ids"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at]
+        pruned = finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS + 1)]
+        for job_id in pruned:
+            del self.jobs[job_id]
+        return pruned
+
+
+ingestion_service = IngestionService()
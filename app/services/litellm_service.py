@@ -1,7 +1,9 @@
 import litellm
 import requests
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Tuple
 from app.core.config import settings
+from app.core.timing import phase
+from app.core.concurrency import run_sync
 
 class LiteLLMService:
     def __init__(self, model_name: str = None, embedding_model: str = None):
@@ -11,7 +13,7 @@ class LiteLLMService:
         
         self.model_name = model_name or default_model
         self.embedding_model = embedding_model or default_embedding
-        self.api_base = "https://imllm.intermesh.net/v1"
+        self.api_base = settings.LITELLM_API_BASE.rstrip("/")
         self.api_key = settings.LITELLM_API_KEY or settings.GEMINI_API_KEY # Fallback/Usage
 
     def _ensure_litellm_proxy_prefix(self, model_name: str) -> str:
@@ -45,7 +47,7 @@ class LiteLLMService:
         # Ensure litellm_proxy/ prefix
         model_name = self._ensure_litellm_proxy_prefix(model_name)
 
-        response = litellm.completion(
+        response = await litellm.acompletion(
             model=model_name,
             messages=messages,
             api_base=self.api_base,
@@ -77,7 +79,7 @@ class LiteLLMService:
         # Ensure litellm_proxy/ prefix
         model_name = self._ensure_litellm_proxy_prefix(model_name)
 
-        response = litellm.completion(
+        response = await litellm.acompletion(
             model=model_name,
             messages=formatted_messages,
             api_base=self.api_base,
@@ -87,9 +89,10 @@ class LiteLLMService:
         
         return response.choices[0].message.content
 
-    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _prepare_chat(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
         """
-        Chat interface returning content and usage.
+        Converts API messages and config into (model_name, messages, completion kwargs).
+        Shared by the blocking and streaming chat paths.
         """
         formatted_messages = []
         for msg in messages:
@@ -123,7 +126,28 @@ class LiteLLMService:
         # Ensure litellm_proxy/ prefix
         model_name = self._ensure_litellm_proxy_prefix(model_name)
 
-        response = litellm.completion(
+        return model_name, formatted_messages, kwargs
+
+    @staticmethod
+    def _usage_dict(usage: Any) -> Optional[Dict[str, int]]:
+        if not usage:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "cached_tokens": getattr(details, "cached_tokens", None) or 0
+        }
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Chat interface returning content and usage.
+        """
+        with phase("format"):
+            model_name, formatted_messages, kwargs = self._prepare_chat(messages, config)
+
+        response = await litellm.acompletion(
             model=model_name,
             messages=formatted_messages,
             api_base=self.api_base,
@@ -131,27 +155,55 @@ class LiteLLMService:
             stream=False,
             **kwargs
         )
-        
-        usage = None
-        if response.usage:
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
-            }
             
         return {
             "content": response.choices[0].message.content,
-            "usage": usage,
+            "usage": self._usage_dict(response.usage),
             "model": model_name
         }
 
-    def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+    async def stream_chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat_with_usage.
+        Yields {"type": "delta", "content": ...} events followed by a single
+        {"type": "done", "usage": ..., "model": ...} event.
+        """
+        with phase("format"):
+            model_name, formatted_messages, kwargs = self._prepare_chat(messages, config)
+
+        response = await litellm.acompletion(
+            model=model_name,
+            messages=formatted_messages,
+            api_base=self.api_base,
+            api_key=self.api_key,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+
+        usage = None
+        async for chunk in response:
+            # With include_usage the proxy sends usage on the final chunk
+            if getattr(chunk, "usage", None):
+                usage = self._usage_dict(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield {"type": "delta", "content": chunk.choices[0].delta.content}
+
+        yield {"type": "done", "usage": usage, "model": model_name}
+
+    async def stream_generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of generate_content. Yields the same events as stream_chat_with_usage.
+        """
+        async for event in self.stream_chat_with_usage([{"role": "user", "content": prompt}], config=config):
+            yield event
+
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
         model_name = self.embedding_model
         # Ensure litellm_proxy/ prefix
         model_name = self._ensure_litellm_proxy_prefix(model_name)
 
-        response = litellm.embedding(
+        response = await litellm.aembedding(
             model=model_name,
             input=[text],
             api_base=self.api_base,
@@ -159,12 +211,12 @@ class LiteLLMService:
         )
         return response['data'][0]['embedding']
 
-    def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
         model_name = self.embedding_model
         # Ensure litellm_proxy/ prefix
         model_name = self._ensure_litellm_proxy_prefix(model_name)
 
-        response = litellm.embedding(
+        response = await litellm.aembedding(
             model=model_name,
             input=texts,
             api_base=self.api_base,
@@ -172,10 +224,12 @@ class LiteLLMService:
         )
         return [item['embedding'] for item in response['data']]
 
-    def health_check(self) -> bool:
+    async def health_check(self) -> bool:
         try:
-            # User requested specific health check via GET model URL
-            response = requests.get(
+            # User requested specific health check via GET model URL.
+            # requests is blocking, so run it on the shared pool.
+            response = await run_sync(
+                requests.get,
                 f"{self.api_base}/models",
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 params={
@@ -190,5 +244,3 @@ class LiteLLMService:
         except Exception as e:
             print(f"LiteLLM Health Check Failed: {e}")
             return False
-
-litellm_service = LiteLLMService()
@@ -1,36 +1,175 @@
-from app.services.gemini_gen_service import gemini_gen_service
-from app.services.gemini_service import gemini_service
-from app.services.litellm_service import litellm_service
+import importlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.embedding_cache import EmbeddingCache, CachedEmbeddingService
+from app.services.rate_limiter import RateLimitedService, rate_limiter
+from app.services.provider_router import Route, provider_router
+from app.services.hedging import HedgedService, hedger
+from app.services.metered_service import MeteredService
+from app.core.config import settings
+from app.core.shared_state import shared_state
+
+# provider -> (module, class). Provider modules pull in heavy SDKs (litellm,
+# google.genai), so they are imported and constructed on first use only.
+GEN_PROVIDERS: Dict[str, Tuple[str, str]] = {
+    "gemini": ("app.services.gemini_gen_service", "GeminiGenService"),
+    "litellm": ("app.services.litellm_service", "LiteLLMService"),
+    "local": ("app.services.local_service", "LocalService"),
+}
+EMB_PROVIDERS: Dict[str, Tuple[str, str]] = {
+    "gemini": ("app.services.gemini_service", "GeminiService"),
+    "litellm": ("app.services.litellm_service", "LiteLLMService"),
+    "local": ("app.services.local_service", "LocalService"),
+}
+# Synthetic providers, only routed to when listed in LLM_ROUTING_PROVIDERS
+OFFLINE_PROVIDERS = {"local"}
 
 class LLMManager:
+    """
+    Lazy registry of generation and embedding providers.
+
+    Services are created the first time they are requested and then reused;
+    a provider that serves both roles (litellm) is constructed once. Each
+    one is wrapped, from the provider outwards, in MeteredService (timings
+    and usage of the upstream call alone), RateLimitedService (queueing for
+    the provider's limits) and HedgedService (backup requests, which are
+    therefore rate limited too), each layer only when enabled. Embedding
+    services get CachedEmbeddingService outermost, so cache hits never
+    queue. Nothing is imported for providers that are never used, and a
+    provider that cannot be built (e.g. missing API key) only fails the
+    requests that use it.
+    """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(LLMManager, cls).__new__(cls)
             cls._instance.active_provider = "gemini" # Default
-            # Mapping for generation service
-            cls._instance.gen_services = {
-                "gemini": gemini_gen_service,
-                "litellm": litellm_service
-            }
-            # Mapping for embedding service
-            cls._instance.emb_services = {
-                "gemini": gemini_service,
-                "litellm": litellm_service
-            }
+            cls._instance.routing_mode = settings.LLM_ROUTING_MODE
+            # Constructed services, filled on first use
+            cls._instance.gen_services = {}
+            cls._instance.emb_services = {}
+            cls._instance._instances = {}
+            cls._instance._lock = threading.Lock()
+            # Content-addressed cache in front of every embedding service
+            cls._instance.embedding_cache = None
+            if settings.EMBEDDING_CACHE_ENABLED:
+                cls._instance.embedding_cache = EmbeddingCache(
+                    max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                    db_path=settings.EMBEDDING_CACHE_DB_PATH or None
+                )
         return cls._instance
 
-    def get_service(self):
-        """Returns the generation service"""
-        return self.gen_services.get(self.active_provider, gemini_gen_service)
+    def _build(self, spec: Tuple[str, str]) -> Any:
+        with self._lock:
+            if spec not in self._instances:
+                module_name, class_name = spec
+                module = importlib.import_module(module_name)
+                self._instances[spec] = getattr(module, class_name)()
+            return self._instances[spec]
+
+    def _wrap(self, service: Any, name: str) -> Any:
+        if settings.METRICS_ENABLED or settings.REQUEST_TIMING_ENABLED:
+            service = MeteredService(service, name)
+        if settings.LLM_RATE_LIMIT_ENABLED:
+            service = RateLimitedService(service, name, rate_limiter)
+        if settings.HEDGE_ENABLED:
+            service = HedgedService(service, name, hedger, alternate=self._hedge_target)
+        return service
+
+    def _hedge_target(self) -> Optional[Tuple[str, Any]]:
+        """The alternate provider chat hedges go to, without its own hedging"""
+        name = settings.HEDGE_ALTERNATE_PROVIDER
+        if not name:
+            return None
+        service = self.get_service(name)
+        return name, service._service if isinstance(service, HedgedService) else service
+
+    def get_service(self, provider: Optional[str] = None):
+        """Returns the generation service of `provider` (default: the active one)"""
+        name = provider or self.active_provider
+        if name not in GEN_PROVIDERS:
+            raise ValueError(f"Unknown provider: {name}")
+        if name not in self.gen_services:
+            self.gen_services[name] = self._wrap(self._build(GEN_PROVIDERS[name]), name)
+        return self.gen_services[name]
+
+    def default_model(self, provider: Optional[str] = None) -> Optional[str]:
+        """Model `provider` (default: the active one) uses when a request names none; None if it cannot be built"""
+        try:
+            return self.get_service(provider).model_name
+        except Exception:
+            return None
+
+    def get_embedding_service(self, provider: Optional[str] = None):
+        """Returns the embedding service, falling back to gemini for providers without one"""
+        name = provider or self.active_provider
+        if name not in EMB_PROVIDERS:
+            name = "gemini"
+        if name not in self.emb_services:
+            service = self._wrap(self._build(EMB_PROVIDERS[name]), name)
+            if self.embedding_cache is not None:
+                service = CachedEmbeddingService(service, name, self.embedding_cache)
+            self.emb_services[name] = service
+        return self.emb_services[name]
 
-    def get_embedding_service(self):
-        """Returns the embedding service"""
-        return self.emb_services.get(self.active_provider, gemini_service)
+    def warm_up(self, providers: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Builds the given providers ahead of the first request.
+        Returns provider -> error message (None when it loaded).
+        """
+        results: Dict[str, Optional[str]] = {}
+        for name in providers:
+            try:
+                if name in GEN_PROVIDERS:
+                    self.get_service(name)
+                if name in EMB_PROVIDERS:
+                    self.get_embedding_service(name)
+                if name not in GEN_PROVIDERS and name not in EMB_PROVIDERS:
+                    raise ValueError(f"Unknown provider: {name}")
+                results[name] = None
+            except Exception as e:
+                results[name] = str(e) or type(e).__name__
+        return results
+
+    def _route(self, name: str, model: Optional[str]) -> Route:
+        service = self.gen_services.get(name)
+        return name, model or (service.model_name if service is not None else None)
+
+    def routes(self, provider: Optional[str] = None, model: Optional[str] = None) -> List[Route]:
+        """
+        (provider, model) pairs to try for a request, in order.
+
+        A pinned provider is used as is. So is the active provider in
+        "active" mode, or when only a model is given (model names belong to
+        one provider). In "latency" mode the routing providers are ranked by
+        provider_router, skipping those with an open circuit.
+        """
+        if not self.is_routed(provider, model):
+            return [self._route(provider or self.active_provider, model)]
+        names = [p.strip() for p in settings.LLM_ROUTING_PROVIDERS.split(",") if p.strip()] or [
+            name for name in self.available_providers() if name not in OFFLINE_PROVIDERS
+        ]
+        return provider_router.rank([self._route(name, None) for name in names if name in GEN_PROVIDERS])
+
+    def is_routed(self, provider: Optional[str] = None, model: Optional[str] = None) -> bool:
+        """True when a request is routed (and guarded by circuit breakers) rather than pinned"""
+        return not (provider or model) and self.routing_mode == "latency"
+
+    def set_routing_mode(self, mode: str):
+        if mode not in ("active", "latency"):
+            raise ValueError(f"Unknown routing mode: {mode}")
+        self.routing_mode = mode
+
+    def available_providers(self) -> List[str]:
+        return list(GEN_PROVIDERS)
+
+    def loaded_providers(self) -> List[str]:
+        return sorted(set(self.gen_services) | set(self.emb_services))
 
     def set_provider(self, provider_name: str):
-        if provider_name in self.gen_services:
+        if provider_name in GEN_PROVIDERS:
             self.active_provider = provider_name
         else:
             raise ValueError(f"Unknown provider: {provider_name}")
@@ -39,3 +178,7 @@ class LLMManager:
         return self.active_provider
 
 llm_manager = LLMManager()
+
+# Provider and routing changes made through /config reach every worker
+shared_state.register("provider", llm_manager.set_provider)
+shared_state.register("routing_mode", llm_manager.set_routing_mode)
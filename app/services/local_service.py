@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import re
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.timing import phase
+from app.services.token_counter import token_counter
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_FILLER = ("the", "local", "provider", "returns", "a", "synthetic", "answer", "for", "load", "testing")
+
+
+def _bucket(token: str, buckets: int) -> int:
+    # blake2b instead of hash(): stable across processes and restarts
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") % buckets
+
+
+class LocalService:
+    """
+    Offline provider for load tests and profiling: no network, no keys.
+
+    Embeddings are feature-hashed bags of words: each lower-cased word picks
+    a row of a fixed random table (seeded per dimension), rows are summed and
+    the result L2-normalized, all as one matrix product per batch. The same
+    text always gets the same vector, and texts sharing words land close
+    together, so search and the semantic cache behave plausibly.
+
+    Completions are synthetic text derived from the last message, with usage
+    counted by the local token counter. LOCAL_LATENCY / LOCAL_EMBEDDING_LATENCY
+    add a fixed delay per call; streams are paced at LOCAL_TOKENS_PER_SECOND.
+    """
+
+    BUCKETS = 4096
+
+    def __init__(self, model_name: Optional[str] = None, embedding_model: Optional[str] = None):
+        self.model_name = model_name or settings.LOCAL_GEN_MODEL
+        self.embedding_model = embedding_model or settings.LOCAL_EMBEDDING_MODEL
+        self._tables: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    # ---- Embeddings ----
+
+    def _table(self, dimension: int) -> np.ndarray:
+        with self._lock:
+            if dimension not in self._tables:
+                rng = np.random.default_rng(dimension)
+                self._tables[dimension] = rng.standard_normal((self.BUCKETS, dimension), dtype=np.float32)
+            return self._tables[dimension]
+
+    def embed(self, texts: List[str], dimension: int) -> np.ndarray:
+        """(len(texts), dimension) float32 matrix of unit vectors"""
+        if dimension < 1:
+            raise ValueError("dimension must be positive")
+        rows, columns = [], []
+        for row, text in enumerate(texts):
+            # Empty / punctuation-only texts still get a (shared) vector
+            tokens = _TOKEN.findall(text.lower()) or [text]
+            rows.extend([row] * len(tokens))
+            columns.extend(_bucket(token, self.BUCKETS) for token in tokens)
+        counts = np.zeros((len(texts), self.BUCKETS), dtype=np.float32)
+        np.add.at(counts, (rows, columns), 1.0)
+        vectors = counts @ self._table(dimension)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+        return (await self.generate_batch_embeddings([text], dimension))[0]
+
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        if settings.LOCAL_EMBEDDING_LATENCY > 0:
+            await asyncio.sleep(settings.LOCAL_EMBEDDING_LATENCY)
+        return self.embed(texts, dimension).tolist()
+
+    # ---- Generation ----
+
+    def _complete(self, messages: List[Any], config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        config = config or {}
+        last = messages[-1] if messages else {}
+        last = last.model_dump() if hasattr(last, "model_dump") else last
+        content = (last.get("content") or last.get("parts") or "") if isinstance(last, dict) else last
+        prompt = " ".join(str(content).split())
+
+        limit = settings.LOCAL_COMPLETION_TOKENS
+        if config.get("max_output_tokens"):
+            limit = min(limit, config["max_output_tokens"])
+        words = f"Local response to: {prompt[:80]}".split()
+        words += [_FILLER[i % len(_FILLER)] for i in range(max(0, limit - len(words)))]
+        text = " ".join(words[:max(limit, 1)])
+
+        # Uncalibrated counts: this provider's "tokenizer" is the local estimate itself
+        model = config.get("model") or self.model_name
+        prompt_tokens = token_counter.raw_count(messages, model=model)
+        completion_tokens = token_counter.raw_count(prompt=text, model=model)
+        return {
+            "content": text,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            },
+            "model": model
+        }
+
+    async def generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+        return (await self.chat_with_usage([{"role": "user", "content": prompt}], config=config))["content"]
+
+    async def chat(self, messages: List[Dict[str, str]], config: Optional[Dict[str, Any]] = None) -> str:
+        return (await self.chat_with_usage(messages, config=config))["content"]
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Chat interface returning content and usage.
+        """
+        with phase("format"):
+            result = self._complete(messages, config)
+        if settings.LOCAL_LATENCY > 0:
+            await asyncio.sleep(settings.LOCAL_LATENCY)
+        return result
+
+    async def stream_chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat_with_usage: LOCAL_LATENCY to the first
+        token, then one delta per word. Yields the same events as the other providers.
+        """
+        with phase("format"):
+            result = self._complete(messages, config)
+        if settings.LOCAL_LATENCY > 0:
+            await asyncio.sleep(settings.LOCAL_LATENCY)
+
+        interval = 1.0 / settings.LOCAL_TOKENS_PER_SECOND if settings.LOCAL_TOKENS_PER_SECOND > 0 else 0.0
+        for i, word in enumerate(result["content"].split(" ")):
+            if interval and i:
+                await asyncio.sleep(interval)
+            yield {"type": "delta", "content": word if i == 0 else f" {word}"}
+        yield {"type": "done", "usage": result["usage"], "model": result["model"]}
+
+    async def stream_generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of generate_content. Yields the same events as stream_chat_with_usage.
+        """
+        async for event in self.stream_chat_with_usage([{"role": "user", "content": prompt}], config=config):
+            yield event
+
+    async def health_check(self) -> bool:
+        return True
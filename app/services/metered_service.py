@@ -0,0 +1,107 @@
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional
+
+from app.core.metrics import (
+    EMBEDDING_BATCH_SIZE,
+    LLM_REQUEST_DURATION,
+    LLM_REQUESTS_IN_FLIGHT,
+    LLM_TIME_TO_FIRST_EVENT,
+    record_usage,
+)
+from app.core.timing import phase, record
+from app.services.token_counter import token_counter
+
+
+class MeteredService:
+    """
+    Wraps a provider service so every upstream call is timed (per provider,
+    model and operation), counted in flight and, where the provider reports
+    usage, counted in tokens. It sits closest to the provider, so the
+    latencies exclude rate limiter queueing and hedging. The same time is
+    reported as the request's "upstream" phase (Server-Timing). Reported
+    prompt token counts also calibrate the local token counter.
+    """
+
+    def __init__(self, service: Any, provider: str):
+        self._service = service
+        self.provider = provider
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    def _model(self, config: Optional[Dict[str, Any]] = None) -> str:
+        return (config or {}).get("model") or self._service.model_name
+
+    def _embedding_model(self) -> str:
+        return getattr(self._service, "embedding_model", None) or self._service.model_name
+
+    def _usage(self, model: str, usage: Optional[Dict[str, Any]], messages: Optional[List[Any]] = None, prompt: Optional[str] = None) -> None:
+        """Records reported usage; its prompt count tunes later local estimates for the model"""
+        record_usage(self.provider, model, usage)
+        token_counter.calibrate(model, token_counter.raw_count(messages, prompt, model), (usage or {}).get("prompt_tokens"))
+
+    async def _observe(self, operation: str, model: str, call: Awaitable[Any]) -> Any:
+        in_flight = LLM_REQUESTS_IN_FLIGHT.labels(self.provider)
+        in_flight.inc()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with phase("upstream"):
+                result = await call
+            outcome = "ok"
+            return result
+        finally:
+            in_flight.dec()
+            LLM_REQUEST_DURATION.labels(self.provider, model, operation, outcome).observe(time.perf_counter() - start)
+
+    async def _observe_stream(self, operation: str, model: str, events: AsyncIterator[Dict[str, Any]],
+                              messages: Optional[List[Any]] = None, prompt: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        in_flight = LLM_REQUESTS_IN_FLIGHT.labels(self.provider)
+        in_flight.inc()
+        start = time.perf_counter()
+        first = True
+        outcome = "error"
+        try:
+            async for event in events:
+                if first:
+                    LLM_TIME_TO_FIRST_EVENT.labels(self.provider, model, operation).observe(time.perf_counter() - start)
+                    first = False
+                if event.get("type") == "done":
+                    self._usage(model, event.get("usage"), messages, prompt)
+                yield event
+            outcome = "ok"
+        finally:
+            in_flight.dec()
+            elapsed = time.perf_counter() - start
+            record("upstream", elapsed)
+            LLM_REQUEST_DURATION.labels(self.provider, model, operation, outcome).observe(elapsed)
+
+    async def generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+        return await self._observe("generate", self._model(config), self._service.generate_content(prompt, config=config))
+
+    async def chat(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> str:
+        return await self._observe("chat", self._model(config), self._service.chat(messages, config=config))
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        model = self._model(config)
+        result = await self._observe("chat", model, self._service.chat_with_usage(messages, config=config))
+        self._usage(model, result.get("usage"), messages)
+        return result
+
+    def stream_chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        return self._observe_stream(
+            "stream_chat", self._model(config), self._service.stream_chat_with_usage(messages, config=config), messages=messages
+        )
+
+    def stream_generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        return self._observe_stream(
+            "stream_generate", self._model(config), self._service.stream_generate_content(prompt, config=config), prompt=prompt
+        )
+
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+        EMBEDDING_BATCH_SIZE.labels(self.provider).observe(1)
+        return await self._observe("embed", self._embedding_model(), self._service.generate_embedding(text, dimension))
+
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        EMBEDDING_BATCH_SIZE.labels(self.provider).observe(len(texts))
+        return await self._observe("embed_batch", self._embedding_model(), self._service.generate_batch_embeddings(texts, dimension))
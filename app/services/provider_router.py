@@ -0,0 +1,191 @@
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+Route = Tuple[str, Optional[str]]  # (provider, model); model is None until the provider is built
+
+# Errors caused by the request itself; another provider would fail the same way
+CALLER_ERRORS = (ValueError, TypeError)
+
+
+def is_caller_error(error: Exception) -> bool:
+    """
+    True when a request failed because of its own input rather than the
+    provider's health: CALLER_ERRORS (SDK input validation) and upstream
+    4xx responses other than 408 (timeout) and 429 (rate limit).
+    """
+    if isinstance(error, CALLER_ERRORS):
+        return True
+    # litellm / httpx carry status_code, google.genai APIError carries code
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+class ProviderUnavailable(Exception):
+    """Every eligible provider has an open circuit."""
+
+    def __init__(self, providers: List[str], retry_after: float):
+        super().__init__(f"No healthy provider among {', '.join(providers)}; retry in {retry_after:.0f}s")
+        self.providers = providers
+        self.retry_after = retry_after
+
+
+class RouteStats:
+    """
+    EWMA latency and error rate of one (provider, model), plus its circuit
+    breaker: closed -> open after `failure_threshold` consecutive failures ->
+    half_open after `reset_timeout` (one trial request) -> closed on success.
+    """
+
+    def __init__(self, alpha: float, failure_threshold: int, reset_timeout: float):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.state = "closed"  # closed | open | half_open
+        self.opened_at = 0.0
+        self.trial_started_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _ewma(self, previous: Optional[float], value: float) -> float:
+        return value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+
+    def allows(self, now: float) -> bool:
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self.trial_started_at = None
+        if self.state == "half_open":
+            # A trial that never reported back (cancelled, rejected locally) is abandoned
+            return self.trial_started_at is None or now - self.trial_started_at >= self.reset_timeout
+        return self.state == "closed"
+
+    def acquire(self, now: float) -> bool:
+        """Called right before a request is sent; takes the trial slot when half-open"""
+        if not self.allows(now):
+            return False
+        if self.state == "half_open":
+            self.trial_started_at = now
+        return True
+
+    def release(self) -> None:
+        """Frees the half-open trial slot without recording an outcome"""
+        self.trial_started_at = None
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - now)
+
+    def record(self, latency_ms: float, error: Optional[str]) -> None:
+        self.samples += 1
+        self.trial_started_at = None
+        self.error_rate = self._ewma(self.error_rate if self.samples > 1 else None, 1.0 if error else 0.0)
+        if error is None:
+            self.latency_ms = self._ewma(self.latency_ms, latency_ms)
+            self.consecutive_failures = 0
+            self.state = "closed"
+            return
+
+        self.last_error = error
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def score(self, error_penalty: float) -> float:
+        """Lower is better; routes without samples score 0 so they get measured"""
+        if self.latency_ms is None:
+            return 0.0
+        return self.latency_ms * (1 + error_penalty * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "latency_ms": None if self.latency_ms is None else round(self.latency_ms, 1),
+            "error_rate": round(self.error_rate, 3),
+            "samples": self.samples,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class ProviderRouter:
+    """
+    Orders providers for a request by their observed health.
+
+    Each (provider, model) keeps an EWMA of latency and error rate; the
+    candidates are ranked by latency inflated by the error rate, and
+    providers whose circuit is open are skipped so requests fail over
+    immediately instead of waiting on timeouts. A small share of requests
+    (`explore`) goes to a random eligible provider to keep every route measured.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        error_penalty: float = 4.0,
+        explore: float = 0.05
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.error_penalty = error_penalty
+        self.explore = explore
+        self._routes: Dict[Route, RouteStats] = {}
+
+    def _stats(self, route: Route) -> RouteStats:
+        if route not in self._routes:
+            self._routes[route] = RouteStats(self.alpha, self.failure_threshold, self.reset_timeout)
+        return self._routes[route]
+
+    def rank(self, routes: List[Route]) -> List[Route]:
+        """
+        Eligible routes, best first. Raises ProviderUnavailable when every
+        circuit is open.
+        """
+        now = time.monotonic()
+        eligible = [r for r in routes if self._stats(r).allows(now)]
+        if not eligible:
+            retry_after = min(self._stats(r).retry_after(now) for r in routes)
+            raise ProviderUnavailable([p for p, _ in routes], retry_after)
+
+        eligible.sort(key=lambda r: self._stats(r).score(self.error_penalty))
+        if len(eligible) > 1 and random.random() < self.explore:
+            eligible.insert(0, eligible.pop(random.randrange(1, len(eligible))))
+        return eligible
+
+    def acquire(self, route: Route) -> bool:
+        """
+        False when the route's circuit opened (or its half-open trial was
+        taken) after ranking; the caller moves on to the next route.
+        """
+        return self._stats(route).acquire(time.monotonic())
+
+    def record(self, provider: str, model: Optional[str], latency_s: float, error: Optional[Exception] = None) -> None:
+        message = None if error is None else (str(error) or type(error).__name__)
+        self._stats((provider, model)).record(latency_s * 1000, message)
+        # Routes ranked before the provider was built have no model yet
+        if model is not None and (provider, None) in self._routes:
+            self._routes.pop((provider, None))
+
+    def release(self, provider: str, model: Optional[str]) -> None:
+        """For calls that ended without saying anything about the provider's health (bad input)"""
+        self._stats((provider, model)).release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{p}:{m}" if m else p: s.to_dict() for (p, m), s in self._routes.items()}
+
+
+provider_router = ProviderRouter(
+    alpha=settings.LLM_ROUTING_EWMA_ALPHA,
+    failure_threshold=settings.LLM_CIRCUIT_FAILURES,
+    reset_timeout=settings.LLM_CIRCUIT_RESET_TIMEOUT,
+    explore=settings.LLM_ROUTING_EXPLORE
+)
@@ -0,0 +1,403 @@
+import asyncio
+import json
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.token_counter import token_counter
+
+
+class RateLimitExceeded(Exception):
+    """A request could not get a slot within the queue timeout."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Rate limit for {key} exceeded; retry in {retry_after:.1f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for upstream 429s (litellm RateLimitError, google.genai ClientError, httpx)"""
+    for attr in ("status_code", "code"):
+        if getattr(error, attr, None) == 429:
+            return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Reads a Retry-After header (seconds or HTTP date) from the error's response, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` per second up to `per_minute`,
+    so a full minute's budget may be spent in a burst.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Charges (or refunds, if negative) the difference to an earlier estimate"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class ModelLimiter:
+    """
+    Limits for one (provider, model): requests/minute, tokens/minute and
+    concurrent calls. Callers queue in arrival order and give up with
+    RateLimitExceeded after `max_wait` seconds.
+    """
+
+    def __init__(self, key: str, rpm: int, tpm: int, concurrency: int, max_wait: float):
+        self.key = key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self._queue_lock = asyncio.Lock()
+        self.blocked_until = 0.0
+        self.queued = 0
+        self.in_flight = 0
+        self._counters = {"admitted": 0, "rejected": 0, "retries": 0, "waited": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _bucket_wait(self, tokens: int) -> float:
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.wait_time(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.wait_time(tokens))
+        return wait
+
+    def _reject(self, retry_after: float) -> RateLimitExceeded:
+        self._counters["rejected"] += 1
+        return RateLimitExceeded(self.key, retry_after)
+
+    async def _admit(self, tokens: int) -> float:
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        self.queued += 1
+        try:
+            # One waiter at a time drains the buckets, so the queue is FIFO
+            async with self._queue_lock:
+                while True:
+                    wait = self._bucket_wait(tokens)
+                    if wait <= 0:
+                        break
+                    if time.monotonic() + wait > deadline:
+                        raise self._reject(wait)
+                    await asyncio.sleep(wait)
+                if self.request_bucket:
+                    self.request_bucket.consume(1)
+                if self.token_bucket:
+                    self.token_bucket.consume(tokens)
+
+            if self.semaphore:
+                try:
+                    # Not wait_for: before 3.12 it can drop a permit acquired just as the timeout fires
+                    async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                        await self.semaphore.acquire()
+                except TimeoutError:
+                    # Give back what was taken for a call that never happens
+                    if self.request_bucket:
+                        self.request_bucket.adjust(-1)
+                    if self.token_bucket:
+                        self.token_bucket.adjust(-tokens)
+                    raise self._reject(1.0)
+        finally:
+            self.queued -= 1
+
+        waited = time.monotonic() - start
+        self._counters["admitted"] += 1
+        if waited > 0.001:
+            self._counters["waited"] += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return waited
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[None]:
+        await self._admit(tokens)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.semaphore:
+                self.semaphore.release()
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        if self.token_bucket and actual is not None:
+            self.token_bucket.adjust(actual - estimated)
+
+    def block_for(self, seconds: float) -> None:
+        """Holds back every caller of this model, e.g. after an upstream Retry-After"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        admitted = self._counters["admitted"]
+        return {
+            "limits": {"rpm": self.rpm, "tpm": self.tpm, "concurrency": self.concurrency, "max_wait": self.max_wait},
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            **self._counters,
+            "avg_wait_ms": round(self._wait_total / admitted * 1000, 1) if admitted else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 1),
+        }
+
+
+class RateLimiter:
+    """
+    Per-(provider, model) limiters plus retry of upstream 429s.
+
+    Limits are the defaults unless overridden for "provider" or
+    "provider:model" (the more specific key wins). A 429 is retried up to
+    `max_retries` times with exponential backoff and jitter; a Retry-After
+    header replaces the backoff and also pauses the other callers of that model.
+
+    Limits apply to the whole deployment. Buckets and semaphores live in
+    each process, so with `workers` processes each enforces its share
+    (rounded up); a busy worker cannot borrow an idle one's share.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        concurrency: int,
+        max_wait: float,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_delay: float = 30.0,
+        workers: int = 1
+    ):
+        self.defaults = {"rpm": rpm, "tpm": tpm, "concurrency": concurrency}
+        self.workers = max(1, workers)
+        self.max_wait = max_wait
+        self.overrides = overrides or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self._limiters: Dict[Tuple[str, str], ModelLimiter] = {}
+
+    def limiter(self, provider: str, model: str) -> ModelLimiter:
+        key = (provider, model)
+        if key not in self._limiters:
+            limits = {**self.defaults, **self.overrides.get(provider, {}), **self.overrides.get(f"{provider}:{model}", {})}
+            self._limiters[key] = ModelLimiter(
+                f"{provider}:{model}",
+                rpm=self._share(limits["rpm"]),
+                tpm=self._share(limits["tpm"]),
+                concurrency=self._share(limits["concurrency"]),
+                max_wait=self.max_wait
+            )
+        return self._limiters[key]
+
+    def _share(self, limit: Any) -> int:
+        """This process's part of a deployment-wide limit (0 stays unlimited)"""
+        return math.ceil(int(limit) / self.workers)
+
+    def _retry_delay(self, limiter: ModelLimiter, error: Exception, attempt: int) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+            limiter.block_for(delay)
+        else:
+            delay = min(self.max_delay, self.backoff * (2 ** attempt)) * (0.5 + random.random() / 2)
+        limiter._counters["retries"] += 1
+        return delay
+
+    async def call(
+        self,
+        provider: str,
+        model: str,
+        tokens: int,
+        func: Callable[..., Any],
+        *args: Any,
+        usage_of: Optional[Callable[[Any], Optional[int]]] = None,
+        **kwargs: Any
+    ) -> Any:
+        limiter = self.limiter(provider, model)
+        for attempt in range(self.max_retries + 1):
+            async with limiter.slot(tokens):
+                try:
+                    result = await func(*args, **kwargs)
+                    if usage_of:
+                        limiter.record_usage(tokens, usage_of(result))
+                    return result
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == self.max_retries:
+                        raise
+                    delay = self._retry_delay(limiter, e, attempt)
+            await asyncio.sleep(delay)
+
+    async def stream(
+        self,
+        provider: str,
+        model: str,
+        tokens: int,
+        events: Callable[[], AsyncIterator[Dict[str, Any]]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Holds a slot for the whole stream. A 429 is only retried before the
+        first event, since a partial answer cannot be taken back.
+        """
+        limiter = self.limiter(provider, model)
+        for attempt in range(self.max_retries + 1):
+            started = False
+            async with limiter.slot(tokens):
+                try:
+                    async for event in events():
+                        started = True
+                        if event.get("type") == "done":
+                            usage = event.get("usage") or {}
+                            limiter.record_usage(tokens, usage.get("total_tokens"))
+                        yield event
+                    return
+                except Exception as e:
+                    if started or not is_rate_limited(e) or attempt == self.max_retries:
+                        raise
+                    delay = self._retry_delay(limiter, e, attempt)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {limiter.key: limiter.stats() for limiter in self._limiters.values()}
+
+
+def _usage_total(result: Dict[str, Any]) -> Optional[int]:
+    return (result.get("usage") or {}).get("total_tokens")
+
+
+class RateLimitedService:
+    """
+    Wraps a provider service so every upstream call goes through the rate
+    limiter. Anything that is not a model call is delegated unchanged.
+    Token budgets are charged with the local token counter's count
+    (calibrated by MeteredService from the usage providers report).
+    """
+
+    def __init__(self, service: Any, provider: str, limiter: RateLimiter):
+        self._service = service
+        self.provider = provider
+        self.limiter = limiter
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    def _model(self, config: Optional[Dict[str, Any]] = None) -> str:
+        return (config or {}).get("model") or self._service.model_name
+
+    def _embedding_model(self) -> str:
+        return getattr(self._service, "embedding_model", None) or self._service.model_name
+
+    @staticmethod
+    def _output_tokens(config: Optional[Dict[str, Any]]) -> int:
+        return int((config or {}).get("max_output_tokens") or 0)
+
+    def _prompt_tokens(self, config: Optional[Dict[str, Any]], messages: Optional[List[Any]] = None, prompt: Optional[str] = None) -> int:
+        model = self._model(config)
+        count = token_counter.count_text(prompt, model) if prompt is not None else token_counter.count_messages(messages, model)
+        return count + self._output_tokens(config)
+
+    async def generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+        tokens = self._prompt_tokens(config, prompt=prompt)
+        return await self.limiter.call(self.provider, self._model(config), tokens, self._service.generate_content, prompt, config=config)
+
+    async def chat(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> str:
+        tokens = self._prompt_tokens(config, messages)
+        return await self.limiter.call(self.provider, self._model(config), tokens, self._service.chat, messages, config=config)
+
+    async def chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        tokens = self._prompt_tokens(config, messages)
+        return await self.limiter.call(
+            self.provider, self._model(config), tokens, self._service.chat_with_usage, messages, config=config, usage_of=_usage_total
+        )
+
+    def stream_chat_with_usage(self, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        tokens = self._prompt_tokens(config, messages)
+        return self.limiter.stream(
+            self.provider, self._model(config), tokens, lambda: self._service.stream_chat_with_usage(messages, config=config)
+        )
+
+    def stream_generate_content(self, prompt: str, config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        tokens = self._prompt_tokens(config, prompt=prompt)
+        return self.limiter.stream(
+            self.provider, self._model(config), tokens, lambda: self._service.stream_generate_content(prompt, config=config)
+        )
+
+    async def generate_embedding(self, text: str, dimension: int = 768) -> List[float]:
+        model = self._embedding_model()
+        return await self.limiter.call(
+            self.provider, model, token_counter.count_text(text, model), self._service.generate_embedding, text, dimension
+        )
+
+    async def generate_batch_embeddings(self, texts: List[str], dimension: int = 768) -> List[List[float]]:
+        model = self._embedding_model()
+        tokens = sum(token_counter.count_text(text, model) for text in texts)
+        return await self.limiter.call(
+            self.provider, model, tokens, self._service.generate_batch_embeddings, texts, dimension
+        )
+
+
+def _overrides() -> Dict[str, Dict[str, Any]]:
+    if not settings.LLM_RATE_LIMITS:
+        return {}
+    return json.loads(settings.LLM_RATE_LIMITS)
+
+
+rate_limiter = RateLimiter(
+    rpm=settings.LLM_RATE_LIMIT_RPM,
+    tpm=settings.LLM_RATE_LIMIT_TPM,
+    concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_wait=settings.LLM_QUEUE_TIMEOUT,
+    overrides=_overrides(),
+    max_retries=settings.LLM_RETRY_MAX_ATTEMPTS,
+    backoff=settings.LLM_RETRY_BACKOFF,
+    max_delay=settings.LLM_RETRY_MAX_DELAY,
+    workers=settings.WEB_CONCURRENCY
+)
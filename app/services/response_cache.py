@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.concurrency import run_sync
+from app.services.embedding_cache import normalize_text
+
+
+def _canonical_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return normalize_text(content)
+    if isinstance(content, list):
+        return [_canonical_content(part) for part in content]
+    if isinstance(content, dict):
+        return {k: _canonical_content(v) for k, v in content.items()}
+    return content
+
+
+def canonical_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Role/content pairs with normalized text, so requests that differ only in
+    whitespace, unicode form or extra message fields share an entry.
+    """
+    canonical = []
+    for message in messages:
+        m = message.model_dump() if hasattr(message, "model_dump") else message
+        canonical.append({
+            "role": m.get("role", "user"),
+            "content": _canonical_content(m.get("content") or m.get("parts")),
+        })
+    return canonical
+
+
+def make_response_key(kind: str, provider: str, model: str, payload: Any, params: Dict[str, Any]) -> str:
+    """
+    `kind` separates chat from generate; `payload` is the canonical messages
+    or the prompt; `params` are the generation parameters (model excluded).
+    """
+    body = json.dumps({
+        "kind": kind,
+        "provider": provider,
+        "model": model,
+        "payload": payload,
+        "params": {k: v for k, v in params.items() if k != "model"},
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class SQLiteResponseStore:
+    """
+    Persistent tier: responses stored as JSON text in a single SQLite table.
+    Calls are blocking and are expected to run on the shared thread pool.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Exact-match cache for deterministic (temperature 0) LLM responses.
+
+    Tier 1 is an in-process LRU bounded by a byte budget (size of the JSON
+    entries); tier 2 is an optional SQLite store that survives restarts.
+    Disk hits are promoted into the LRU. Entries keep the response exactly
+    as returned upstream, including its `usage` block.
+    """
+
+    def __init__(self, max_bytes: int, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._disk = SQLiteResponseStore(db_path) if db_path else None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "stores": 0,
+        }
+
+    def _remember(self, key: str, encoded: str) -> None:
+        if key in self._entries:
+            self._bytes -= len(key) + len(self._entries.pop(key))
+        size = len(key) + len(encoded)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = encoded
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key, old_encoded = self._entries.popitem(last=False)
+            self._bytes -= len(old_key) + len(old_encoded)
+            self._counters["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return json.loads(encoded)
+
+        if self._disk is not None:
+            encoded = await run_sync(self._disk.get, key)
+            if encoded is not None:
+                self._remember(key, encoded)
+                self._counters["disk_hits"] += 1
+                return json.loads(encoded)
+
+        self._counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, response: Dict[str, Any]) -> None:
+        encoded = json.dumps(response, ensure_ascii=False)
+        self._remember(key, encoded)
+        self._counters["stores"] += 1
+        if self._disk is not None:
+            await run_sync(self._disk.put, key, encoded)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+        hits = lookups - self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            "memory_max_bytes": self.max_bytes,
+            "disk_enabled": self._disk is not None,
+        }
@@ -0,0 +1,69 @@
+from typing import Any, Dict, List
+from app.core.config import settings
+from app.models.dtos import SearchRequest, BatchSearchRequest
+from app.repositories.qdrant_repo import build_filter
+from app.repositories.async_qdrant_repo import async_qdrant_repo
+from app.services.embedding_batcher import embedding_batcher
+from app.services.embedding_chunker import chunked_embedder
+
+
+class SearchService:
+    """
+    Text -> embedding -> Qdrant nearest-neighbour search.
+    """
+
+    def __init__(self, repo: Any):
+        self.repo = repo
+
+    @staticmethod
+    def _to_hits(points: List[Any]) -> List[Dict[str, Any]]:
+        return [{"id": p.id, "score": p.score, "payload": p.payload} for p in points]
+
+    async def search(self, request: SearchRequest) -> List[Dict[str, Any]]:
+        from app.services.llm_manager import llm_manager
+        query_filter = build_filter(request.filter)
+        service = llm_manager.get_embedding_service()
+
+        if settings.EMBEDDING_COALESCE_ENABLED:
+            vector = await embedding_batcher.embed(service, request.query, request.dimension)
+        else:
+            vector = await service.generate_embedding(request.query, request.dimension)
+
+        points = await self.repo.search(
+            request.collection_name,
+            vector,
+            limit=request.limit,
+            query_filter=query_filter,
+            score_threshold=request.score_threshold,
+            with_payload=request.with_payload
+        )
+        return self._to_hits(points)
+
+    async def search_batch(self, request: BatchSearchRequest) -> List[List[Dict[str, Any]]]:
+        """
+        Embeds all queries together (one provider call per chunk of
+        EMBEDDING_BATCH_MAX_ITEMS queries) and sends them to Qdrant as one batch.
+        """
+        from app.services.llm_manager import llm_manager
+        query_filter = build_filter(request.filter)
+        if not request.queries:
+            return []
+
+        vectors, failed = await chunked_embedder.embed(
+            llm_manager.get_embedding_service(), request.queries, request.dimension
+        )
+        if failed:
+            raise RuntimeError(f"Embedding failed for {len(failed)} queries: {failed[0]['error']}")
+
+        results = await self.repo.search_batch(
+            request.collection_name,
+            vectors,
+            limit=request.limit,
+            query_filter=query_filter,
+            score_threshold=request.score_threshold,
+            with_payload=request.with_payload
+        )
+        return [self._to_hits(points) for points in results]
+
+
+search_service = SearchService(async_qdrant_repo)
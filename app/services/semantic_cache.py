@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.repositories.qdrant_repo import build_filter
+from app.services.embedding_batcher import embedding_batcher
+
+
+def message_text(message: Any) -> tuple:
+    """(role, text) of an API message, ChatMessage or dict"""
+    m = message.model_dump() if hasattr(message, "model_dump") else message
+    content = m.get("content") or m.get("parts") or ""
+    if isinstance(content, list):
+        content = " ".join(str(p) for p in content)
+    return m.get("role", "user"), str(content)
+
+
+class SemanticCacheKey:
+    """
+    Where an answer may be reused: `namespace` (provider + model) and
+    `context` (a fingerprint of everything but the final user turn) must
+    match exactly; `text` (the final user turn) only has to be similar.
+    """
+
+    def __init__(self, namespace: str, context: str, text: str):
+        self.namespace = namespace
+        self.context = context
+        self.text = text
+
+    @property
+    def point_id(self) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.namespace}|{self.context}|{self.text}"))
+
+
+class SemanticCache:
+    """
+    Reuses answers to paraphrased prompts.
+
+    The final user turn is embedded and searched in a dedicated Qdrant
+    collection, restricted to entries with the same namespace and context
+    that have not expired. A hit needs cosine similarity >= `threshold`.
+    Cache failures never fail the request: lookups miss and stores are dropped.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(
+        self,
+        repo: Any,
+        collection_name: str,
+        threshold: float,
+        ttl_seconds: int,
+        dimension: int,
+        embedding_provider: Optional[str] = None,
+        embedding_service: Optional[Any] = None
+    ):
+        self.repo = repo
+        self.collection_name = collection_name
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.dimension = dimension
+        self.embedding_provider = embedding_provider
+        self.embedding_service = embedding_service
+        self._collection_ready = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def _embedding_service(self) -> Any:
+        if self.embedding_service is not None:
+            return self.embedding_service
+        from app.services.llm_manager import llm_manager
+        return llm_manager.get_embedding_service(self.embedding_provider)
+
+    def key_for_chat(self, provider: str, model: str, messages: List[Any], config: Optional[Dict[str, Any]] = None) -> Optional[SemanticCacheKey]:
+        turns = [message_text(m) for m in messages]
+        if not turns or turns[-1][0] != "user":
+            return None
+        return self._key(provider, model, turns[:-1], turns[-1][1], config)
+
+    def key_for_prompt(self, provider: str, model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> SemanticCacheKey:
+        return self._key(provider, model, [], prompt, config)
+
+    def _key(self, provider: str, model: str, history: List[tuple], text: str, config: Optional[Dict[str, Any]]) -> SemanticCacheKey:
+        service = self._embedding_service()
+        embedding_model = getattr(service, "embedding_model", None) or service.model_name
+        # Earlier turns (incl. the system prompt), the output limit and the
+        # embedding space all have to match for a neighbour to be comparable
+        context = hashlib.sha256(json.dumps({
+            "history": history,
+            "max_output_tokens": (config or {}).get("max_output_tokens"),
+            "embedding_model": embedding_model,
+            "dimension": self.dimension,
+        }, sort_keys=True).encode("utf-8")).hexdigest()
+        return SemanticCacheKey(f"{provider}:{model}", context, text)
+
+    async def _embed(self, text: str) -> List[float]:
+        service = self._embedding_service()
+        if settings.EMBEDDING_COALESCE_ENABLED:
+            return await embedding_batcher.embed(service, text, self.dimension)
+        return await service.generate_embedding(text, self.dimension)
+
+    async def _ensure_collection(self) -> None:
+        if not self._collection_ready:
+            await self.repo.ensure_collection(self.collection_name, self.dimension)
+            self._collection_ready = True
+
+    async def lookup(self, key: SemanticCacheKey) -> Optional[Dict[str, Any]]:
+        """Returns the stored response of the closest live entry, or None"""
+        try:
+            await self._ensure_collection()
+            vector = await self._embed(key.text)
+            hits = await self.repo.search(
+                self.collection_name,
+                vector,
+                limit=1,
+                query_filter=build_filter({
+                    "namespace": key.namespace,
+                    "context": key.context,
+                    "expires_at": {"gt": time.time()},
+                }),
+                score_threshold=self.threshold,
+            )
+        except Exception as e:
+            self._counters["errors"] += 1
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+
+        if not hits:
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        return {**hits[0].payload["response"], "similarity": hits[0].score}
+
+    async def store(self, key: SemanticCacheKey, response: Dict[str, Any]) -> None:
+        from qdrant_client.http import models
+
+        try:
+            await self._ensure_collection()
+            vector = await self._embed(key.text)
+            now = time.time()
+            await self.repo.upsert_data(self.collection_name, [models.PointStruct(
+                id=key.point_id,
+                vector=vector,
+                payload={
+                    "namespace": key.namespace,
+                    "context": key.context,
+                    "prompt": key.text,
+                    "response": response,
+                    "created_at": now,
+                    "expires_at": now + self.ttl_seconds,
+                }
+            )])
+            self._counters["stores"] += 1
+            if self._counters["stores"] % self.PURGE_EVERY == 0:
+                await self.purge_expired()
+        except Exception as e:
+            self._counters["errors"] += 1
+            print(f"⚠️ Semantic cache store failed: {e}")
+
+    def store_later(self, key: SemanticCacheKey, response: Dict[str, Any]) -> None:
+        """Stores in the background so the caller is answered first"""
+        task = asyncio.ensure_future(self.store(key, response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def purge_expired(self) -> None:
+        await self.repo.delete_points(self.collection_name, build_filter({"expires_at": {"lte": time.time()}}))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_ratio": self._counters["hits"] / lookups if lookups else 0.0,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "collection_name": self.collection_name,
+        }
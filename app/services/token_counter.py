@@ -0,0 +1,262 @@
+import hashlib
+import json
+import math
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # optional: pip install tiktoken (exact counts for OpenAI models)
+    tiktoken = None
+
+# (context window, max output tokens) by model name prefix; the longest match wins
+MODEL_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gemini-2.5": (1048576, 65536),
+    "gemini-2.0": (1048576, 8192),
+    "gemini-1.5-pro": (2097152, 8192),
+    "gemini-1.5-flash": (1048576, 8192),
+    "gpt-4.1": (1047576, 32768),
+    "gpt-4o": (128000, 16384),
+    "local": (32768, 8192),
+}
+
+# Tokens each message adds on top of its text (role, separators)
+MESSAGE_OVERHEAD = 4
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+class ContextWindowExceeded(Exception):
+    """A request does not fit the model's context window or output limit."""
+
+    def __init__(self, model: str, prompt_tokens: int, max_tokens: int, context_window: int, max_output_tokens: int):
+        if max_tokens > max_output_tokens:
+            reason = f"max_tokens {max_tokens} exceeds the model's output limit of {max_output_tokens}"
+        else:
+            reason = (
+                f"{prompt_tokens} prompt tokens + {max_tokens} max_tokens exceed the context window of "
+                f"{context_window}"
+            )
+        super().__init__(f"Request too large for {model}: {reason}")
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+
+
+def _base_model(model: str) -> str:
+    # "litellm_proxy/google/gemini-2.5-flash" -> "gemini-2.5-flash"
+    return (model or "").rsplit("/", 1)[-1]
+
+
+def _message_fields(message: Any) -> Tuple[str, Any]:
+    m = message.model_dump() if hasattr(message, "model_dump") else message
+    if not isinstance(m, dict):
+        return "user", m
+    return m.get("role") or "user", m.get("content") or m.get("parts") or ""
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Tokenizer-free estimate: ~4 ASCII characters per token, ~2 per
+    non-ASCII character (Devanagari, CJK, ...), which the plain
+    characters / 4 rule undercounts several times over.
+    """
+    other = len(_NON_ASCII.findall(text))
+    return math.ceil((len(text) - other) / 4 + other / 2)
+
+
+class TokenCounter:
+    """
+    Local prompt token counts, before any network call.
+
+    Models with a tiktoken encoding (OpenAI's) are counted exactly when
+    tiktoken and its encoding files are available. Others (Gemini, whose
+    tokenizer is not public) use `estimate_text_tokens`, scaled per model by
+    a calibration factor learned from the prompt token counts providers
+    report back (`calibrate`). Raw counts are cached per message text, so
+    resent history and repeated system prompts are counted once.
+
+    Limits come from MODEL_LIMITS, overridden per model prefix by `limits`.
+    """
+
+    CALIBRATION_ALPHA = 0.2
+    CALIBRATION_RANGE = (0.25, 4.0)
+
+    def __init__(self, cache_size: int, default_context_window: int, default_max_output: int,
+                 limits: Optional[Dict[str, Dict[str, int]]] = None):
+        self.cache_size = cache_size
+        self.default_limits = (default_context_window, default_max_output)
+        self.limits = dict(MODEL_LIMITS)
+        for prefix, override in (limits or {}).items():
+            # A partial override keeps the other limit of the closest known model
+            context, output = self.model_limits(prefix)
+            self.limits[prefix] = (int(override.get("context", context)), int(override.get("output", output)))
+        self._cache: "OrderedDict[Tuple[str, Any], int]" = OrderedDict()
+        self._encodings: Dict[str, Any] = {}
+        self._calibration: Dict[str, float] = {}
+        self._counters = {"hits": 0, "misses": 0, "calibrations": 0}
+
+    def _encoding(self, model: str) -> Any:
+        """tiktoken encoding for the model, or None to estimate"""
+        base = _base_model(model)
+        if base not in self._encodings:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    encoding = tiktoken.encoding_for_model(base)
+                except KeyError:
+                    pass  # not an OpenAI model
+                except Exception as e:
+                    # Encoding files are downloaded on first use; offline, estimate instead
+                    print(f"⚠️ tiktoken encoding for {base} unavailable, estimating tokens: {e}")
+            self._encodings[base] = encoding
+        return self._encodings[base]
+
+    def tokenizer(self, model: str) -> str:
+        encoding = self._encoding(model)
+        return f"tiktoken:{encoding.name}" if encoding is not None else "estimate"
+
+    def model_limits(self, model: str) -> Tuple[int, int]:
+        """(context window, max output tokens)"""
+        base = _base_model(model)
+        matches = [prefix for prefix in self.limits if base.startswith(prefix)]
+        return self.limits[max(matches, key=len)] if matches else self.default_limits
+
+    def _raw(self, text: str, model: str) -> int:
+        encoding = self._encoding(model)
+        tokenizer = encoding.name if encoding is not None else "estimate"
+        # Long texts are keyed by digest so the cache does not pin large prompts
+        key = (tokenizer, text if len(text) <= 256 else hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+        count = self._cache.get(key)
+        if count is not None:
+            self._counters["hits"] += 1
+            self._cache.move_to_end(key)
+            return count
+        self._counters["misses"] += 1
+        count = len(encoding.encode(text, disallowed_special=())) if encoding is not None else estimate_text_tokens(text)
+        self._cache[key] = count
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return count
+
+    def _raw_message(self, message: Any, model: str) -> int:
+        _, content = _message_fields(message)
+        return self._raw(content if isinstance(content, str) else json.dumps(content, default=str), model) + MESSAGE_OVERHEAD
+
+    def _scale(self, raw: int, model: str) -> int:
+        return math.ceil(raw * self._calibration.get(_base_model(model), 1.0))
+
+    def count_text(self, text: str, model: str) -> int:
+        return self._scale(self._raw(text, model), model)
+
+    def message_counts(self, messages: List[Any], model: str) -> List[int]:
+        return [self._scale(self._raw_message(m, model), model) for m in messages]
+
+    def count_messages(self, messages: List[Any], model: str) -> int:
+        return self._scale(sum(self._raw_message(m, model) for m in messages), model)
+
+    def calibrate(self, model: str, raw: int, actual: Optional[int]) -> None:
+        """Moves the model's factor towards actual / raw (`raw` from raw_count)"""
+        if not actual or raw < 16 or self._encoding(model) is not None:
+            return
+        base = _base_model(model)
+        low, high = self.CALIBRATION_RANGE
+        ratio = min(high, max(low, actual / raw))
+        current = self._calibration.get(base)
+        self._calibration[base] = ratio if current is None else current + self.CALIBRATION_ALPHA * (ratio - current)
+        self._counters["calibrations"] += 1
+
+    def raw_count(self, messages: Optional[List[Any]] = None, prompt: Optional[str] = None, model: str = "") -> int:
+        """Uncalibrated count, as `calibrate` expects it"""
+        if prompt is not None:
+            return self._raw(prompt, model)
+        return sum(self._raw_message(m, model) for m in messages or [])
+
+    def preflight(self, model: str, messages: Optional[List[Any]] = None, prompt: Optional[str] = None,
+                  max_tokens: Optional[int] = None, policy: Optional[str] = "reject") -> Dict[str, Any]:
+        """
+        Checks a request against the model's limits.
+
+        policy "reject" raises ContextWindowExceeded if it does not fit.
+        "trim" lowers max_tokens to the output limit and drops the oldest
+        turns (whole exchanges, never system messages or the last user
+        turn), then lowers max_tokens to what is left of the window; it
+        raises only if the remaining prompt alone is too large. None only
+        reports. Returns the (possibly trimmed) messages and max_tokens
+        with the counts.
+        """
+        context_window, max_output = self.model_limits(model)
+        requested = max_tokens or 0
+        trimmed = 0
+
+        if prompt is not None:
+            prompt_tokens = self.count_text(prompt, model)
+        else:
+            messages = list(messages or [])
+            counts = self.message_counts(messages, model)
+            prompt_tokens = sum(counts)
+
+        if policy == "trim":
+            requested = min(requested, max_output)
+            if messages and prompt_tokens + requested > context_window:
+                roles = [_message_fields(m)[0] for m in messages]
+                last_user = max((i for i, role in enumerate(roles) if role == "user"), default=len(messages) - 1)
+                keep = [True] * len(messages)
+                i = 0
+                while prompt_tokens + requested > context_window and i < last_user:
+                    # Drop from the oldest turn up to the start of the next exchange
+                    if roles[i] != "system":
+                        keep[i] = False
+                        prompt_tokens -= counts[i]
+                        trimmed += 1
+                    i += 1
+                    while i < last_user and roles[i] not in ("user", "system"):
+                        keep[i] = False
+                        prompt_tokens -= counts[i]
+                        trimmed += 1
+                        i += 1
+                messages = [m for m, kept in zip(messages, keep) if kept]
+            if requested and prompt_tokens < context_window:
+                requested = min(requested, context_window - prompt_tokens)
+
+        fits = requested <= max_output and prompt_tokens + requested <= context_window
+        if not fits and policy is not None:
+            raise ContextWindowExceeded(model, prompt_tokens, requested, context_window, max_output)
+
+        return {
+            "model": model,
+            "tokenizer": self.tokenizer(model),
+            "prompt_tokens": prompt_tokens,
+            "max_tokens": requested if max_tokens is not None else None,
+            "context_window": context_window,
+            "max_output_tokens": max_output,
+            "fits": fits,
+            "trimmed_messages": trimmed,
+            "messages": messages,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "cached_counts": len(self._cache),
+            "calibration": {model: round(factor, 3) for model, factor in self._calibration.items()},
+        }
+
+
+def _limit_overrides() -> Dict[str, Dict[str, int]]:
+    if not settings.MODEL_CONTEXT_WINDOWS:
+        return {}
+    return json.loads(settings.MODEL_CONTEXT_WINDOWS)
+
+
+token_counter = TokenCounter(
+    cache_size=settings.TOKEN_COUNT_CACHE_SIZE,
+    default_context_window=settings.TOKEN_DEFAULT_CONTEXT_WINDOW,
+    default_max_output=settings.TOKEN_DEFAULT_MAX_OUTPUT,
+    limits=_limit_overrides()
+)
@@ -0,0 +1,84 @@
+"""
+Concurrency benchmark for /chat/completions.
+
+Fires N parallel chat requests at the app in-process (no network) with the
+LiteLLM upstream replaced by a fake that takes a fixed latency. With the async
+service layer, N parallel requests should finish in roughly the time of one.
+The `--blocking` flag simulates the old behaviour (a sync SDK call inside an
+`async def`) for comparison.
+
+Usage: python benchmarks/bench_concurrency.py [-n 20] [--latency 0.5] [--blocking]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-dummy-key")
+
+import httpx
+import litellm
+
+from app.main import app
+
+
+def fake_completion_response(model: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="pong"))],
+        usage=SimpleNamespace(prompt_tokens=5, completion_tokens=1, total_tokens=6),
+        model=model,
+    )
+
+
+def install_fake_upstream(latency: float, blocking: bool):
+    async def fake_acompletion(model, messages, **kwargs):
+        if blocking:
+            time.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        return fake_completion_response(model)
+
+    litellm.acompletion = fake_acompletion
+
+
+async def send_chat(client: httpx.AsyncClient) -> float:
+    payload = {
+        "messages": [{"role": "user", "content": "ping"}],
+        "provider": "litellm",
+        "max_tokens": 8,
+    }
+    start = time.perf_counter()
+    response = await client.post("/api/v1/chat/completions", json=payload)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(n: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up routing/validation paths
+        await send_chat(client)
+
+        single = await send_chat(client)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send_chat(client) for _ in range(n)))
+        parallel = time.perf_counter() - start
+
+    print(f"Single request:        {single * 1000:8.1f} ms")
+    print(f"{n:>3} parallel requests: {parallel * 1000:8.1f} ms")
+    print(f"Parallel / single:     {parallel / single:8.2f}x (ideal ~1.0x, fully serialized ~{n}.0x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel /chat/completions benchmark.")
+    parser.add_argument("-n", type=int, default=20, help="Number of parallel requests (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake upstream latency in seconds (default: 0.5)")
+    parser.add_argument("--blocking", action="store_true", help="Simulate a blocking SDK call for comparison")
+    args = parser.parse_args()
+
+    install_fake_upstream(args.latency, args.blocking)
+    asyncio.run(run(args.n))
@@ -0,0 +1,397 @@
+"""
+Offline load test of every endpoint against stub upstreams.
+
+Starts benchmarks/stub_upstreams.py (Gemini and LiteLLM proxy look-alikes
+with configurable latency and error rates) and the app under uvicorn, with
+Qdrant in-process (QDRANT_LOCATION=:memory:), so no network or API keys are
+needed. A collection is seeded through /items/ingest, then each scenario is
+driven by a fixed number of concurrent clients and reports throughput,
+p50/p95/p99 latency, error counts and the app's peak RSS.
+
+Results are written as JSON (benchmarks/results/load-<commit>-<time>.json by
+default). --compare prints the change against an earlier result file and
+flags p95 or throughput regressions beyond --threshold.
+
+Other app settings (HEDGE_ENABLED, LLM_ROUTING_MODE, ...) are taken from the
+environment as usual.
+
+Usage: python benchmarks/bench_load.py [-c 16] [-n 400] [--scenarios chat_litellm,search]
+       [--latency 0.3] [--error-rate 0.01] [--compare benchmarks/results/<earlier>.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_upstreams import add_arguments
+
+API = "/api/v1"
+COLLECTION = "bench_load"
+
+# (method, path, request kwargs, streamed) for request number i of a run
+Spec = Tuple[str, str, Dict[str, Any], bool]
+
+
+def build_scenarios(nonce: str, dimension: int, batch_size: int) -> Dict[str, Callable[[int], Spec]]:
+    """Texts carry the run nonce so embedding and response caches start cold"""
+
+    def chat(provider: str, stream: bool = False, cache: bool = False) -> Callable[[int], Spec]:
+        def spec(i: int) -> Spec:
+            content = "What is the capital of France?" if cache else f"Question {nonce}-{i}: summarise the benchmark."
+            payload = {
+                "messages": [{"role": "user", "content": content}],
+                "provider": provider,
+                "temperature": 0.0 if cache else 0.7,
+                "max_tokens": 128,
+                "stream": stream,
+                "cache": cache
+            }
+            return "POST", f"{API}/chat/completions", {"json": payload}, stream
+        return spec
+
+    return {
+        "health": lambda i: ("GET", f"{API}/health/server", {}, False),
+        "embed": lambda i: ("POST", f"{API}/embeddings/generate", {"json": {"text": f"text {nonce}-{i}", "dimension": dimension}}, False),
+        "embed_batch": lambda i: ("POST", f"{API}/embeddings/generate/batch", {"json": {
+            "texts": [f"batch {nonce}-{i}-{j}" for j in range(batch_size)], "dimension": dimension
+        }}, False),
+        "items": lambda i: ("GET", f"{API}/items/", {"params": {"collection_name": COLLECTION, "limit": 50}}, False),
+        "search": lambda i: ("POST", f"{API}/items/search", {"json": {
+            "collection_name": COLLECTION, "query": f"query {nonce}-{i}", "limit": 10, "dimension": dimension
+        }}, False),
+        "search_batch": lambda i: ("POST", f"{API}/items/search/batch", {"json": {
+            "collection_name": COLLECTION, "queries": [f"query {nonce}-{i}-{j}" for j in range(8)], "limit": 10, "dimension": dimension
+        }}, False),
+        "generate": lambda i: ("POST", f"{API}/generation/generate", {"json": {
+            "prompt": f"Prompt {nonce}-{i}", "max_tokens": 128, "cache": False
+        }}, False),
+        "chat_gemini": chat("gemini"),
+        "chat_litellm": chat("litellm"),
+        "chat_stream": chat("litellm", stream=True),
+        "chat_cached": chat("litellm", cache=True),
+        # In-process synthetic provider: the app's own overhead, no upstream
+        "chat_local": chat("local"),
+    }
+
+
+class PeakMemory:
+    """
+    Peak RSS of a process (Linux /proc). reset() clears the high-water mark
+    so each scenario reports its own peak; None where /proc is unavailable.
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def reset(self) -> None:
+        try:
+            with open(f"/proc/{self.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    def peak_mb(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return None
+
+
+def percentiles(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 2)
+    }
+
+
+async def send(client: httpx.AsyncClient, spec: Spec) -> Tuple[str, Optional[float]]:
+    """Outcome ("ok", a status code or an exception name) and time to first byte for streams"""
+    method, path, kwargs, streamed = spec
+    if not streamed:
+        response = await client.request(method, path, **kwargs)
+        return ("ok" if response.is_success else str(response.status_code)), None
+
+    start = time.perf_counter()
+    first_byte = None
+    failed = False
+    async with client.stream(method, path, **kwargs) as response:
+        async for chunk in response.aiter_text():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            # Errors after the headers travel in-band as an SSE error event
+            failed = failed or "event: error" in chunk
+        if not response.is_success:
+            return str(response.status_code), None
+    return ("stream_error" if failed else "ok"), first_byte
+
+
+async def run_scenario(client: httpx.AsyncClient, build: Callable[[int], Spec], requests: int,
+                       concurrency: int, memory: Optional[PeakMemory]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    outcomes: Counter = Counter()
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < requests:
+            i = issued
+            issued += 1
+            start = time.perf_counter()
+            try:
+                outcome, first_byte = await send(client, build(i))
+            except httpx.HTTPError as e:
+                outcome, first_byte = type(e).__name__, None
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append(time.perf_counter() - start)
+                if first_byte is not None:
+                    first_bytes.append(first_byte)
+
+    if memory:
+        memory.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": outcomes.pop("ok", 0),
+        "errors": dict(outcomes),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        **percentiles(latencies),
+        "peak_rss_mb": memory.peak_mb() if memory else None
+    }
+    if first_bytes:
+        result["ttfb_p50_ms"] = round(float(np.percentile(first_bytes, 50)) * 1000, 2)
+        result["ttfb_p95_ms"] = round(float(np.percentile(first_bytes, 95)) * 1000, 2)
+    return result
+
+
+async def seed_collection(client: httpx.AsyncClient, docs: int, dimension: int, memory: Optional[PeakMemory]) -> Dict[str, Any]:
+    """Ingests `docs` JSONL records through /items/ingest; timed like a scenario"""
+    body = "\n".join(
+        json.dumps({"id": i, "text": f"document {i} about topic {i % 17}", "topic": i % 17}) for i in range(docs)
+    )
+    if memory:
+        memory.reset()
+    start = time.perf_counter()
+    response = await client.post(f"{API}/items/ingest", content=body.encode("utf-8"), params={
+        "collection_name": COLLECTION, "text_field": "text", "id_field": "id", "dimension": dimension
+    })
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    while True:
+        status = (await client.get(f"{API}/items/ingest/{job_id}")).json()
+        if status["status"] not in ("pending", "running"):
+            break
+        await asyncio.sleep(0.05)
+    wall = time.perf_counter() - start
+    if status["status"] != "completed":
+        raise RuntimeError(f"Seeding failed: {status}")
+    return {
+        "documents": docs,
+        "wall_s": round(wall, 3),
+        "throughput_docs_per_s": round(docs / wall, 1),
+        "peak_rss_mb": memory.peak_mb() if memory else None
+    }
+
+
+def start_process(args: List[str], env: Dict[str, str], url: str, timeout: float = 60.0) -> subprocess.Popen:
+    proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{' '.join(args)} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=0.5).status_code == 200:
+                return proc
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def stop_process(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def git_info() -> Dict[str, Any]:
+    def git(*cmd: str) -> str:
+        return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def app_env(stub_url: str) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.update(
+        GEMINI_API_KEY="benchmark-dummy-key",
+        LITELLM_API_KEY="benchmark-dummy-key",
+        GEMINI_API_BASE=stub_url,
+        LITELLM_API_BASE=f"{stub_url}/v1",
+        QDRANT_LOCATION=":memory:",
+        HEALTH_PROBE_ENABLED="false",
+        WARMUP_PROVIDERS="",
+        # Memory-only caches, so runs do not see each other's entries
+        EMBEDDING_CACHE_DB_PATH="",
+        RESPONSE_CACHE_DB_PATH="",
+        REQUEST_LOG_ENABLED="false",
+        # litellm otherwise downloads its model price map at import
+        LITELLM_LOCAL_MODEL_COST_MAP="True"
+    )
+    return env
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    seed = results["seed"]
+    print(f"\nseed: {seed['documents']} docs in {seed['wall_s']:.2f}s ({seed['throughput_docs_per_s']} docs/s)")
+    print(f"{'scenario':<14}{'ok':>6}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'peak MB':>9}")
+    for name, r in results["scenarios"].items():
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{name:<14}{r['ok']:>6}{sum(r['errors'].values()):>6}{fmt(r['throughput_rps'])}"
+              f"{fmt(r['p50_ms'])}{fmt(r['p95_ms'])}{fmt(r['p99_ms'])}{fmt(r['peak_rss_mb'])}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Prints per-scenario changes against a baseline run; returns the regressions"""
+    regressions = []
+    print(f"\nvs {baseline['git']['commit']} ({baseline['timestamp']}), regression threshold {threshold:.0%}")
+    for name, r in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        changes = []
+        for key, higher_is_worse in (("throughput_rps", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            if not r.get(key) or not base.get(key):
+                continue
+            change = r[key] / base[key] - 1
+            changes.append(f"{key} {change:+.1%}")
+            if key in ("throughput_rps", "p95_ms") and (change if higher_is_worse else -change) > threshold:
+                regressions.append(f"{name}.{key}")
+        print(f"  {name:<14}{', '.join(changes)}")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+    return regressions
+
+
+async def drive(base_url: str, args: argparse.Namespace, memory: Optional[PeakMemory]) -> Dict[str, Any]:
+    scenarios = build_scenarios(uuid.uuid4().hex[:8], args.dimension, args.batch_size)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))} (available: {', '.join(scenarios)})")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.provider:
+            (await client.post(f"{API}/config/provider", json={"provider": args.provider})).raise_for_status()
+        seed = await seed_collection(client, args.docs, args.dimension, memory)
+
+        results = {}
+        for name in selected:
+            build = scenarios[name]
+            # Untimed warm-up: lazy provider construction, connection pools, cache fill
+            await run_scenario(client, lambda i: build(args.requests + i), args.warmup, min(args.warmup, args.concurrency) or 1, None)
+            results[name] = await run_scenario(client, build, args.requests, args.concurrency, memory)
+            print(f"  {name}: {results[name]['throughput_rps']} rps, p95 {results[name]['p95_ms']} ms", flush=True)
+    return {"seed": seed, "scenarios": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test of every endpoint against stub upstreams.")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Concurrent clients per scenario (default: 16)")
+    parser.add_argument("-n", "--requests", type=int, default=400, help="Requests per scenario (default: 400)")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed requests before each scenario (default: 10)")
+    parser.add_argument("--scenarios", default="", help="Comma-separated subset (default: all)")
+    parser.add_argument("--provider", default="gemini", help="Active provider for embeddings/generation; local skips the stub (default: gemini)")
+    parser.add_argument("--docs", type=int, default=1000, help="Documents ingested before the scenarios (default: 1000)")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (default: 768)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Texts per embed_batch request (default: 32)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout in seconds (default: 60)")
+    parser.add_argument("--app-port", type=int, default=8790)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--output", default="", help="Result file (default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", default="", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative p95/throughput change counted as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 when --compare finds a regression")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    stub_args = [
+        sys.executable, os.path.join(ROOT, "benchmarks", "stub_upstreams.py"), "--port", str(args.stub_port),
+        "--latency", str(args.latency), "--sigma", str(args.sigma), "--embed-latency", str(args.embed_latency),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+        "--completion-tokens", str(args.completion_tokens), "--tokens-per-second", str(args.tokens_per_second)
+    ]
+
+    stub = start_process(stub_args, dict(os.environ), f"{stub_url}/healthz")
+    try:
+        app = start_process(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+            app_env(stub_url), f"{app_url}{API}/health/server"
+        )
+        try:
+            run = asyncio.run(drive(app_url, args, PeakMemory(app.pid)))
+        finally:
+            stop_process(app)
+    finally:
+        stop_process(stub)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_info(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "fail_on_regression")},
+        **run
+    }
+    print_results(results)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"load-{results['git']['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
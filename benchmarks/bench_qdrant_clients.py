@@ -0,0 +1,111 @@
+"""
+Sync vs async Qdrant repository benchmark.
+
+Runs the same workload through QdrantRepository (sync client, called from the
+event loop via the shared thread pool, as the endpoints used to) and
+AsyncQdrantRepository (AsyncQdrantClient, awaited directly):
+
+  - upsert N points in batches
+  - scroll the whole collection page by page
+  - C concurrent searches
+
+Defaults to Qdrant's local in-process mode, which needs no server but does
+not exercise the network path. Pass --url (and --grpc) to benchmark a real
+server, where the async client and gRPC matter most.
+
+Usage: python benchmarks/bench_qdrant_clients.py [--points 5000] [--dimension 768]
+       [--searches 200] [--url http://localhost:6333] [--grpc]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+from app.core.concurrency import run_sync
+from app.repositories.async_qdrant_repo import AsyncQdrantRepository
+from app.repositories.qdrant_repo import QdrantRepository
+
+
+class SyncAdapter:
+    """Awaitable facade over the sync repository, offloading each call to the thread pool"""
+
+    def __init__(self, repo: QdrantRepository):
+        self.repo = repo
+
+    def __getattr__(self, name):
+        method = getattr(self.repo, name)
+
+        async def call(*args, **kwargs):
+            return await run_sync(method, *args, **kwargs)
+        return call
+
+
+async def workload(repo, vectors, searches: int, batch_size: int = 256):
+    collection = f"bench_{uuid.uuid4().hex[:8]}"
+    await repo.ensure_collection(collection, vectors.shape[1])
+    timings = {}
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        batch = vectors[offset:offset + batch_size]
+        await repo.upsert_data(collection, [
+            models.PointStruct(id=offset + i, vector=v.tolist(), payload={"n": offset + i})
+            for i, v in enumerate(batch)
+        ])
+    timings["upsert"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offset, pages = None, 0
+    while True:
+        _, offset = await repo.fetch_all(collection, limit=500, offset=offset)
+        pages += 1
+        if offset is None:
+            break
+    timings["scroll"] = time.perf_counter() - start
+
+    queries = vectors[np.random.default_rng(1).integers(0, len(vectors), searches)]
+    start = time.perf_counter()
+    await asyncio.gather(*(repo.search(collection, q.tolist(), limit=10) for q in queries))
+    timings["search"] = time.perf_counter() - start
+    return timings
+
+
+def make_clients(args):
+    if args.url:
+        options = {"url": args.url, "prefer_grpc": args.grpc, "check_compatibility": False}
+        return QdrantClient(**options), AsyncQdrantClient(**options)
+    return QdrantClient(":memory:"), AsyncQdrantClient(":memory:")
+
+
+async def run(args):
+    vectors = np.random.default_rng(0).standard_normal((args.points, args.dimension)).astype(np.float32)
+    sync_client, async_client = make_clients(args)
+
+    results = {
+        "sync client + thread pool": await workload(SyncAdapter(QdrantRepository(sync_client)), vectors, args.searches),
+        "async client": await workload(AsyncQdrantRepository(async_client), vectors, args.searches),
+    }
+
+    mode = args.url + (" (gRPC)" if args.grpc else " (REST)") if args.url else "local in-process"
+    print(f"{args.points} points x {args.dimension} dims, {args.searches} concurrent searches, {mode}\n")
+    print(f"{'repository':<28}{'upsert s':>10}{'scroll s':>10}{'search s':>10}{'searches/s':>12}")
+    for name, t in results.items():
+        print(f"{name:<28}{t['upsert']:>10.2f}{t['scroll']:>10.2f}{t['search']:>10.2f}{args.searches / t['search']:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async Qdrant repository benchmark.")
+    parser.add_argument("--points", type=int, default=5000, help="Points to upsert (default: 5000)")
+    parser.add_argument("--dimension", type=int, default=768, help="Vector dimension (default: 768)")
+    parser.add_argument("--searches", type=int, default=200, help="Concurrent searches (default: 200)")
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: local in-process mode)")
+    parser.add_argument("--grpc", action="store_true", help="Prefer gRPC when --url is given")
+    asyncio.run(run(parser.parse_args()))
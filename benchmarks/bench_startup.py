@@ -0,0 +1,81 @@
+"""
+Startup-time benchmark.
+
+Measures, in fresh interpreters:
+
+  - import time of `app.main`
+  - time from launching uvicorn to the first 200 from /api/v1/health/server
+
+Providers are built lazily, so neither number should include litellm,
+google.genai or qdrant_client unless they are listed in --warmup (which sets
+WARMUP_PROVIDERS, trading a slower start for a fast first request).
+
+Usage: python benchmarks/bench_startup.py [-n 5] [--warmup gemini,litellm,qdrant] [--port 8765]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def child_env(warmup: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, WARMUP_PROVIDERS=warmup)
+    env.setdefault("GEMINI_API_KEY", "benchmark-dummy-key")
+    return env
+
+
+def import_time(env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_first_response(env: dict, port: int, timeout: float = 60.0) -> float:
+    url = f"http://127.0.0.1:{port}/api/v1/health/server"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(url, timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(label: str, samples):
+    print(f"{label:<28} median {statistics.median(samples):6.2f}s   min {min(samples):6.2f}s   max {max(samples):6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup-time benchmark.")
+    parser.add_argument("-n", type=int, default=5, help="Runs per measurement (default: 5)")
+    parser.add_argument("--warmup", default="", help="WARMUP_PROVIDERS for the measured processes (default: none)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the uvicorn runs (default: 8765)")
+    args = parser.parse_args()
+
+    env = child_env(args.warmup)
+    print(f"{args.n} runs, WARMUP_PROVIDERS='{args.warmup}'\n")
+    summarize("import app.main", [import_time(env) for _ in range(args.n)])
+    summarize("first /health/server", [time_to_first_response(env, args.port) for _ in range(args.n)])
@@ -0,0 +1,76 @@
+"""
+Payload size and encode/decode time for the vector response encodings.
+
+Compares JSON float lists (the default) with base64-packed vectors inside JSON
+and the raw binary format, in float32 and float16.
+
+Usage: python benchmarks/bench_vector_encoding.py [--rows 100] [--dimension 768] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app.core import vector_codec
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def json_lists(vectors):
+    encode = lambda: json.dumps({"vectors": vectors})
+    decode = lambda payload: np.asarray(json.loads(payload)["vectors"], dtype=np.float32)
+    return encode, decode
+
+
+def json_base64(vectors, dtype):
+    encode = lambda: json.dumps({"vectors": [vector_codec.encode_base64(v, dtype) for v in vectors], "dtype": dtype})
+
+    def decode(payload):
+        body = json.loads(payload)
+        return np.stack([vector_codec.decode_base64(v, body["dtype"]) for v in body["vectors"]])
+    return encode, decode
+
+
+def binary(vectors, dtype):
+    return lambda: vector_codec.encode_vectors(vectors, dtype), vector_codec.decode_vectors
+
+
+def run(rows, dimension, repeat):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((rows, dimension)).astype(np.float32).tolist()
+
+    cases = [
+        ("json float list", json_lists(vectors)),
+        ("json base64 float32", json_base64(vectors, "float32")),
+        ("json base64 float16", json_base64(vectors, "float16")),
+        ("binary float32", binary(vectors, "float32")),
+        ("binary float16", binary(vectors, "float16")),
+    ]
+
+    print(f"{rows} vectors x {dimension} dims, mean of {repeat} runs\n")
+    print(f"{'encoding':<22}{'bytes/vector':>14}{'encode ms':>12}{'decode ms':>12}{'max abs err':>14}")
+    reference = np.asarray(vectors, dtype=np.float32)
+    for name, (encode, decode) in cases:
+        payload, encode_ms = timed(encode, repeat)
+        decoded, decode_ms = timed(lambda: decode(payload), repeat)
+        error = float(np.max(np.abs(decoded - reference)))
+        print(f"{name:<22}{len(payload) / rows:>14.0f}{encode_ms:>12.2f}{decode_ms:>12.2f}{error:>14.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector encoding benchmark.")
+    parser.add_argument("--rows", type=int, default=100, help="Vectors per payload (default: 100)")
+    parser.add_argument("--dimension", type=int, default=768, help="Vector dimension (default: 768)")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (default: 20)")
+    args = parser.parse_args()
+    run(args.rows, args.dimension, args.repeat)
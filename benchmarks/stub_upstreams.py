@@ -0,0 +1,264 @@
+"""
+Stub Gemini and LiteLLM-proxy upstreams for offline benchmarks.
+
+One small server that answers the calls the app makes, so the google.genai
+SDK and litellm run unmodified against it:
+
+  - Gemini API (GEMINI_API_BASE=http://127.0.0.1:<port>):
+    /v1beta/models/{model}:generateContent, :streamGenerateContent, :batchEmbedContents
+  - LiteLLM proxy, OpenAI-compatible (LITELLM_API_BASE=http://127.0.0.1:<port>/v1):
+    /v1/chat/completions (streaming too), /v1/embeddings, /v1/models
+
+Each call waits a log-normally distributed latency (median --latency,
+spread --sigma) and fails with a 500 or a 429 (with Retry-After) at the
+given rates. Streams send --completion-tokens words at --tokens-per-second
+after the first-token latency. Embeddings are seeded from a hash of the text,
+so the same text always gets the same unit vector and searches are stable.
+
+Usage: python benchmarks/stub_upstreams.py [--port 9100] [--latency 0.3] [--sigma 0.4]
+       [--embed-latency 0.05] [--error-rate 0.0] [--throttle-rate 0.0]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+
+class StubBehaviour:
+    """Latency and failure distribution shared by every stubbed endpoint"""
+
+    def __init__(self, latency: float = 0.3, sigma: float = 0.4, embed_latency: float = 0.05,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 completion_tokens: int = 64, tokens_per_second: float = 200.0, dimension: int = 768):
+        self.latency = latency
+        self.sigma = sigma
+        self.embed_latency = embed_latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.completion_tokens = completion_tokens
+        self.tokens_per_second = tokens_per_second
+        self.dimension = dimension
+        self.calls: Dict[str, int] = {}
+
+    async def wait(self, median: float) -> None:
+        if median > 0:
+            await asyncio.sleep(median * random.lognormvariate(0.0, self.sigma))
+
+    def fault(self, api: str) -> Optional[JSONResponse]:
+        """An error response for this call, or None to answer normally"""
+        self.calls[api] = self.calls.get(api, 0) + 1
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return JSONResponse({"error": {"code": 429, "message": "stub: rate limited", "status": "RESOURCE_EXHAUSTED"}},
+                                status_code=429, headers={"Retry-After": "1"})
+        if roll < self.throttle_rate + self.error_rate:
+            return JSONResponse({"error": {"code": 500, "message": "stub: internal error", "status": "INTERNAL"}},
+                                status_code=500)
+        return None
+
+    def completion(self) -> List[str]:
+        return [WORDS[i % len(WORDS)] + " " for i in range(self.completion_tokens)]
+
+    async def paced(self, tokens: List[str]) -> AsyncIterator[str]:
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for token in tokens:
+            if interval:
+                await asyncio.sleep(interval)
+            yield token
+
+
+def embed(text: str, dimension: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def gemini_text(body: Dict[str, Any]) -> str:
+    parts = [part for content in body.get("contents", []) for part in content.get("parts", [])]
+    return " ".join(part.get("text", "") for part in parts)
+
+
+def gemini_response(model: str, text: str, prompt_tokens: int, completion_tokens: int, finished: bool = True) -> Dict[str, Any]:
+    candidate: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens
+        },
+        "modelVersion": model
+    }
+
+
+def openai_chunk(chunk_id: str, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None,
+                 usage: Optional[Dict[str, int]] = None) -> str:
+    chunk = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta or finish_reason else []
+    }
+    if usage:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def create_app(behaviour: StubBehaviour) -> FastAPI:
+    app = FastAPI(title="Stub upstreams")
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok", "calls": behaviour.calls}
+
+    # ---- Gemini API ----
+
+    @app.post("/v1beta/models/{target}")
+    async def gemini(target: str, request: Request):
+        model, _, action = target.partition(":")
+        body = await request.json()
+
+        if action == "batchEmbedContents":
+            error = behaviour.fault("gemini.embed")
+            if error:
+                return error
+            await behaviour.wait(behaviour.embed_latency)
+            embeddings = []
+            for item in body.get("requests", []):
+                text = " ".join(part.get("text", "") for part in item.get("content", {}).get("parts", []))
+                embeddings.append({"values": embed(text, item.get("outputDimensionality") or behaviour.dimension)})
+            return {"embeddings": embeddings}
+
+        if action not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse({"error": {"code": 404, "message": f"stub: unsupported action {action}"}}, status_code=404)
+
+        error = behaviour.fault("gemini.generate")
+        if error:
+            return error
+        prompt_tokens = count_tokens(gemini_text(body))
+        tokens = behaviour.completion()
+        await behaviour.wait(behaviour.latency)
+
+        if action == "generateContent":
+            return gemini_response(model, "".join(tokens), prompt_tokens, len(tokens))
+
+        async def frames() -> AsyncIterator[str]:
+            sent = 0
+            async for token in behaviour.paced(tokens):
+                sent += 1
+                yield f"data: {json.dumps(gemini_response(model, token, prompt_tokens, sent, finished=sent == len(tokens)))}\r\n\r\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    # ---- LiteLLM proxy (OpenAI-compatible) ----
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub-model", "object": "model", "owned_by": "stub"}]}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        error = behaviour.fault("litellm.embed")
+        if error:
+            return error
+        await behaviour.wait(behaviour.embed_latency)
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimension = body.get("dimensions") or behaviour.dimension
+        prompt_tokens = sum(count_tokens(str(text)) for text in texts)
+        return {
+            "object": "list",
+            "model": body.get("model", "stub-embedding"),
+            "data": [{"object": "embedding", "index": i, "embedding": embed(str(text), dimension)} for i, text in enumerate(texts)],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = behaviour.fault("litellm.chat")
+        if error:
+            return error
+        model = body.get("model", "stub-model")
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+        tokens = behaviour.completion()
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        await behaviour.wait(behaviour.latency)
+
+        if not body.get("stream"):
+            return {
+                "id": chunk_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": usage
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def frames() -> AsyncIterator[str]:
+            yield openai_chunk(chunk_id, model, {"role": "assistant", "content": ""})
+            async for token in behaviour.paced(tokens):
+                yield openai_chunk(chunk_id, model, {"content": token})
+            yield openai_chunk(chunk_id, model, {}, finish_reason="stop")
+            if include_usage:
+                yield openai_chunk(chunk_id, model, {}, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Stub options, shared with bench_load.py which passes them through"""
+    parser.add_argument("--latency", type=float, default=0.3, help="Median completion latency in seconds (default: 0.3)")
+    parser.add_argument("--sigma", type=float, default=0.4, help="Log-normal spread of all latencies; 0 = fixed (default: 0.4)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Median embedding latency in seconds (default: 0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with a 500 (default: 0)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of calls answered with a 429 (default: 0)")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Words per completion (default: 64)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Streaming pace; 0 = no pacing (default: 200)")
+
+
+def behaviour_from_args(args: argparse.Namespace) -> StubBehaviour:
+    return StubBehaviour(
+        latency=args.latency,
+        sigma=args.sigma,
+        embed_latency=args.embed_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        completion_tokens=args.completion_tokens,
+        tokens_per_second=args.tokens_per_second
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub Gemini and LiteLLM proxy upstreams.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(behaviour_from_args(args)), host=args.host, port=args.port, log_level="warning")
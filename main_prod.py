@@ -1,8 +1,25 @@
 """
 Run Multi-Agent-Auditor in Production mode.
-Usage: python main_prod.py [--no-ngrok] [--backend-port PORT] [--frontend-port PORT]
+Usage: python main_prod.py [--no-ngrok] [--backend-port PORT] [--frontend-port PORT] [--workers N]
+
+The backend runs N uvicorn worker processes (default: WEB_CONCURRENCY, else
+the CPU count) on uvloop and httptools when they are installed. Workers
+share the provider, routing and profiling settings and ingestion job
+progress through SHARED_STATE_DB_PATH (default with more than one worker:
+.cache/shared_state.sqlite3, emptied at every start) and, with more than
+one worker, Prometheus metrics through PROMETHEUS_MULTIPROC_DIR. WEB_CONCURRENCY is
+set to N for the workers, so each enforces 1/N of the LLM rate limits.
+
+Still per worker: the latency ranking and circuit breakers of routed
+providers, hedge budgets, in-memory cache tiers, Gemini context cache
+handles, embedding batching and captured profiles. Each worker learns
+provider health on its own, and a profile is listed only by the worker
+that recorded it.
 """
+import importlib.util
+import shutil
 import subprocess
+import tempfile
 import time
 import os
 import sys
@@ -19,6 +36,8 @@ def log(msg):
 # Default production ports
 DEFAULT_BACKEND_PORT = 8002
 DEFAULT_FRONTEND_PORT = 8503
+# Shared state file for multi-worker runs when SHARED_STATE_DB_PATH is not set
+DEFAULT_SHARED_STATE_DB_PATH = ".cache/shared_state.sqlite3"
 
 def safely_end_ngrok():
     """Attempts to safely kill existing ngrok processes/tunnels."""
@@ -40,9 +59,55 @@ def safely_end_ngrok():
             pass
     log("   ✅ Tunnels cleared.")
 
-def run_backend(port):
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+def server_options():
+    """uvloop/httptools when installed (pip install "uvicorn[standard]"), else uvicorn's defaults"""
+    options = []
+    if importlib.util.find_spec("uvloop") and os.name != "nt":
+        options += ["--loop", "uvloop"]
+    else:
+        log("   ⚠️  uvloop not available, using the default asyncio loop.")
+    if importlib.util.find_spec("httptools"):
+        options += ["--http", "httptools"]
+    else:
+        log("   ⚠️  httptools not available, using the h11 HTTP parser.")
+    return options
+
+def prepare_shared_state(workers):
+    """
+    Gives multi-worker runs a shared state file, emptied so every
+    deployment starts from the .env provider/routing settings, tells the
+    workers how many they are, and gives multi-worker metrics an empty
+    multiprocess directory.
+    """
+    from app.core.config import settings
+    path = settings.SHARED_STATE_DB_PATH
+    if not path and workers > 1:
+        path = DEFAULT_SHARED_STATE_DB_PATH
+        os.environ["SHARED_STATE_DB_PATH"] = path
+    if path:
+        from app.core.shared_state import SQLiteStateStore
+        store = SQLiteStateStore(path)
+        store.clear()
+        store.close()
+
+    # Read by the workers: each one enforces its share of the LLM rate limits
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1:
+        log("   ⚠️  Circuit breakers, hedge budgets, in-memory caches and profiles are kept per worker.")
+
+    if workers > 1 and settings.METRICS_ENABLED:
+        metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(tempfile.gettempdir(), "fastapi-prometheus")
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+def run_backend(port, workers):
     """Start FastAPI backend server."""
-    log(f"\n📦 Starting FastAPI backend on port {port}...")
+    log(f"\n📦 Starting FastAPI backend on port {port} with {workers} worker(s)...")
+    prepare_shared_state(workers)
     backend_cmd = [
         sys.executable,
         "-m",
@@ -52,6 +117,9 @@ def run_backend(port):
         "0.0.0.0",
         "--port",
         str(port),
+        "--workers",
+        str(workers),
+        *server_options(),
     ]
     
     backend_proc = subprocess.Popen(
@@ -161,6 +229,12 @@ if __name__ == "__main__":
         default=DEFAULT_FRONTEND_PORT,
         help=f"Custom frontend port (default: {DEFAULT_FRONTEND_PORT})"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="Backend worker processes (default: WEB_CONCURRENCY or the CPU count)"
+    )
     
     args = parser.parse_args()
     
@@ -175,11 +249,12 @@ if __name__ == "__main__":
     log("🚀 Multi-Agent-Auditor - Starting Production Instance...")
     log(f"   Backend Port:  {backend_port}")
     log(f"   Frontend Port: {frontend_port}")
+    log(f"   Workers:       {args.workers}")
     log(f"   Ngrok:         {'DISABLED' if no_ngrok else 'ENABLED'}")
     log("="*60)
     
     # Start Backend
-    backend_proc = run_backend(backend_port)
+    backend_proc = run_backend(backend_port, args.workers)
     
     # Start Frontend
     frontend_proc = run_frontend(frontend_port)
@@ -0,0 +1,81 @@
+"""
+Bulk-load a JSONL file into Qdrant: embed a text field with the active
+embedding provider and upsert the records as points.
+
+Usage: python run_ingest.py data.jsonl --collection products --text-field title [--id-field id]
+       [--dimension 768] [--batch-size 256] [--checkpoint path] [--no-resume]
+
+Progress is checkpointed after every upserted batch (default checkpoint:
+<file>.checkpoint.json), so an interrupted run picks up where it stopped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from app.repositories.async_qdrant_repo import async_qdrant_repo
+from app.services.ingestion_service import IngestionPipeline, iter_file_lines
+from app.services.llm_manager import llm_manager
+
+
+async def report(pipeline: IngestionPipeline, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        p = pipeline.progress.to_dict()
+        rate = p["records_per_second"] or 0
+        print(
+            f"   lines {p['lines_read']:>10} | upserted {p['records_upserted']:>10} | "
+            f"failed {p['records_failed']:>6} | {rate:8.1f} rec/s",
+            flush=True
+        )
+
+
+async def main(args):
+    checkpoint = None if args.no_checkpoint else (args.checkpoint or f"{args.path}.checkpoint.json")
+    if checkpoint and args.no_resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    pipeline = IngestionPipeline(
+        embedding_service=llm_manager.get_embedding_service(),
+        repo=async_qdrant_repo,
+        collection_name=args.collection,
+        text_field=args.text_field,
+        id_field=args.id_field,
+        dimension=args.dimension,
+        batch_size=args.batch_size,
+        checkpoint_path=checkpoint
+    )
+
+    print(f"📥 Ingesting {args.path} -> {args.collection} (provider: {llm_manager.get_current_provider()})")
+    reporter = asyncio.ensure_future(report(pipeline, args.progress_interval))
+    try:
+        await pipeline.run(iter_file_lines(args.path))
+    finally:
+        reporter.cancel()
+
+    p = pipeline.progress.to_dict()
+    print(
+        f"✅ Done: {p['records_upserted']} upserted, {p['records_failed']} failed, "
+        f"{p['lines_skipped']} lines skipped via checkpoint, {p['elapsed_seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load a JSONL file into Qdrant.")
+    parser.add_argument("path", help="JSONL file to ingest")
+    parser.add_argument("--collection", required=True, help="Target Qdrant collection (created if missing)")
+    parser.add_argument("--text-field", required=True, help="Record field to embed; dotted paths allowed")
+    parser.add_argument("--id-field", default=None, help="Record field used as point id")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (default: 768)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Records per batch (default: INGEST_BATCH_SIZE)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not read or write a checkpoint")
+    parser.add_argument("--no-resume", action="store_true", help="Discard an existing checkpoint and start over")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ File not found: {args.path}")
+        sys.exit(1)
+
+    asyncio.run(main(args))
@@ -23,7 +23,7 @@ Use the sidebar to navigate between different tools.
 
 current_provider = "litellm"
 
-provider_options = ["gemini", "litellm"]
+provider_options = ["gemini", "litellm", "local"]
 
 selected_provider = st.sidebar.selectbox(
     "Select LLM Provider", 
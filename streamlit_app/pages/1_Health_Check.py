@@ -17,28 +17,27 @@ def check_health(endpoint):
     except Exception as e:
         return "❌ Offline", str(e)
 
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.subheader("FastAPI Server")
-    status, details = check_health("server")
-    st.write(status)
-    if status.startswith("✅"):
-        st.json(details)
-
-with col2:
-    st.subheader("Gemini Service")
-    status, details = check_health("gemini")
-    st.write(status)
-    if status.startswith("✅"):
-        st.json(details)
-
-with col3:
-    st.subheader("Qdrant Service")
-    status, details = check_health("qdrant")
-    st.write(status)
-    if status.startswith("✅"):
-        st.json(details)
+st.subheader("FastAPI Server")
+status, details = check_health("server")
+st.write(status)
+
+# /health/all runs every provider and Qdrant check concurrently
+if status.startswith("✅"):
+    st.subheader("Dependencies")
+    _, overall = check_health("all")
+    targets = (overall or {}).get("details") or {}
+    columns = st.columns(max(len(targets), 1))
+    for column, (name, result) in zip(columns, targets.items()):
+        with column:
+            st.markdown(f"**{name}**")
+            if result["status"] == "ok":
+                st.write("✅ Healthy")
+            else:
+                st.write("❌ Down")
+                if result.get("last_error"):
+                    st.caption(result["last_error"])
+            if result.get("latency_ms") is not None:
+                st.metric("Latency", f"{result['latency_ms']:.0f} ms")
 
 if st.button("Refresh status"):
     st.rerun()
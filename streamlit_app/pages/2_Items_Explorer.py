@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import pandas as pd
+from vector_codec import decode_base64
 
 API_BASE_URL = "http://localhost:8000/api/v1"
 
@@ -10,37 +11,69 @@ st.title("🔍 Items Explorer")
 
 collection_name = st.sidebar.text_input("Collection Name", value="product_data")
 limit = st.sidebar.slider("Limit", min_value=1, max_value=100, value=10)
+with_vectors = st.sidebar.checkbox("Include vectors", value=False)
+payload_filter = st.sidebar.text_input("Payload Filter (JSON)", placeholder='{"color": "red"}')
+fields = st.sidebar.text_input("Fields", placeholder="title,price", help="Comma-separated payload fields to return")
 
-if st.button("Fetch Items"):
+# Cursor of the page to fetch next; reset whenever the query changes
+query_key = (collection_name, limit, with_vectors, payload_filter, fields)
+if st.session_state.get("items_query") != query_key:
+    st.session_state.items_query = query_key
+    st.session_state.items_cursor = None
+    st.session_state.items_page = 0
+
+def fetch_page(cursor):
+    params = {
+        "collection_name": collection_name,
+        "limit": limit,
+        "with_payload": True,
+        "with_vectors": with_vectors,
+        "encoding": "base64"
+    }
+    if cursor:
+        params["cursor"] = cursor
+    if payload_filter.strip():
+        params["filter"] = payload_filter
+    if fields.strip():
+        params["fields"] = fields
+    return requests.get(f"{API_BASE_URL}/items/", params=params)
+
+col1, col2 = st.columns([1, 1])
+fetch_first = col1.button("Fetch Items")
+fetch_next = col2.button("Next Page", disabled=not st.session_state.items_cursor)
+
+if fetch_first or fetch_next:
+    cursor = st.session_state.items_cursor if fetch_next else None
     with st.spinner(f"Fetching items from {collection_name}..."):
         try:
-            params = {
-                "collection_name": collection_name,
-                "limit": limit,
-                "with_payload": True,
-                "with_vectors": False
-            }
-            response = requests.get(f"{API_BASE_URL}/items/", params=params)
-            
+            response = fetch_page(cursor)
+
             if response.status_code == 200:
                 data = response.json()
                 items = data.get("items", [])
-                
+                st.session_state.items_cursor = data.get("next_cursor")
+                st.session_state.items_page = st.session_state.items_page + 1 if fetch_next else 1
+
                 if items:
                     # Flatten the structure for pandas
                     flattened_data = []
                     for item in items:
                         row = {"id": item["id"]}
-                        row.update(item["payload"])
+                        row.update(item["payload"] or {})
+                        if isinstance(item.get("vector"), str):
+                            vector = decode_base64(item["vector"], data.get("vector_dtype", "float32"))
+                            row["vector_dim"] = len(vector)
+                            row["vector_preview"] = ", ".join(f"{v:.4f}" for v in vector[:5])
                         flattened_data.append(row)
-                    
+
                     df = pd.DataFrame(flattened_data)
-                    st.success(f"Found {len(items)} items.")
+                    more = "more pages available" if st.session_state.items_cursor else "last page"
+                    st.success(f"Page {st.session_state.items_page}: {len(items)} items ({more}).")
                     st.dataframe(df, use_container_width=True)
                 else:
                     st.warning("No items found in this collection.")
             else:
                 st.error(f"Failed to fetch data: {response.status_code} - {response.text}")
-                
+
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from vector_codec import decode_vectors
 
 API_BASE_URL = "http://localhost:8000/api/v1"
 
@@ -9,6 +10,7 @@ st.title("🔢 Embeddings Generator")
 
 text_input = st.text_area("Enter text to embed", placeholder="Enter your text here...")
 dimension = st.number_input("Dimension (Optional)", min_value=1, value=768)
+dtype = st.selectbox("Transfer Precision", ["float32", "float16"], help="Vectors are fetched in compact binary form")
 
 if st.button("Generate Embedding"):
     if not text_input:
@@ -20,12 +22,16 @@ if st.button("Generate Embedding"):
                     "text": text_input,
                     "dimension": dimension
                 }
-                response = requests.post(f"{API_BASE_URL}/embeddings/generate", json=payload)
+                response = requests.post(
+                    f"{API_BASE_URL}/embeddings/generate",
+                    json=payload,
+                    params={"dtype": dtype},
+                    headers={"Accept": "application/octet-stream"}
+                )
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    vector = data.get("vector", [])
-                    st.success(f"Generated vector with length {len(vector)}")
+                    vector = decode_vectors(response.content)[0].tolist()
+                    st.success(f"Generated vector with length {len(vector)} ({len(response.content)} bytes on the wire)")
                     st.write(vector)
                 else:
                     st.error(f"Error: {response.status_code} - {response.text}")
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 import os
+import uuid
 
 API_BASE_URL = "http://localhost:8000/api/v1"
 
@@ -15,7 +16,8 @@ st.sidebar.header("Configuration")
 # Provider Selection
 # Fetch current provider from backend to sync or just let user override for this session?
 # ideally we want per-request provider.
-provider_options = ["gemini", "litellm"]
+# "auto" leaves the choice to the backend (active provider, or latency routing)
+provider_options = ["gemini", "litellm", "local", "auto"]
 selected_provider = st.sidebar.selectbox("Select Provider", provider_options, index=0)
 
 # Model Selection
@@ -48,8 +50,15 @@ elif selected_provider == "litellm":
             models = [m["id"] for m in data.get("data", [])]
     else:
         st.error(f"Models file not found: {litellm_models_path}")
+elif selected_provider == "local":
+    # Offline synthetic provider (LOCAL_GEN_MODEL on the backend)
+    models = ["local-synthetic"]
 
-selected_model = st.sidebar.selectbox("Select Model", models)
+if selected_provider == "auto":
+    selected_model = None
+    st.sidebar.caption("The backend picks the provider and its default model.")
+else:
+    selected_model = st.sidebar.selectbox("Select Model", models)
 
 # Parameters
 temperature = st.sidebar.slider("Temperature", 0.0, 2.0, 0.7)
@@ -58,15 +67,53 @@ max_tokens = st.sidebar.number_input("Max Output Tokens", min_value=1, max_value
 # System Prompt
 system_prompt = st.sidebar.text_area("System Prompt", value="You are a helpful AI assistant.")
 
+stream_responses = st.sidebar.toggle("Stream responses", value=True)
+use_cache = st.sidebar.toggle("Use response cache", value=True, help="Reuse stored answers (identical temperature-0 requests, or similar questions when the semantic cache is enabled)")
+refresh_cache = st.sidebar.toggle("Refresh cached answers", value=False, disabled=not use_cache, help="Always call the model and overwrite the cached answer")
+server_history = st.sidebar.toggle("Server-side history", value=True, help="Send only the new message; the backend keeps the conversation and summarizes older turns")
+
+if st.sidebar.button("New conversation"):
+    st.session_state.messages = []
+    st.session_state.conversation_id = str(uuid.uuid4())
+    st.rerun()
+
+def stream_chat(payload, result):
+    """
+    Yields content deltas from the SSE stream of /chat/completions.
+    The final `done` event (model + usage) is stored in `result`.
+    """
+    with requests.post(f"{API_BASE_URL}/chat/completions", json=payload, stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} - {response.text}")
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):].strip())
+                if event == "delta":
+                    yield data["content"]
+                elif event == "done":
+                    result.update(data)
+                elif event == "error":
+                    raise RuntimeError(data.get("detail"))
+
 # --- Chat Interface ---
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = str(uuid.uuid4())
 
 # Display chat history
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+        if message.get("cached"):
+            st.caption("⚡ Served from cache")
+        if message.get("answered_by"):
+            st.caption(f"Answered by {message['answered_by']}")
         if "usage" in message:
             with st.expander("Token Usage"):
                 st.json(message["usage"])
@@ -91,39 +138,78 @@ if prompt := st.chat_input("What is up?"):
     # 1. System Prompt (as system role)
     # 2. Session messages
     
-    api_messages = [{"role": "system", "content": system_prompt}] + [
-        {"role": m["role"], "content": m["content"]} for m in st.session_state.messages
-    ]
+    if server_history:
+        # The backend holds the history; it only stores the system prompt when it changes
+        api_messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+    else:
+        api_messages = [{"role": "system", "content": system_prompt}] + [
+            {"role": m["role"], "content": m["content"]} for m in st.session_state.messages
+        ]
 
     payload = {
         "messages": api_messages,
+        "conversation_id": st.session_state.conversation_id if server_history else None,
         "model": selected_model,
-        "provider": selected_provider,
+        "provider": None if selected_provider == "auto" else selected_provider,
         "temperature": temperature,
-        "max_tokens": max_tokens
+        "max_tokens": max_tokens,
+        "cache": use_cache,
+        "cache_refresh": refresh_cache
     }
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
+        if stream_responses:
             try:
-                response = requests.post(f"{API_BASE_URL}/chat/completions", json=payload)
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data["content"]
-                    usage = data.get("usage")
-                    
-                    st.markdown(content)
-                    if usage:
-                        with st.expander("Token Usage"):
-                            st.json(usage)
-                    
-                    # Add to history
-                    st.session_state.messages.append({
-                        "role": "model", # or assistant
-                        "content": content,
-                        "usage": usage
-                    })
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+                result = {}
+                content = st.write_stream(stream_chat({**payload, "stream": True}, result))
+                usage = result.get("usage")
+                answered_by = f"{result.get('provider')} · {result.get('model')}" if selected_provider == "auto" else None
+                if result.get("cached"):
+                    st.caption("⚡ Served from cache")
+                if answered_by:
+                    st.caption(f"Answered by {answered_by}")
+                if usage:
+                    with st.expander("Token Usage"):
+                        st.json(usage)
+
+                # Add to history
+                st.session_state.messages.append({
+                    "role": "model", # or assistant
+                    "content": content,
+                    "usage": usage,
+                    "cached": result.get("cached", False),
+                    "answered_by": answered_by
+                })
             except Exception as e:
-                st.error(f"Connection Error: {e}")
+                st.error(f"Error: {e}")
+        else:
+            with st.spinner("Thinking..."):
+                try:
+                    response = requests.post(f"{API_BASE_URL}/chat/completions", json=payload)
+                    if response.status_code == 200:
+                        data = response.json()
+                        content = data["content"]
+                        usage = data.get("usage")
+                        
+                        st.markdown(content)
+                        answered_by = f"{data.get('provider')} · {data.get('model')}" if selected_provider == "auto" else None
+                        if data.get("cached"):
+                            st.caption("⚡ Served from cache")
+                        if answered_by:
+                            st.caption(f"Answered by {answered_by}")
+                        if usage:
+                            with st.expander("Token Usage"):
+                                st.json(usage)
+                        
+                        # Add to history
+                        st.session_state.messages.append({
+                            "role": "model", # or assistant
+                            "content": content,
+                            "usage": usage,
+                            "cached": data.get("cached", False),
+                            "answered_by": answered_by
+                        })
+                    else:
+                        st.error(f"Error: {response.status_code} - {response.text}")
+                except Exception as e:
+                    st.error(f"Connection Error: {e}")
@@ -0,0 +1,27 @@
+"""
+Client-side decoder for the compact vector encodings returned by the API
+(`encoding=binary` / `Accept: application/octet-stream`, and `encoding=base64`).
+Mirrors the layout documented in app/core/vector_codec.py.
+"""
+import base64
+import struct
+
+import numpy as np
+
+HEADER = struct.Struct("<4sBBHII")
+DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+_DTYPE_BY_CODE = {1: DTYPES["float32"], 2: DTYPES["float16"]}
+
+
+def decode_vectors(data: bytes) -> np.ndarray:
+    """Decodes a binary payload into a (rows, dimension) float32 array."""
+    magic, version, code, _, rows, dimension = HEADER.unpack_from(data)
+    if magic != b"VECS" or version != 1:
+        raise ValueError("Not a vector payload (bad magic or version)")
+    matrix = np.frombuffer(data, dtype=_DTYPE_BY_CODE[code], count=rows * dimension, offset=HEADER.size)
+    return matrix.reshape(rows, dimension).astype(np.float32)
+
+
+def decode_base64(data: str, dtype: str = "float32") -> np.ndarray:
+    """Decodes a single base64-packed vector into a float32 array."""
+    return np.frombuffer(base64.b64decode(data), dtype=DTYPES[dtype]).astype(np.float32)
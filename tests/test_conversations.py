@@ -0,0 +1,86 @@
+"""
+Test cases for server-side conversation sessions
+"""
+import asyncio
+
+from app.services.conversation_service import ConversationService, SQLiteConversationStore
+
+
+class FakeSummaryService(ConversationService):
+    """Summarizes by listing the folded messages, without a model call"""
+
+    def __init__(self, fail=False, **kwargs):
+        super().__init__(SQLiteConversationStore(":memory:"), summary_max_tokens=64, **kwargs)
+        self.fail = fail
+        self.folded = []
+
+    async def _summarize(self, previous, folded, provider):
+        if self.fail:
+            raise RuntimeError("summary model down")
+        self.folded.append([m["seq"] for m in folded])
+        return " | ".join(filter(None, [previous] + [m["content"] for m in folded]))
+
+
+def turn(service, text, answer, system="Be helpful."):
+    """One chat turn as the endpoint runs it; returns what the model was sent"""
+    new = [{"role": "system", "content": system}, {"role": "user", "content": text}]
+
+    async def run():
+        context = await service.context("c1", new)
+        await service.record("c1", new, answer)
+        return context
+
+    return asyncio.run(run())
+
+
+def test_history_is_added_server_side():
+    """Test that earlier turns come from the store and the system prompt is stored once"""
+    service = FakeSummaryService(max_tokens=10000, keep_tokens=5000)
+    turn(service, "My name is Ada.", "Hello Ada.")
+    context = turn(service, "What is my name?", "Ada.")
+
+    assert context == [
+        {"role": "system", "content": "Be helpful."},
+        {"role": "user", "content": "My name is Ada."},
+        {"role": "assistant", "content": "Hello Ada."},
+        {"role": "user", "content": "What is my name?"},
+    ]
+    stored = asyncio.run(service.get("c1"))["messages"]
+    assert [m["role"] for m in stored] == ["system", "user", "assistant", "user", "assistant"]
+
+
+def test_old_turns_are_folded_into_a_cached_summary():
+    """Test that passing the budget summarizes down to keep_tokens, and not again on the next turn"""
+    service = FakeSummaryService(max_tokens=30, keep_tokens=12)
+    long = "x" * 40  # ~11 tokens
+    turn(service, f"first {long}", "one")
+    turn(service, f"second {long}", "two")
+    context = turn(service, f"third {long}", "three")
+
+    assert service.folded == [[2, 3, 4, 5]]
+    assert context[0]["role"] == "system"
+    assert context[0]["content"].startswith("Be helpful.\n\nSummary of the earlier conversation:\n")
+    assert f"first {long}" in context[0]["content"] and "two" in context[0]["content"]
+    assert context[1:] == [{"role": "user", "content": f"third {long}"}]
+
+    # Under budget again: the stored summary is reused as is
+    context = turn(service, "short", "ok")
+    assert service.folded == [[2, 3, 4, 5]]
+    assert context[1:] == [
+        {"role": "user", "content": f"third {long}"},
+        {"role": "assistant", "content": "three"},
+        {"role": "user", "content": "short"},
+    ]
+    assert asyncio.run(service.get("c1"))["summary"]["upto_seq"] == 5
+
+
+def test_failed_summary_drops_old_turns_without_storing():
+    """Test that a failing summarizer does not fail the turn"""
+    service = FakeSummaryService(fail=True, max_tokens=30, keep_tokens=12)
+    long = "y" * 40
+    turn(service, f"first {long}", "one")
+    turn(service, f"second {long}", "two")
+    context = turn(service, f"third {long}", "three")
+
+    assert context == [{"role": "system", "content": "Be helpful."}, {"role": "user", "content": f"third {long}"}]
+    assert asyncio.run(service.get("c1"))["summary"] is None
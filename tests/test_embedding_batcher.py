@@ -0,0 +1,133 @@
+"""
+Test cases for the embedding request coalescer
+"""
+import asyncio
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import CachedEmbeddingService, EmbeddingCache
+
+
+class FakeEmbeddingService:
+    """Returns a vector derived from the text and records every upstream batch"""
+
+    def __init__(self, fail=False):
+        self.model_name = "fake-embedding"
+        self.calls = []
+        self.fail = fail
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        self.calls.append((list(texts), dimension))
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [[float(len(text))] * dimension for text in texts]
+
+
+def test_concurrent_requests_share_one_batch():
+    """Test that requests inside the window become a single upstream call and get their own vectors"""
+    service = FakeEmbeddingService()
+    batcher = EmbeddingBatcher(window_ms=5, max_batch=100)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(service, "x" * i, 2) for i in range(1, 11)))
+
+    vectors = asyncio.run(run())
+    assert len(service.calls) == 1
+    assert [v[0] for v in vectors] == [float(i) for i in range(1, 11)]
+
+
+def test_batches_are_grouped_by_dimension_and_capped():
+    """Test that different dimensions never share a batch and max_batch flushes early"""
+    service = FakeEmbeddingService()
+    batcher = EmbeddingBatcher(window_ms=50, max_batch=3)
+
+    async def run():
+        requests = [batcher.embed(service, "a", 2) for _ in range(4)] + [batcher.embed(service, "b", 4)]
+        return await asyncio.gather(*requests)
+
+    asyncio.run(run())
+    assert sorted((len(texts), dim) for texts, dim in service.calls) == [(1, 2), (1, 4), (3, 2)]
+
+
+def test_upstream_error_reaches_every_caller():
+    """Test that a failed batch call is raised to all waiting requests"""
+    service = FakeEmbeddingService(fail=True)
+    batcher = EmbeddingBatcher(window_ms=1, max_batch=10)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(service, "a", 2) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class BadText(ValueError):
+    """Raised for a text the provider rejects"""
+
+
+def test_rejected_text_only_fails_its_own_caller():
+    """Test that a batch rejected for one text is bisected and the others still get vectors"""
+    service = FakeEmbeddingService()
+    original = service.generate_batch_embeddings
+
+    async def reject_bad(texts, dimension=768):
+        if "bad" in texts:
+            service.calls.append((list(texts), dimension))
+            raise BadText("invalid input")
+        return await original(texts, dimension)
+
+    service.generate_batch_embeddings = reject_bad
+    batcher = EmbeddingBatcher(window_ms=5, max_batch=100)
+
+    async def run():
+        texts = ["a", "bb", "bad", "cccc", "ddddd"]
+        return await asyncio.gather(*(batcher.embed(service, t, 1) for t in texts), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[2], BadText)
+    assert [r[0] for i, r in enumerate(results) if i != 2] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_short_response_fails_instead_of_hanging():
+    """Test that fewer vectors than texts fails every caller rather than leaving some waiting"""
+    service = FakeEmbeddingService()
+
+    async def short(texts, dimension=768):
+        return [[0.0] * dimension for _ in texts[:-1]]
+
+    service.generate_batch_embeddings = short
+    batcher = EmbeddingBatcher(window_ms=1, max_batch=10)
+
+    async def run():
+        requests = (batcher.embed(service, "a", 2) for _ in range(3))
+        return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), timeout=1)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+
+def test_cache_hits_skip_the_window():
+    """Test that a cached text is answered without waiting for (or joining) a batch"""
+    upstream = FakeEmbeddingService()
+    service = CachedEmbeddingService(upstream, "fake", EmbeddingCache(max_bytes=1024 * 1024))
+    batcher = EmbeddingBatcher(window_ms=10000, max_batch=100)
+
+    async def run():
+        await service.generate_batch_embeddings(["warm"], 2)
+        return await asyncio.wait_for(batcher.embed(service, "warm", 2), timeout=1)
+
+    assert asyncio.run(run()) == [4.0, 4.0]
+    assert len(upstream.calls) == 1 and batcher.stats()["cache_hits"] == 1
+
+
+def test_coalesced_misses_are_counted_once():
+    """Test that a text missed by the early lookup is not looked up (and counted) again by its batch"""
+    upstream = FakeEmbeddingService()
+    cache = EmbeddingCache(max_bytes=1024 * 1024)
+    service = CachedEmbeddingService(upstream, "fake", cache)
+    batcher = EmbeddingBatcher(window_ms=5, max_batch=100)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(service, text, 2) for text in ["a", "bb", "a"]))
+
+    assert [v[0] for v in asyncio.run(run())] == [1.0, 2.0, 1.0]
+    assert upstream.calls == [(["a", "bb"], 2)]
+    assert cache.stats()["misses"] == 3 and cache.stats()["memory_hits"] == 0
@@ -0,0 +1,79 @@
+"""
+Test cases for the two-tier embedding cache
+"""
+import asyncio
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, CachedEmbeddingService, make_cache_key
+
+
+class FakeEmbeddingService:
+    """Returns a vector derived from the text and records every upstream batch"""
+
+    def __init__(self):
+        self.model_name = "fake-embedding"
+        self.calls = []
+
+    async def generate_embedding(self, text, dimension=768):
+        self.calls.append([text])
+        return [float(len(text))] * dimension
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        self.calls.append(list(texts))
+        return [[float(len(text))] * dimension for text in texts]
+
+
+def test_cache_key_normalizes_whitespace():
+    """Test that surrounding and repeated whitespace map to the same key"""
+    assert make_cache_key("gemini", "m", 8, "  red   shoes ") == make_cache_key("gemini", "m", 8, "red shoes")
+    assert make_cache_key("gemini", "m", 8, "red shoes") != make_cache_key("gemini", "m", 16, "red shoes")
+
+
+def test_batch_sends_only_misses_and_keeps_order():
+    """Test that cached and duplicate texts are not sent upstream and output order is preserved"""
+    upstream = FakeEmbeddingService()
+    service = CachedEmbeddingService(upstream, "fake", EmbeddingCache(max_bytes=1024 * 1024))
+
+    asyncio.run(service.generate_embedding("a", dimension=4))
+    vectors = asyncio.run(service.generate_batch_embeddings(["bbb", "a", "cc", "bbb"], dimension=4))
+
+    assert upstream.calls == [["a"], ["bbb", "cc"]]
+    assert [v[0] for v in vectors] == [3.0, 1.0, 2.0, 3.0]
+    stats = service.cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_short_provider_response_is_an_error_and_not_cached():
+    """Test that fewer vectors than texts raise a clear error instead of caching a misaligned batch"""
+    class ShortEmbeddingService(FakeEmbeddingService):
+        async def generate_batch_embeddings(self, texts, dimension=768):
+            return (await super().generate_batch_embeddings(texts, dimension))[:-1]
+
+    service = CachedEmbeddingService(ShortEmbeddingService(), "fake", EmbeddingCache(max_bytes=1024 * 1024))
+
+    with pytest.raises(RuntimeError, match="Provider returned 1 embeddings for 2 texts"):
+        asyncio.run(service.generate_batch_embeddings(["a", "bb"], dimension=4))
+    assert service.cache.stats()["memory_entries"] == 0
+
+
+def test_lru_evicts_over_byte_budget():
+    """Test that the memory tier stays within its byte budget"""
+    cache = EmbeddingCache(max_bytes=200)
+    asyncio.run(cache.put_many({f"k{i}": [0.0] * 16 for i in range(5)}))
+
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 200
+    assert stats["evictions"] == 2
+    assert asyncio.run(cache.get_many(["k0"])) == {}
+    assert "k4" in asyncio.run(cache.get_many(["k4"]))
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that vectors written to the SQLite tier are served by a new cache instance"""
+    db_path = str(tmp_path / "embeddings.sqlite3")
+    asyncio.run(EmbeddingCache(max_bytes=1024, db_path=db_path).put_many({"k": [0.5, 0.25]}))
+
+    restarted = EmbeddingCache(max_bytes=1024, db_path=db_path)
+    assert asyncio.run(restarted.get_many(["k"])) == {"k": [0.5, 0.25]}
+    assert restarted.stats()["disk_hits"] == 1
@@ -0,0 +1,79 @@
+"""
+Test cases for chunked batch embedding
+"""
+import asyncio
+
+from app.services.embedding_chunker import ChunkedEmbedder, plan_chunks
+from app.services.rate_limiter import RateLimitExceeded
+
+
+class FlakyEmbeddingService:
+    """Fails every call containing a poisoned text, and the first call containing a flaky one"""
+
+    def __init__(self):
+        self.model_name = "fake-embedding"
+        self.calls = []
+        self.flaky_failed = False
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        self.calls.append(list(texts))
+        if "poison" in texts:
+            raise RuntimeError("rejected by provider")
+        if "flaky" in texts and not self.flaky_failed:
+            self.flaky_failed = True
+            raise RuntimeError("timeout")
+        return [[float(len(text))] * dimension for text in texts]
+
+
+def test_plan_chunks_respects_item_and_token_limits():
+    """Test that chunks are capped by item count and estimated tokens, keeping order"""
+    texts = ["a" * 40] * 5 + ["b" * 400] + ["c"]
+    chunks = plan_chunks(texts, max_items=3, max_tokens=50)
+
+    assert chunks == [[0, 1, 2], [3, 4], [5], [6]]
+
+
+def test_failed_chunks_are_retried_and_reported_per_item():
+    """Test that a transient failure is retried and a permanent one only fails its own items"""
+    service = FlakyEmbeddingService()
+    embedder = ChunkedEmbedder(max_items=2, max_tokens=10000, concurrency=2, max_retries=1, retry_backoff=0)
+
+    texts = ["aa", "flaky", "poison", "bbbb", "c"]
+    vectors, failed = asyncio.run(embedder.embed(service, texts, dimension=2))
+
+    assert [v[0] if v else None for v in vectors] == [2.0, 5.0, None, None, 1.0]
+    assert [f["index"] for f in failed] == [2, 3]
+    assert failed[0]["error"] == "rejected by provider"
+    # The flaky chunk went upstream twice; the healthy last chunk only once
+    assert service.calls.count(["aa", "flaky"]) == 2
+    assert service.calls.count(["c"]) == 1
+
+
+class RejectingEmbeddingService:
+    """Fails every call with the given error"""
+
+    def __init__(self, error):
+        self.model_name = "fake-embedding"
+        self.error = error
+        self.calls = 0
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        self.calls += 1
+        raise self.error
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def test_caller_errors_and_rate_limits_are_not_retried():
+    """Test that a 4xx rejection and an exhausted rate limit fail their chunk without retries"""
+    embedder = ChunkedEmbedder(max_items=2, max_tokens=10000, concurrency=1, max_retries=3, retry_backoff=0)
+
+    for error in (BadRequest("invalid input"), RateLimitExceeded("llm:embed", 1.0)):
+        service = RejectingEmbeddingService(error)
+        vectors, failed = asyncio.run(embedder.embed(service, ["a"], dimension=2))
+
+        assert vectors == [None]
+        assert failed[0]["error"] == str(error)
+        assert service.calls == 1
@@ -0,0 +1,151 @@
+"""
+Test cases for Gemini explicit context caching
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from google.genai import errors, types
+
+from app.services.gemini_context_cache import GeminiContextCache, is_missing_cache
+
+LONG_SYSTEM = "You are a support agent. " * 400  # ~2500 tokens
+
+
+class FakeCaches:
+    """Stands in for client.aio.caches, counting create/update calls"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.updated = []
+
+    async def create(self, model, config):
+        if self.fail:
+            raise RuntimeError("400 model does not support cached content")
+        await asyncio.sleep(0.01)
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}", model=model)
+
+    async def update(self, name, config):
+        self.updated.append((name, config.ttl))
+
+
+def make_cache(caches, **kwargs):
+    options = {"min_tokens": 1000, "ttl": 3600, "refresh_margin": 300, "min_uses": 2, **kwargs}
+    return GeminiContextCache(SimpleNamespace(aio=SimpleNamespace(caches=caches)), **options)
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def test_long_system_prompt_is_cached_once_and_reused():
+    """Test that concurrent and later requests share one handle and drop the system instruction"""
+    caches = FakeCaches()
+    cache = make_cache(caches)
+    config = types.GenerateContentConfig(system_instruction=LONG_SYSTEM, temperature=0)
+
+    async def run():
+        first = await asyncio.gather(*[cache.apply("gemini-2.0-flash", [user(f"q{i}")], config) for i in range(3)])
+        later = await cache.apply("gemini-2.0-flash", [user("q4")], config)
+        other_model = await cache.apply("gemini-2.5-flash", [user("q5")], config)
+        return first + [later, other_model]
+
+    results = asyncio.run(run())
+    assert len(caches.created) == 2  # one per model
+    for contents, cfg, handle in results:
+        assert handle is not None and cfg.cached_content == handle.name
+        assert cfg.system_instruction is None and cfg.temperature == 0
+        assert len(contents) == 1
+    assert config.system_instruction == LONG_SYSTEM  # caller's config untouched
+
+    # Short prompts are sent as they are
+    short = types.GenerateContentConfig(system_instruction="Be brief.")
+    contents, cfg, handle = asyncio.run(cache.apply("gemini-2.0-flash", [user("hi")], short))
+    assert handle is None and cfg is short
+
+
+def test_repeated_few_shot_prefix_is_cached_after_min_uses():
+    """Test that system + examples are cached once seen twice, and only the new turn is sent"""
+    caches = FakeCaches()
+    cache = make_cache(caches, min_tokens=500)
+    system = "Classify the ticket. " * 150
+    examples = [user("example ticket"), types.Content(role="model", parts=[types.Part(text="billing")])]
+    config = types.GenerateContentConfig(system_instruction=system)
+
+    async def run():
+        return [await cache.apply("m", examples + [user(f"ticket {i}")], config) for i in range(3)]
+
+    first, second, third = asyncio.run(run())
+    # First use: only the system prompt qualifies; from the second, the whole prefix
+    assert first[2].prefix_length == 0 and len(first[0]) == 3
+    assert second[2].prefix_length == 2 and second[0] == [user("ticket 1")]
+    assert third[2] is second[2]
+    assert len(caches.created[1].contents) == 2
+
+
+def test_failed_create_falls_back_and_backs_off():
+    """Test that a refused cache sends the request unchanged and is not retried right away"""
+    caches = FakeCaches(fail=True)
+    cache = make_cache(caches)
+    config = types.GenerateContentConfig(system_instruction=LONG_SYSTEM)
+
+    contents, cfg, handle = asyncio.run(cache.apply("m", [user("q")], config))
+    assert handle is None and cfg is config and contents == [user("q")]
+    caches.fail = False
+    assert asyncio.run(cache.apply("m", [user("q")], config))[2] is None
+    assert cache.stats()["create_failures"] == 1 and caches.created == []
+
+
+def test_handle_is_refreshed_before_expiry():
+    """Test that a handle close to expiry gets its TTL extended in the background"""
+    caches = FakeCaches()
+    cache = make_cache(caches)
+    config = types.GenerateContentConfig(system_instruction=LONG_SYSTEM)
+
+    async def run():
+        _, _, handle = await cache.apply("m", [user("q1")], config)
+        handle.expires_at = time.time() + 60
+        await cache.apply("m", [user("q2")], config)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return handle
+
+    handle = asyncio.run(run())
+    assert caches.updated == [(handle.name, "3600s")]
+    assert handle.expires_at > time.time() + 3000 and not handle.refreshing
+
+
+def test_expired_and_excess_handles_are_pruned():
+    """Test that expired handles and failures are dropped and both maps stay bounded"""
+    caches = FakeCaches()
+    cache = make_cache(caches)
+    cache.TRACKED_PREFIXES = 2
+    configs = [types.GenerateContentConfig(system_instruction=f"Prompt {i}. " + LONG_SYSTEM) for i in range(4)]
+
+    async def run():
+        _, _, first = await cache.apply("m", [user("q")], configs[0])
+        first.expires_at = time.time() - 1
+        for config in configs[1:]:
+            await cache.apply("m", [user("q")], config)
+
+    asyncio.run(run())
+    assert len(caches.created) == 4
+    assert [h.name for h in cache.handles.values()] == ["cachedContents/3", "cachedContents/4"]
+
+    caches.fail = True
+    for config in configs[:3]:
+        asyncio.run(cache.apply("other", [user("q")], config))
+    assert len(cache._failed) == 2
+
+
+def test_only_not_found_counts_as_a_missing_cache():
+    """Test that permission, quota and other errors are not mistaken for an expired cache"""
+    def api_error(code, status, message):
+        return errors.ClientError(code, {"error": {"code": code, "status": status, "message": message}})
+
+    assert is_missing_cache(api_error(404, "NOT_FOUND", "CachedContent not found"))
+    assert not is_missing_cache(api_error(403, "PERMISSION_DENIED", "cached content access denied"))
+    assert not is_missing_cache(api_error(429, "RESOURCE_EXHAUSTED", "quota"))
+    assert not is_missing_cache(RuntimeError("cached content is gone"))
@@ -0,0 +1,68 @@
+"""
+Test cases for the background health prober
+"""
+import asyncio
+
+from app.services.health_prober import HealthProber
+
+
+class FakeCheck:
+    """Counts calls and returns (or raises) a preset outcome after a delay"""
+
+    def __init__(self, outcome=True, delay=0.0):
+        self.outcome = outcome
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def test_results_are_cached_between_probes():
+    """Test that repeated health requests inside max_age reuse one check"""
+    check = FakeCheck()
+    prober = HealthProber({"svc": check}, interval=60, timeout=1)
+
+    async def run():
+        for _ in range(5):
+            result = await prober.get("svc")
+        return result
+
+    result = asyncio.run(run())
+    assert check.calls == 1
+    assert result.status == "ok"
+    assert result.latency_ms is not None
+
+
+def test_concurrent_checks_share_one_call():
+    """Test that simultaneous refreshes of a target join the in-flight check"""
+    check = FakeCheck(delay=0.05)
+    prober = HealthProber({"svc": check}, interval=60, timeout=1)
+
+    async def run():
+        return await asyncio.gather(*(prober.check("svc") for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert check.calls == 1
+    assert all(r.status == "ok" for r in results)
+
+
+def test_check_all_records_failures_and_timeouts():
+    """Test that errors, False results and timeouts mark targets down with the last error"""
+    prober = HealthProber({
+        "ok": FakeCheck(),
+        "false": FakeCheck(outcome=False),
+        "error": FakeCheck(outcome=RuntimeError("connection refused")),
+        "slow": FakeCheck(delay=1.0),
+    }, interval=60, timeout=0.05)
+
+    results = asyncio.run(prober.check_all())
+    assert results["ok"].status == "ok"
+    assert results["false"].status == "down"
+    assert results["error"].last_error == "connection refused"
+    assert results["slow"].last_error == "timed out after 0.05s"
+    assert results["error"].consecutive_failures == 1
@@ -0,0 +1,99 @@
+"""
+Test cases for hedged requests
+"""
+import asyncio
+
+from app.services.hedging import HedgedService, Hedger
+
+
+class FakeCall:
+    """Awaitable factory returning preset delays in order; records cancellations"""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return delay
+
+
+def test_fast_call_is_not_hedged():
+    """Test that a call finishing before the hedge delay runs once"""
+    hedger = Hedger(min_delay=0.05, max_delay=0.05, budget=1, min_samples=0)
+    call = FakeCall(0.01)
+
+    assert asyncio.run(hedger.run("site", call)) == 0.01
+    assert call.calls == 1
+    assert hedger.stats()["sites"]["site"]["hedged"] == 0
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    """Test that the hedge fires after the delay, wins, and the slow primary is cancelled"""
+    hedger = Hedger(min_delay=0.05, max_delay=0.05, budget=1, min_samples=0)
+    call = FakeCall(1.0, 0.01)
+
+    assert asyncio.run(hedger.run("site", call)) == 0.01
+    assert call.calls == 2
+    assert call.cancelled == 1
+    stats = hedger.stats()["sites"]["site"]
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_budget_caps_hedges():
+    """Test that hedges beyond the budget are denied and the primary is awaited"""
+    hedger = Hedger(min_delay=0.02, max_delay=0.02, budget=0.5, min_samples=0)
+    call = FakeCall(0.05)
+
+    async def run():
+        for _ in range(4):
+            await hedger.run("site", call)
+
+    asyncio.run(run())
+    stats = hedger.stats()["sites"]["site"]
+    assert stats["calls"] == 4
+    assert stats["hedged"] == 2
+    assert stats["budget_denied"] == 2
+
+
+def test_delay_follows_observed_percentile():
+    """Test that the hedge delay is the latency percentile, clamped to the bounds"""
+    hedger = Hedger(percentile=90, min_delay=0.01, max_delay=1.0, min_samples=10)
+    assert hedger.delay("site") == 1.0
+    hedger._site("site").latencies.extend([0.1] * 9 + [0.5])
+    assert 0.1 <= hedger.delay("site") <= 0.5
+
+    hedger._site("other").latencies.extend([5.0] * 10)
+    assert hedger.delay("other") == 1.0
+
+
+class FakeChatService:
+    def __init__(self, name, delay):
+        self.model_name = name
+        self.delay = delay
+
+    async def chat_with_usage(self, messages, config=None):
+        await asyncio.sleep(self.delay)
+        return {"content": self.model_name, "model": self.model_name, "usage": None}
+
+
+def test_chat_hedge_goes_to_alternate_provider():
+    """Test that a slow chat is answered by the alternate provider, which is reported"""
+    hedger = Hedger(min_delay=0.05, max_delay=0.05, budget=1, min_samples=0)
+    alternate = FakeChatService("alt-model", 0.01)
+    service = HedgedService(FakeChatService("slow-model", 1.0), "gemini", hedger, alternate=lambda: ("litellm", alternate))
+
+    result = asyncio.run(service.chat_with_usage([{"role": "user", "content": "hi"}]))
+    assert result["provider"] == "litellm"
+    assert result["model"] == "alt-model"
+
+    # A pinned model never leaves its provider
+    result = asyncio.run(service.chat_with_usage([{"role": "user", "content": "hi"}], config={"model": "slow-model"}))
+    assert "provider" not in result
@@ -0,0 +1,119 @@
+"""
+Test cases for the JSONL -> embed -> Qdrant ingestion pipeline (Qdrant local in-memory mode)
+"""
+import asyncio
+import json
+
+from qdrant_client import AsyncQdrantClient
+
+from app.core.shared_state import SharedState
+from app.repositories.async_qdrant_repo import AsyncQdrantRepository
+from app.services import ingestion_service
+from app.services.ingestion_service import IngestionPipeline, IngestionService, iter_file_lines, make_point_id
+
+
+class FakeEmbeddingService:
+    def __init__(self, reject=None):
+        self.model_name = "fake-embedding"
+        self.texts = 0
+        self.reject = reject
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        if self.reject in texts:
+            raise RuntimeError("upstream rejected the batch")
+        self.texts += len(texts)
+        return [[float(len(text)), 1.0, 0.5, 0.25] for text in texts]
+
+
+def make_repo():
+    return AsyncQdrantRepository(AsyncQdrantClient(":memory:"))
+
+
+def write_jsonl(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"request_id": f"user-{i:03d}", "title": f"title {i}"}) + "\n")
+        f.write("not json\n")
+
+
+def test_point_ids_are_valid_and_stable():
+    """Test that non-UUID ids map to a stable UUID and unsigned ints pass through"""
+    assert make_point_id({"id": 7}, "id") == 7
+    assert make_point_id({"id": "user-001"}, "id") == make_point_id({"id": "user-001"}, "id")
+    assert make_point_id({"a": 1}, None) == make_point_id({"a": 1}, None)
+
+
+def test_pipeline_ingests_and_resumes_from_checkpoint(tmp_path):
+    """Test that every valid record is upserted and a rerun skips checkpointed lines"""
+    source = str(tmp_path / "data.jsonl")
+    checkpoint = str(tmp_path / "data.checkpoint.json")
+    write_jsonl(source, 100)
+    repo = make_repo()
+
+    def run():
+        service = FakeEmbeddingService()
+        pipeline = IngestionPipeline(
+            service, repo, "items", "title", id_field="request_id",
+            dimension=4, batch_size=16, checkpoint_path=checkpoint
+        )
+        return service, asyncio.run(pipeline.run(iter_file_lines(source)))
+
+    service, progress = run()
+    assert progress.status == "completed"
+    assert progress.records_upserted == 100
+    assert progress.records_failed == 1
+    assert asyncio.run(repo.client.count("items")).count == 100
+
+    service, progress = run()
+    assert progress.lines_skipped == 101
+    assert service.texts == 0
+    assert asyncio.run(repo.client.count("items")).count == 100
+
+
+def test_checkpoint_stops_before_records_that_failed_to_embed(tmp_path, monkeypatch):
+    """Test that a resumed run retries records whose embedding failed instead of skipping them"""
+    monkeypatch.setattr(ingestion_service.chunked_embedder, "max_retries", 0)
+    source = str(tmp_path / "data.jsonl")
+    checkpoint = str(tmp_path / "data.checkpoint.json")
+    write_jsonl(source, 40)
+    repo = make_repo()
+
+    def run(service):
+        pipeline = IngestionPipeline(
+            service, repo, "items", "title", id_field="request_id",
+            dimension=4, batch_size=8, checkpoint_path=checkpoint
+        )
+        return asyncio.run(pipeline.run(iter_file_lines(source)))
+
+    progress = run(FakeEmbeddingService(reject="title 10"))
+    assert progress.records_upserted == 32
+    with open(checkpoint) as f:
+        assert json.load(f)["lines_done"] == 8  # the failed batch starts at line 9
+
+    progress = run(FakeEmbeddingService())
+    assert progress.lines_skipped == 8
+    assert asyncio.run(repo.client.count("items")).count == 40
+
+
+def test_job_status_is_visible_to_other_workers(tmp_path, monkeypatch):
+    """Test that a job's progress can be read by a worker that did not run it"""
+    state = SharedState(str(tmp_path / "state.sqlite3"), poll_interval=0.01)
+    monkeypatch.setattr(ingestion_service, "shared_state", state)
+    source = str(tmp_path / "data.jsonl")
+    write_jsonl(source, 20)
+    owner, other = IngestionService(), IngestionService()
+
+    async def run():
+        progress = await owner.start_file_job(
+            source, FakeEmbeddingService(), make_repo(), "items", "title", id_field="request_id", dimension=4
+        )
+        seen = await other.get_job(progress.job_id)
+        await asyncio.gather(*owner._tasks)
+        return progress, seen, await other.get_job(progress.job_id), await other.get_job("unknown")
+
+    progress, seen, done, unknown = asyncio.run(run())
+    assert seen.job_id == progress.job_id and seen.status == "pending"
+    assert done.status == "completed" and done.records_upserted == 20
+    assert done.to_dict()["elapsed_seconds"] is not None
+    assert unknown is None
+    state.store.close()
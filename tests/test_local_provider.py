@@ -0,0 +1,58 @@
+"""
+Test cases for the offline "local" provider
+"""
+import asyncio
+
+import numpy as np
+
+from app.services.local_service import LocalService
+from app.services.llm_manager import llm_manager
+
+
+def test_embeddings_are_deterministic_unit_vectors():
+    """Test that the same text gives the same vector at any dimension, and shared words mean similarity"""
+    service = LocalService()
+    texts = ["red running shoes", "red running shoes", "shoes for running", "quarterly tax report", ""]
+
+    vectors = np.array(asyncio.run(service.generate_batch_embeddings(texts, dimension=64)))
+    assert vectors.shape == (5, 64)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[2] > vectors[0] @ vectors[3]
+
+    # A fresh instance (another worker) reproduces the same vectors
+    single = asyncio.run(LocalService().generate_embedding("red running shoes", dimension=64))
+    assert np.allclose(single, vectors[0], atol=1e-6)
+    assert len(asyncio.run(service.generate_embedding("x", dimension=3072))) == 3072
+
+
+def test_completions_report_usage_and_respect_max_tokens():
+    """Test that synthetic completions are capped by max_output_tokens and stream the same text"""
+    service = LocalService()
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Tell me about Qdrant"}]
+
+    result = asyncio.run(service.chat_with_usage(messages, config={"max_output_tokens": 12}))
+    assert result["model"] == service.model_name
+    assert len(result["content"].split()) == 12
+    usage = result["usage"]
+    assert usage["prompt_tokens"] > 0 and usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+    async def collect():
+        return [event async for event in service.stream_chat_with_usage(messages, config={"max_output_tokens": 12})]
+
+    events = asyncio.run(collect())
+    assert "".join(e["content"] for e in events if e["type"] == "delta") == result["content"]
+    assert events[-1] == {"type": "done", "usage": usage, "model": service.model_name}
+
+
+def test_local_is_registered_but_not_routed_by_default():
+    """Test that the manager serves the local provider without adding it to latency routing"""
+    assert "local" in llm_manager.available_providers()
+    assert asyncio.run(llm_manager.get_service("local").health_check())
+
+    mode = llm_manager.routing_mode
+    llm_manager.set_routing_mode("latency")
+    try:
+        assert "local" not in [name for name, _ in llm_manager.routes()]
+    finally:
+        llm_manager.set_routing_mode(mode)
@@ -0,0 +1,68 @@
+"""
+Test cases for the Prometheus instrumentation
+"""
+import asyncio
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.metrics import MetricsMiddleware, metrics_payload
+from app.services.metered_service import MeteredService
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    """Test that path parameters do not leak into the route label"""
+    router = APIRouter()
+
+    @router.get("/jobs/{job_id}")
+    async def job(job_id: str):
+        return {"job_id": job_id}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router, prefix="/api")
+
+    route = "/api/jobs/{job_id}"
+    before = sample("http_request_duration_seconds_count", method="GET", route=route, status="200")
+    client = TestClient(app)
+    for job_id in ("a", "b", "c"):
+        assert client.get(f"/api/jobs/{job_id}").status_code == 200
+    client.get("/missing")
+
+    assert sample("http_request_duration_seconds_count", method="GET", route=route, status="200") == before + 3
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+
+
+class FakeService:
+    model_name = "fake-model"
+
+    async def chat_with_usage(self, messages, config=None):
+        return {"content": "hi", "model": self.model_name, "usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}}
+
+    async def generate_batch_embeddings(self, texts, dimension=768):
+        return [[0.0] * dimension for _ in texts]
+
+
+def test_provider_calls_are_timed_and_tokens_counted():
+    """Test that latency, token and batch-size metrics are recorded per provider/model"""
+    service = MeteredService(FakeService(), "fake")
+    labels = {"provider": "fake", "model": "fake-model"}
+    prompt_before = sample("llm_tokens_total", type="prompt", **labels)
+    calls_before = sample("llm_request_duration_seconds_count", operation="chat", outcome="ok", **labels)
+
+    asyncio.run(service.chat_with_usage([{"role": "user", "content": "hi"}]))
+    asyncio.run(service.generate_batch_embeddings(["a", "b", "c"], 4))
+
+    assert sample("llm_tokens_total", type="prompt", **labels) == prompt_before + 7
+    assert sample("llm_request_duration_seconds_count", operation="chat", outcome="ok", **labels) == calls_before + 1
+    assert sample("embedding_batch_size_sum", provider="fake") >= 3
+    assert sample("llm_requests_in_flight", provider="fake") == 0
+
+    body, content_type = metrics_payload()
+    assert b"llm_request_duration_seconds_bucket" in body
+    assert content_type.startswith("text/plain")
@@ -0,0 +1,173 @@
+"""
+Test cases for latency-aware provider routing and circuit breakers
+"""
+import asyncio
+
+import pytest
+
+from app.services import completion_service as completion_module
+from app.services import llm_manager as llm_manager_module
+from app.services.completion_service import CompletionService
+from app.services.llm_manager import llm_manager
+from app.services.provider_router import ProviderRouter, ProviderUnavailable
+from app.services.token_counter import ContextWindowExceeded, TokenCounter
+
+
+class FakeChatService:
+    """Chat service with a fixed latency that can be made to fail"""
+
+    def __init__(self, model_name, delay=0.0, fail=False):
+        self.model_name = model_name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def chat_with_usage(self, messages, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.fail, Exception):
+            raise self.fail
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return {"content": f"from {self.model_name}", "model": self.model_name, "usage": None}
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Latency routing over two fake providers with a fresh router"""
+    router = ProviderRouter(failure_threshold=2, reset_timeout=60, explore=0)
+    monkeypatch.setattr(completion_module, "provider_router", router)
+    monkeypatch.setattr(llm_manager_module, "provider_router", router)
+    services = {"gemini": FakeChatService("fast", delay=0.01), "litellm": FakeChatService("slow", delay=0.05)}
+    monkeypatch.setattr(llm_manager, "gen_services", services)
+    monkeypatch.setattr(llm_manager, "routing_mode", "latency")
+    return router, services
+
+
+def test_ranking_prefers_low_latency_and_few_errors():
+    """Test that routes are ordered by EWMA latency inflated by the error rate"""
+    router = ProviderRouter(explore=0)
+    router.record("a", "m", 0.5)
+    router.record("b", "m", 0.3)
+    assert router.rank([("a", "m"), ("b", "m")]) == [("b", "m"), ("a", "m")]
+
+    # One failure: 300ms * (1 + 4 * 0.3) > 500ms
+    router.record("b", "m", 0.3, RuntimeError("boom"))
+    assert router.rank([("a", "m"), ("b", "m")])[0] == ("a", "m")
+
+
+def test_circuit_opens_and_half_opens():
+    """Test that consecutive failures open the circuit and one trial is allowed after the timeout"""
+    router = ProviderRouter(failure_threshold=2, reset_timeout=60, explore=0)
+    route = ("a", "m")
+    router.record("a", "m", 0.1, RuntimeError("boom"))
+    assert router.rank([route]) == [route]
+    router.record("a", "m", 0.1, RuntimeError("boom"))
+
+    with pytest.raises(ProviderUnavailable):
+        router.rank([route])
+
+    # Pretend the reset timeout has passed
+    router._stats(route).opened_at -= 61
+    assert router.rank([route]) == [route]
+    assert router.acquire(route)
+    assert not router.acquire(route)
+
+    router.record("a", "m", 0.1)
+    assert router.stats()["a:m"]["state"] == "closed"
+
+
+def test_requests_fail_over_to_the_next_provider(routed):
+    """Test that a failing provider is skipped within the request and then avoided"""
+    router, services = routed
+    services["gemini"].fail = True
+    service = CompletionService()
+
+    async def run():
+        return [await service.chat([{"role": "user", "content": "hi"}]) for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert all(r["provider"] == "litellm" for r in results)
+    # The breaker opened after two failures, so gemini was not tried again
+    assert services["gemini"].calls == 2
+    assert router.stats()["gemini:fast"]["state"] == "open"
+
+
+def test_pinned_provider_bypasses_routing(routed):
+    """Test that an explicit provider is used even when its circuit is open"""
+    router, services = routed
+    for _ in range(2):
+        router.record("litellm", "slow", 0.1, RuntimeError("boom"))
+    service = CompletionService()
+
+    result = asyncio.run(service.chat([{"role": "user", "content": "hi"}], provider="litellm"))
+    assert result["provider"] == "litellm"
+    assert services["litellm"].calls == 1
+
+
+def test_provider_that_cannot_be_built_is_failed_over(routed, monkeypatch):
+    """Test that a routed provider failing to load (missing API key) falls through and ranks last"""
+    router, services = routed
+    del services["gemini"]
+    builds = []
+
+    def build(spec):
+        builds.append(spec)
+        raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+    monkeypatch.setattr(llm_manager, "_build", build)
+    service = CompletionService()
+
+    async def run():
+        return [await service.chat([{"role": "user", "content": "hi"}]) for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert all(r["provider"] == "litellm" for r in results)
+    # Load failures count against the provider: its circuit opened after two
+    assert len(builds) == 2
+    assert router.stats()["gemini"]["state"] == "open"
+    assert router.stats()["gemini"]["last_error"].startswith("GEMINI_API_KEY")
+
+
+class BadRequest(Exception):
+    """An upstream 400, as litellm raises it"""
+    status_code = 400
+
+
+def test_caller_errors_do_not_open_the_circuit(routed):
+    """Test that malformed requests (upstream 4xx, input validation) are not counted against the provider"""
+    router, services = routed
+    service = CompletionService()
+
+    def chat():
+        return asyncio.run(service.chat([{"role": "user", "content": "hi"}], provider="gemini"))
+
+    services["gemini"].fail = BadRequest("invalid argument")
+    for _ in range(3):
+        with pytest.raises(BadRequest):
+            chat()
+    assert router.stats()["gemini:fast"]["samples"] == 0
+
+    services["gemini"].fail = True
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            chat()
+    assert router.stats()["gemini:fast"]["state"] == "open"
+
+
+def test_preflight_checks_each_route_model(routed, monkeypatch):
+    """Test that a request too large for one route's model goes to the next, and fails when pinned there"""
+    router, services = routed
+    counter = TokenCounter(cache_size=64, default_context_window=1000, default_max_output=100, limits={"fast": {"context": 50}})
+    monkeypatch.setattr(completion_module, "token_counter", counter)
+    service = CompletionService()
+    messages = [{"role": "user", "content": "x" * 400}]  # ~100 tokens
+
+    result = asyncio.run(service.chat(messages, config={"max_output_tokens": 10}, overflow="reject"))
+    assert result["provider"] == "litellm"
+    assert services["gemini"].calls == 0
+    assert router.stats()["gemini:fast"]["state"] == "closed"
+
+    with pytest.raises(ContextWindowExceeded):
+        asyncio.run(service.chat(messages, provider="gemini", overflow="reject"))
+    assert services["gemini"].calls == 0
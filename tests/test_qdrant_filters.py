@@ -0,0 +1,73 @@
+"""
+Test cases for payload filters, search and cursor pagination (Qdrant local in-memory mode)
+"""
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.pagination import encode_cursor, decode_cursor
+from app.repositories.qdrant_repo import QdrantRepository, build_filter
+
+
+def make_repo():
+    repo = QdrantRepository(QdrantClient(":memory:"))
+    repo.ensure_collection("items", 2)
+    repo.upsert_data("items", [
+        models.PointStruct(id=i, vector=[float(i), 1.0], payload={"n": i, "color": "red" if i % 2 else "blue"})
+        for i in range(10)
+    ])
+    return repo
+
+
+def test_shorthand_filter():
+    """Test that shorthand entries become match / match-any / range conditions"""
+    query_filter = build_filter({"color": "red", "size": ["s", "m"], "n": {"gte": 2}})
+    match, match_any, range_ = query_filter.must
+    assert match.match.value == "red"
+    assert match_any.match.any == ["s", "m"]
+    assert range_.range.gte == 2
+
+
+def test_native_filter_and_errors():
+    """Test that native filter bodies pass through and malformed ranges are rejected"""
+    query_filter = build_filter({"must_not": [{"key": "color", "match": {"value": "red"}}]})
+    assert query_filter.must_not[0].key == "color"
+    assert build_filter(None) is None
+    with pytest.raises(ValueError):
+        build_filter({"n": {"between": [1, 2]}})
+    for not_an_object in ([1], "x", 3):
+        with pytest.raises(ValueError):
+            build_filter(not_an_object)
+
+
+def test_search_and_batch_search():
+    """Test filtered search with field projection and that batch search keeps query order"""
+    repo = make_repo()
+
+    hits = repo.search("items", [3.0, 1.0], limit=3, query_filter=build_filter({"color": "red"}), with_payload=["n"])
+    assert hits[0].id == 3
+    assert all(h.id % 2 == 1 for h in hits)
+    assert all(set(h.payload) == {"n"} for h in hits)
+
+    results = repo.search_batch("items", [[1.0, 1.0], [4.0, 1.0]], limit=1)
+    assert [r[0].id for r in results] == [1, 4]
+
+
+def test_cursor_pagination_walks_filtered_collection():
+    """Test that following the cursor visits every matching point exactly once"""
+    repo = make_repo()
+    query_filter = build_filter({"color": "blue"})
+
+    seen, cursor = [], None
+    while True:
+        points, next_offset = repo.fetch_all(
+            "items", limit=2, with_payload=["n"], offset=decode_cursor(cursor), scroll_filter=query_filter
+        )
+        seen.extend(p.id for p in points)
+        cursor = encode_cursor(next_offset)
+        if cursor is None:
+            break
+
+    assert seen == [0, 2, 4, 6, 8]
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
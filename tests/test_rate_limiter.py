@@ -0,0 +1,154 @@
+"""
+Test cases for per-provider rate limiting and 429 retries
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limiter import RateLimiter, RateLimitExceeded, RateLimitedService
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.status_code = 429
+        self.headers = headers
+
+
+class FakeRateLimitError(Exception):
+    """Shaped like litellm's RateLimitError: status_code plus the HTTP response"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = FakeResponse({"retry-after": retry_after} if retry_after is not None else {})
+
+
+class FakeService:
+    """Generation service that sleeps per call, tracks concurrency and can fail with 429s"""
+
+    model_name = "fake-model"
+
+    def __init__(self, delay=0.0, failures=0, retry_after=None):
+        self.delay = delay
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_content(self, prompt, config=None):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise FakeRateLimitError(self.retry_after)
+            return f"echo: {prompt}"
+        finally:
+            self.active -= 1
+
+
+def test_concurrency_is_capped_per_model():
+    """Test that no more than `concurrency` calls run at once"""
+    service = FakeService(delay=0.02)
+    limited = RateLimitedService(service, "fake", RateLimiter(rpm=0, tpm=0, concurrency=2, max_wait=5))
+
+    async def run():
+        return await asyncio.gather(*(limited.generate_content(f"p{i}") for i in range(6)))
+
+    results = asyncio.run(run())
+    assert results == [f"echo: p{i}" for i in range(6)]
+    assert service.max_active == 2
+
+
+def test_queue_timeout_raises_rate_limit_exceeded():
+    """Test that callers give up after max_wait instead of queueing forever"""
+    service = FakeService(delay=0.2)
+    limiter = RateLimiter(rpm=0, tpm=0, concurrency=1, max_wait=0.05)
+    limited = RateLimitedService(service, "fake", limiter)
+
+    async def run():
+        return await asyncio.gather(limited.generate_content("a"), limited.generate_content("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results[0] == "echo: a"
+    assert isinstance(results[1], RateLimitExceeded)
+    assert limiter.stats()["fake:fake-model"]["rejected"] == 1
+
+    # Timeouts racing with releases must not leak permits
+    service.delay = 0.01
+    limiter.max_wait = 0.012
+    limiter._limiters.clear()
+
+    async def contend():
+        return await asyncio.gather(*(limited.generate_content(f"p{i}") for i in range(30)), return_exceptions=True)
+
+    asyncio.run(contend())
+    assert limiter.limiter("fake", "fake-model").semaphore._value == 1
+
+
+def test_requests_per_minute_bucket():
+    """Test that the rpm bucket admits a burst and rejects what cannot fit in max_wait"""
+    service = FakeService()
+    limited = RateLimitedService(service, "fake", RateLimiter(rpm=2, tpm=0, concurrency=0, max_wait=0.1))
+
+    async def run():
+        await limited.generate_content("a")
+        await limited.generate_content("b")
+        await limited.generate_content("c")
+
+    with pytest.raises(RateLimitExceeded) as info:
+        asyncio.run(run())
+    assert service.calls == 2
+    assert info.value.retry_after > 0
+
+
+def test_overrides_apply_per_provider_and_model():
+    """Test that "provider:model" overrides beat "provider" overrides and defaults"""
+    limiter = RateLimiter(rpm=100, tpm=0, concurrency=4, max_wait=1, overrides={
+        "fake": {"rpm": 10},
+        "fake:big-model": {"rpm": 1, "concurrency": 1},
+    })
+    assert limiter.limiter("fake", "small-model").rpm == 10
+    assert limiter.limiter("fake", "small-model").concurrency == 4
+    assert limiter.limiter("fake", "big-model").rpm == 1
+    assert limiter.limiter("other", "any").rpm == 100
+
+
+def test_limits_are_split_across_workers():
+    """Test that each worker process enforces its share of the deployment-wide limits"""
+    limiter = RateLimiter(rpm=100, tpm=0, concurrency=4, max_wait=1, workers=3, overrides={"fake": {"concurrency": 1}})
+    assert limiter.limiter("other", "any").rpm == 34
+    assert limiter.limiter("other", "any").concurrency == 2
+    assert limiter.limiter("other", "any").tpm == 0  # still unlimited
+    assert limiter.limiter("fake", "any").concurrency == 1
+
+
+def test_upstream_429_is_retried_after_retry_after():
+    """Test that a 429 is retried and the Retry-After header sets the delay"""
+    service = FakeService(failures=1, retry_after="0.1")
+    limiter = RateLimiter(rpm=0, tpm=0, concurrency=1, max_wait=5, max_retries=2, backoff=10)
+    limited = RateLimitedService(service, "fake", limiter)
+
+    start = time.monotonic()
+    result = asyncio.run(limited.generate_content("a"))
+    elapsed = time.monotonic() - start
+
+    assert result == "echo: a"
+    assert service.calls == 2
+    # Retry-After (0.1s) replaced the 10s backoff
+    assert 0.1 <= elapsed < 1
+    assert limiter.stats()["fake:fake-model"]["retries"] == 1
+
+
+def test_retries_are_bounded():
+    """Test that the 429 is raised once max_retries is used up"""
+    service = FakeService(failures=5, retry_after="0")
+    limited = RateLimitedService(service, "fake", RateLimiter(rpm=0, tpm=0, concurrency=1, max_wait=5, max_retries=2))
+
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(limited.generate_content("a"))
+    assert service.calls == 3
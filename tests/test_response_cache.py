@@ -0,0 +1,87 @@
+"""
+Test cases for the exact-match response cache
+"""
+import asyncio
+
+from app.services.completion_service import CompletionService
+from app.services.response_cache import ResponseCache, canonical_messages, make_response_key
+
+USAGE = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+
+
+class FakeChatService:
+    """Counts upstream calls and answers with a fixed usage block"""
+
+    def __init__(self):
+        self.model_name = "fake-chat"
+        self.calls = 0
+
+    async def chat_with_usage(self, messages, config=None):
+        self.calls += 1
+        return {"content": f"answer {self.calls}", "model": self.model_name, "usage": USAGE}
+
+
+class FakeCompletionService(CompletionService):
+    def __init__(self, service, **caches):
+        super().__init__(**caches)
+        self.fake = service
+
+    def _service(self, provider):
+        return self.fake
+
+    def _provider(self, provider):
+        return provider or "fake"
+
+
+def test_keys_ignore_whitespace_and_extra_fields_but_not_params():
+    """Test that canonicalization merges cosmetic differences and keeps semantic ones apart"""
+    a = canonical_messages([{"role": "user", "content": "Hello   world "}])
+    b = canonical_messages([{"role": "user", "content": "Hello world", "name": "x"}])
+    assert a == b
+    key = make_response_key("chat", "gemini", "m", a, {"temperature": 0, "max_output_tokens": 10})
+    assert key == make_response_key("chat", "gemini", "m", b, {"max_output_tokens": 10, "temperature": 0, "model": "m"})
+    assert key != make_response_key("chat", "gemini", "m", a, {"temperature": 0, "max_output_tokens": 20})
+    assert key != make_response_key("chat", "litellm", "m", a, {"temperature": 0, "max_output_tokens": 10})
+
+
+def test_lru_evicts_and_disk_tier_survives_restart(tmp_path):
+    """Test that the byte budget evicts old entries and the SQLite tier refills memory"""
+    db_path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(max_bytes=300, db_path=db_path)
+
+    async def fill():
+        for i in range(5):
+            await cache.put(f"key-{i}", {"content": "x" * 40, "usage": USAGE})
+
+    asyncio.run(fill())
+    assert cache.stats()["evictions"] > 0
+
+    restarted = ResponseCache(max_bytes=300, db_path=db_path)
+    hit = asyncio.run(restarted.get("key-0"))
+    assert hit["usage"] == USAGE
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_only_deterministic_requests_are_replayed_with_original_usage():
+    """Test temperature 0 hits, nonzero temperature misses, and the bypass/refresh controls"""
+    upstream = FakeChatService()
+    service = FakeCompletionService(upstream, response_cache=ResponseCache(max_bytes=1 << 20))
+    messages = [{"role": "user", "content": "2+2?"}]
+
+    async def run():
+        first = await service.chat(messages, config={"temperature": 0})
+        await asyncio.sleep(0)  # let the background store run
+        second = await service.chat(messages, config={"temperature": 0})
+        warm = await service.chat(messages, config={"temperature": 0.7})
+        bypass = await service.chat(messages, config={"temperature": 0}, use_cache=False)
+        refreshed = await service.chat(messages, config={"temperature": 0}, refresh=True)
+        await asyncio.sleep(0)
+        after_refresh = await service.chat(messages, config={"temperature": 0})
+        return first, second, warm, bypass, refreshed, after_refresh
+
+    first, second, warm, bypass, refreshed, after_refresh = asyncio.run(run())
+    assert not first["cached"] and second["cached"]
+    assert second["content"] == first["content"] and second["usage"] == USAGE
+    assert not warm["cached"] and not bypass["cached"] and not refreshed["cached"]
+    assert after_refresh["cached"] and after_refresh["content"] == refreshed["content"]
+    assert upstream.calls == 4
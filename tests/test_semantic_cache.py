@@ -0,0 +1,91 @@
+"""
+Test cases for the semantic response cache (Qdrant local in-memory mode)
+"""
+import asyncio
+import math
+import string
+
+from qdrant_client import AsyncQdrantClient
+
+from app.repositories.async_qdrant_repo import AsyncQdrantRepository
+from app.services.semantic_cache import SemanticCache
+
+
+class LetterEmbeddingService:
+    """Letter-frequency vectors: texts differing only in case and punctuation embed identically"""
+
+    def __init__(self):
+        self.model_name = "fake-letters"
+
+    def _vector(self, text):
+        counts = [float(text.lower().count(c)) for c in string.ascii_lowercase]
+        norm = math.sqrt(sum(c * c for c in counts)) or 1.0
+        return [c / norm for c in counts]
+
+    async def generate_embedding(self, text, dimension=26):
+        return self._vector(text)
+
+    async def generate_batch_embeddings(self, texts, dimension=26):
+        return [self._vector(text) for text in texts]
+
+
+def make_cache(ttl_seconds=60):
+    return SemanticCache(
+        repo=AsyncQdrantRepository(AsyncQdrantClient(":memory:")),
+        collection_name="semantic_cache",
+        threshold=0.95,
+        ttl_seconds=ttl_seconds,
+        dimension=26,
+        embedding_service=LetterEmbeddingService()
+    )
+
+
+def chat(text, system="You are helpful."):
+    return [{"role": "system", "content": system}, {"role": "user", "content": text}]
+
+
+def test_paraphrase_hits_within_namespace_and_context():
+    """Test that a near-identical question is served from the cache only for the same model and system prompt"""
+    cache = make_cache()
+    stored = cache.key_for_chat("gemini", "gemini-2.0-flash", chat("What is the capital of France?"))
+
+    async def run():
+        await cache.store(stored, {"content": "Paris", "model": "gemini-2.0-flash"})
+        return (
+            await cache.lookup(cache.key_for_chat("gemini", "gemini-2.0-flash", chat("what is the capital of france"))),
+            await cache.lookup(cache.key_for_chat("gemini", "other-model", chat("what is the capital of france"))),
+            await cache.lookup(cache.key_for_chat("gemini", "gemini-2.0-flash", chat("what is the capital of france", system="Be terse."))),
+            await cache.lookup(cache.key_for_chat("gemini", "gemini-2.0-flash", chat("Tell me a joke about zebras"))),
+        )
+
+    hit, other_model, other_system, unrelated = asyncio.run(run())
+    assert hit["content"] == "Paris"
+    assert hit["similarity"] >= 0.95
+    assert other_model is None
+    assert other_system is None
+    assert unrelated is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_entries_are_not_served_and_get_purged():
+    """Test that entries past their TTL miss and are removed by purge_expired"""
+    cache = make_cache(ttl_seconds=-1)
+    key = cache.key_for_prompt("gemini", "gemini-2.0-flash", "Explain TCP slow start")
+
+    async def run():
+        await cache.store(key, {"content": "...", "model": "gemini-2.0-flash"})
+        missed = await cache.lookup(key)
+        await cache.purge_expired()
+        remaining = (await cache.repo.client.count("semantic_cache")).count
+        return missed, remaining
+
+    missed, remaining = asyncio.run(run())
+    assert missed is None
+    assert remaining == 0
+
+
+def test_chat_ending_with_assistant_turn_is_not_cached():
+    """Test that only conversations ending in a user turn get a cache key"""
+    cache = make_cache()
+    messages = chat("hi") + [{"role": "assistant", "content": "hello"}]
+    assert cache.key_for_chat("gemini", "m", messages) is None
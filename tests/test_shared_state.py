@@ -0,0 +1,61 @@
+"""
+Test cases for runtime settings shared between worker processes
+"""
+import asyncio
+
+from app.core.shared_state import SharedState
+
+
+def worker(path, applied):
+    """A SharedState as one uvicorn worker would hold it"""
+    state = SharedState(path=str(path), poll_interval=0.05)
+    state.register("provider", lambda value: applied.append(("provider", value)))
+    return state
+
+
+def test_workers_converge_on_the_last_write(tmp_path):
+    """Test that every worker ends up applying the latest write, whichever worker made it"""
+    path = tmp_path / "state.sqlite3"
+    seen_a, seen_b = [], []
+    a, b = worker(path, seen_a), worker(path, seen_b)
+
+    async def run():
+        await a.start()
+        await b.start()
+        await a.set("provider", "litellm")
+        await b.set("provider", "local")
+        await asyncio.sleep(0.2)
+        await a.stop()
+        await b.stop()
+
+    asyncio.run(run())
+    assert seen_a[-1] == seen_b[-1] == ("provider", "local")
+
+
+def test_restarted_worker_loads_current_values(tmp_path):
+    """Test that a late worker starts from the latest value and skips unknown keys"""
+    path = tmp_path / "state.sqlite3"
+    first = worker(path, [])
+
+    async def publish():
+        await first.set("provider", "litellm")
+        await first.set("provider", "gemini")
+        await first.set("unknown_key", 1)
+        await first.stop()
+
+    asyncio.run(publish())
+
+    applied = []
+    late = worker(path, applied)
+    asyncio.run(late.sync())
+    assert applied == [("provider", "gemini")]
+    assert late.version == 3
+    asyncio.run(late.stop())
+
+
+def test_disabled_without_a_path():
+    """Test that an empty path keeps settings process-local"""
+    state = SharedState(path=None, poll_interval=1.0)
+    asyncio.run(state.set("provider", "gemini"))
+    asyncio.run(state.start())
+    assert not state.enabled and state._task is None
@@ -0,0 +1,65 @@
+"""
+Test cases for per-request phase timings and the Server-Timing header
+"""
+import asyncio
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core import timing
+from app.core.timing import RequestTimings, TimedRoute, TimingMiddleware, phase
+
+
+def test_nested_phases_are_exclusive():
+    """Test that a phase's time excludes the phases opened inside it"""
+    timings = RequestTimings()
+    token = timing._timings.set(timings)
+
+    async def run():
+        with phase("handler"):
+            await asyncio.sleep(0.02)
+            with phase("upstream"):
+                await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(run())
+    finally:
+        timing._timings.reset(token)
+
+    assert 0.045 <= timings.phases["upstream"] < 0.2
+    assert 0.015 <= timings.phases["handler"] < 0.045
+
+
+def test_phases_outside_a_request_are_ignored():
+    """Test that phase() is a no-op without request timings"""
+    with phase("upstream"):
+        pass
+    assert timing.current_timings() is None
+
+
+class Echo(BaseModel):
+    text: str
+
+
+def test_server_timing_header_breaks_down_the_request():
+    """Test that parse, handler, custom and serialize phases reach the header"""
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/echo/{item_id}", response_model=Echo)
+    async def echo(item_id: str, body: Echo):
+        with phase("upstream"):
+            await asyncio.sleep(0.01)
+        return Echo(text=f"{item_id}:{body.text}")
+
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware)
+    app.include_router(router, prefix="/api")
+
+    response = TestClient(app).post("/api/echo/7", json={"text": "hi"})
+    assert response.json() == {"text": "7:hi"}
+
+    entries = dict(part.strip().split(";dur=") for part in response.headers["server-timing"].split(","))
+    assert {"parse", "handler", "upstream", "serialize", "total"} <= set(entries)
+    assert float(entries["upstream"]) >= 10
+    assert float(entries["total"]) >= float(entries["upstream"])
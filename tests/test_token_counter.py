@@ -0,0 +1,59 @@
+"""
+Test cases for local token counting and pre-flight budget checks
+"""
+import pytest
+
+from app.services.token_counter import ContextWindowExceeded, TokenCounter, estimate_text_tokens
+
+
+def make_counter(**limits):
+    return TokenCounter(cache_size=64, default_context_window=1000, default_max_output=100, limits=limits)
+
+
+def test_counts_are_cached_and_calibrated():
+    """Test that repeated messages hit the cache and provider usage rescales the estimate"""
+    counter = make_counter()
+    messages = [{"role": "system", "content": "a" * 400}, {"role": "user", "content": "b" * 40}]
+    assert counter.count_messages(messages, "gemini-2.0-flash") == 100 + 10 + 2 * 4
+    counter.count_messages(messages, "gemini-2.0-flash")
+    assert counter.stats()["hits"] == 2 and counter.stats()["misses"] == 2
+
+    # Non-ASCII scripts take more tokens per character
+    assert estimate_text_tokens("नमस्ते दुनिया") > estimate_text_tokens("hello world!!")
+
+    raw = counter.raw_count(messages, model="gemini-2.0-flash")
+    counter.calibrate("gemini-2.0-flash", raw, actual=raw * 2)
+    assert counter.count_messages(messages, "google/gemini-2.0-flash") == raw * 2
+    assert counter.count_messages(messages, "gemini-2.5-flash") == raw
+
+
+def test_reject_and_trim_policies():
+    """Test that oversized requests are rejected, or trimmed by whole exchanges keeping system and last turn"""
+    counter = make_counter()
+    history = [{"role": "system", "content": "s" * 40}]
+    for i in range(4):
+        history += [{"role": "user", "content": f"{i}" * 800}, {"role": "assistant", "content": f"{i}" * 800}]
+    history.append({"role": "user", "content": "final question"})
+
+    with pytest.raises(ContextWindowExceeded):
+        counter.preflight("m", messages=history, max_tokens=50)
+    with pytest.raises(ContextWindowExceeded):
+        counter.preflight("m", prompt="short", max_tokens=500)
+
+    result = counter.preflight("m", messages=history, max_tokens=500, policy="trim")
+    assert result["max_tokens"] == 100  # clamped to the output limit
+    assert result["trimmed_messages"] == 4
+    assert [m["content"][0] for m in result["messages"]] == ["s", "2", "2", "3", "3", "f"]
+    assert result["prompt_tokens"] + result["max_tokens"] <= 1000 and result["fits"]
+
+    report = counter.preflight("m", messages=history, max_tokens=50, policy=None)
+    assert not report["fits"] and report["messages"] == history
+
+
+def test_model_limits_by_prefix_with_overrides():
+    """Test that the longest known prefix wins, provider prefixes are ignored and overrides apply"""
+    counter = make_counter(**{"gemini-2.0-flash-lite": {"output": 4096}, "gemini-2.5": {"context": 500000}})
+    assert counter.model_limits("litellm_proxy/google/gemini-2.0-flash") == (1048576, 8192)
+    assert counter.model_limits("gemini-2.0-flash-lite-001") == (1048576, 4096)
+    assert counter.model_limits("gemini-2.5-pro") == (500000, 65536)
+    assert counter.model_limits("some-unknown-model") == (1000, 100)
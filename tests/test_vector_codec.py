@@ -0,0 +1,40 @@
+"""
+Test cases for the compact vector encodings
+"""
+import numpy as np
+import pytest
+
+from app.core import vector_codec
+
+
+def test_binary_round_trip_keeps_failed_rows_aligned():
+    """Test that binary payloads decode to the same matrix, with NaN for missing rows"""
+    vectors = [[0.5, -1.25, 3.0], None, [1.0, 2.0, 4.0]]
+    for dtype in ("float32", "float16"):
+        decoded = vector_codec.decode_vectors(vector_codec.encode_vectors(vectors, dtype))
+        assert decoded.shape == (3, 3)
+        assert decoded[0].tolist() == [0.5, -1.25, 3.0]
+        assert np.isnan(decoded[1]).all()
+
+
+def test_binary_payload_size():
+    """Test that the payload is a 16 byte header plus packed values"""
+    payload = vector_codec.encode_vectors([[0.0] * 768], "float16")
+    assert len(payload) == 16 + 768 * 2
+
+
+def test_base64_round_trip():
+    """Test that base64-packed vectors decode back to float32"""
+    encoded = vector_codec.encode_base64([0.1, 0.2, 0.3])
+    assert np.allclose(vector_codec.decode_base64(encoded), [0.1, 0.2, 0.3])
+
+
+def test_negotiation():
+    """Test that the query parameter wins over the Accept header and bad values are rejected"""
+    assert vector_codec.negotiate(None, None, None) == ("json", "float32")
+    assert vector_codec.negotiate("application/octet-stream", None, "float16") == ("binary", "float16")
+    assert vector_codec.negotiate("application/octet-stream", "base64", None) == ("base64", "float32")
+    with pytest.raises(ValueError):
+        vector_codec.negotiate(None, "msgpack", None)
+    with pytest.raises(ValueError):
+        vector_codec.negotiate(None, None, "float64")